@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+
+
+def parseList(value: str, cast=str) -> list:
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # facturas sintéticas (offline, con las regiones de config/sat_template.yaml)
+    ap.add_argument("--num-invoices", type=int, default=16, help="pdfs sintéticos a generar")
+    ap.add_argument("--pages", type=int, default=1, help="páginas por pdf sintético")
+    ap.add_argument("--seed", type=int, default=0, help="semilla de las facturas sintéticas")
+
+    # matriz de configuraciones
+    ap.add_argument("--modes", type=str, default="sat-template,full", help="lista separada por comas")
+    ap.add_argument("--dpis", type=str, default="300", help="lista separada por comas")
+    ap.add_argument("--batch-sizes", type=str, default="1,8", help="lista separada por comas")
+    ap.add_argument(
+        "--backends",
+        type=str,
+        default="torch",
+        help="torch, torch-int8 y/o onnx, separados por comas",
+    )
+    ap.add_argument(
+        "--model-dir",
+        type=str,
+        default="qantev/trocr-base-spanish",
+        help="ruta al modelo (baseline o fine-tuned)",
+    )
+
+    # comparación con una base guardada
+    ap.add_argument("--baseline", type=str, default=None, help="json base (default: outputs/tables/ocr_bench_baseline.json)")
+    ap.add_argument("--save-baseline", action="store_true", help="guarda este reporte como nueva base")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="cambio relativo tolerado antes de marcar regresión")
+
+    args = ap.parse_args()
+
+    # torch/transformers recién después de parsear (--help queda instantáneo)
+    from src.budget_buddy.benchmarks.synthetic_fel import generateSyntheticInvoices
+    from src.budget_buddy.benchmarks.ocr_bench import (
+        BASELINE_PATH,
+        buildBenchMatrix,
+        compareToBaseline,
+        loadBaseline,
+        runBenchMatrix,
+        saveBenchReport,
+    )
+
+    pdf_items = generateSyntheticInvoices(num_invoices=args.num_invoices, seed=args.seed, pages=args.pages)
+    cases = buildBenchMatrix(
+        modes=parseList(args.modes),
+        dpis=parseList(args.dpis, int),
+        batch_sizes=parseList(args.batch_sizes, int),
+        backends=parseList(args.backends),
+    )
+
+    report = runBenchMatrix(cases, pdf_items, args.model_dir)
+
+    baseline_path = args.baseline or BASELINE_PATH
+    baseline = loadBaseline(baseline_path)
+    if baseline is not None:
+        report["baseline"] = str(baseline_path)
+        report["regressions"] = compareToBaseline(report, baseline, tolerance=args.tolerance)
+
+    out_path = saveBenchReport(report)
+    print(f"\nreporte guardado en: {out_path}")
+
+    if args.save_baseline:
+        saveBenchReport(report, baseline_path)
+        print(f"base actualizada: {baseline_path}")
+
+    if report.get("regressions"):
+        print("regresiones contra la base:")
+        print(json.dumps(report["regressions"], indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+ROOT = Path(".")
+METRICS_ROOT = ROOT / "outputs" / "tables"
+HEAVY_MODULES = ("torch", "transformers", "pandas", "matplotlib")
+
+# módulos que otros scripts/notebooks importan
+IMPORT_TARGETS = [
+    "src.budget_buddy.ocr.trocr_infer",
+    "src.budget_buddy.ocr.trocr_finetune",
+    "src.budget_buddy.ocr.trocr_xai",
+    "src.budget_buddy.ocr_server.main",
+]
+
+# entry points de cli medidos con --help
+CLI_TARGETS = [
+    "src/budget_buddy/ocr/trocr_infer.py",
+    "scripts/python/train_trocr_fel.py",
+    "scripts/python/eval_quantized_trocr.py",
+    "scripts/python/export_trocr_onnx.py",
+]
+
+IMPORT_SNIPPET = """
+import importlib, json, sys, time
+t0 = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps({{
+    "seconds": time.perf_counter() - t0,
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+LOAD_SNIPPET = """
+import json, resource, time
+t0 = time.perf_counter()
+from src.budget_buddy.utils.common_models import loadTrocrModel
+t1 = time.perf_counter()
+processor, model = loadTrocrModel({model_dir!r}, "cpu", mmap_weights={mmap!r})
+t2 = time.perf_counter()
+with open("/proc/self/status") as f:
+    status = dict(line.split(":", 1) for line in f)
+print(json.dumps({{
+    "import_seconds": t1 - t0,
+    "load_seconds": t2 - t1,
+    "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+    "rss_file_mb": int(status.get("RssFile", "0 kB").split()[0]) / 1024,
+    "rss_anon_mb": int(status.get("RssAnon", "0 kB").split()[0]) / 1024,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def runPython(args: list[str]) -> tuple[float, str]:
+    # proceso limpio por medición; PYTHONPATH=. como en el Makefile
+    env = {**os.environ, "PYTHONPATH": "."}
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"falló {' '.join(args)}:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stdout
+
+
+def benchImports(repeats: int) -> dict:
+    results = {}
+    for module in IMPORT_TARGETS:
+        code = IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)
+        runs = [json.loads(runPython(["-c", code])[1].strip().splitlines()[-1]) for _ in range(repeats)]
+        results[module] = {
+            "import_seconds": statistics.median(r["seconds"] for r in runs),
+            "heavy_loaded": runs[-1]["heavy_loaded"],
+        }
+        print(f"import {module:<42} {results[module]['import_seconds']:.3f}s  pesados={runs[-1]['heavy_loaded']}")
+    return results
+
+
+def benchCliHelp(repeats: int) -> dict:
+    results = {}
+    for script in CLI_TARGETS:
+        times = [runPython([script, "--help"])[0] for _ in range(repeats)]
+        results[script] = {"help_seconds": statistics.median(times)}
+        print(f"--help {script:<42} {results[script]['help_seconds']:.3f}s")
+    return results
+
+
+def benchModelLoad(model_dir: str) -> dict:
+    results = {}
+    for mmap in (False, True):
+        code = LOAD_SNIPPET.format(model_dir=model_dir, mmap=mmap)
+        stats = json.loads(runPython(["-c", code])[1].strip().splitlines()[-1])
+        key = "mmap" if mmap else "copy"
+        results[key] = stats
+        print(
+            f"load {key:<5} import={stats['import_seconds']:.2f}s load={stats['load_seconds']:.2f}s "
+            f"rss={stats['rss_mb']:.0f}MB (archivo {stats['rss_file_mb']:.0f} / anónima {stats['rss_anon_mb']:.0f})"
+        )
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    ap.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="procesos por medición (se reporta la mediana)",
+    )
+
+    # carga del modelo (copia vs mmap); vacío = no se mide
+    ap.add_argument(
+        "--model-dir",
+        type=str,
+        default=None,
+        help="si se pasa, mide también loadTrocrModel en cpu con y sin mmap",
+    )
+
+    args = ap.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "repeats": args.repeats,
+        "imports": benchImports(args.repeats),
+        "cli_help": benchCliHelp(args.repeats),
+    }
+    if args.model_dir:
+        report["model_load"] = {"model_dir": args.model_dir, **benchModelLoad(args.model_dir)}
+
+    METRICS_ROOT.mkdir(parents=True, exist_ok=True)
+    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    out_path = METRICS_ROOT / f"startup_bench_{run_id}.json"
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"reporte guardado en: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
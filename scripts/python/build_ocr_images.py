@@ -37,6 +37,22 @@ def main():
         help="si se pasa, vuelve a generar las imágenes aunque ya existan",
     )
 
+    # pdfs en paralelo (un proceso por pdf a la vez)
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="procesos para rasterizar en paralelo",
+    )
+
+    # pdftoppm simultáneos por proceso; default reparte los cores entre los jobs
+    ap.add_argument(
+        "--poppler-threads",
+        type=int,
+        default=None,
+        help="hilos de poppler por proceso (default: cpus / jobs)",
+    )
+
     args = ap.parse_args()
 
     # delega el procesamiento a la función del módulo
@@ -45,6 +61,8 @@ def main():
         dpi=args.dpi,
         max_per_category=args.max_per_category,
         overwrite=args.overwrite,
+        jobs=args.jobs,
+        poppler_threads=args.poppler_threads,
     )
 
 
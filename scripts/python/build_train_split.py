@@ -7,10 +7,12 @@ import pandas as pd
 
 from src.budget_buddy.utils.io import ensureDirs, toCsv
 from src.budget_buddy.preprocessing.cleaning import unzipAll
+from src.budget_buddy.preprocessing.zip_manifest import ensureExtracted, loadArchiveIndex
 
 
 ROOT = Path(".")
 PROC_DIR = ROOT / "data" / "processed"
+PDF_MANIFEST_PATH = PROC_DIR / "manifest_pdfs.csv"
 SPLITS_DIR = ROOT / "data" / "splits"
 TRAIN_ROOT = SPLITS_DIR / "train"
 TRAIN_TRASH_ROOT = SPLITS_DIR / ".trash"
@@ -112,6 +114,9 @@ def buildXmlIndex():
         return index
 
     for xml_path in XML_UNZIPPED_DIR.rglob("*.xml"):
+        # carpetas ocultas: extracciones a medias de unzipAll
+        if any(part.startswith(".") for part in xml_path.relative_to(XML_UNZIPPED_DIR).parts):
+            continue
         stem = xml_path.stem
         # si hay duplicados se queda con el primero
         if stem not in index:
@@ -143,6 +148,8 @@ def buildTrainSplit():
         unzipAll(XML_RAW_DIR, XML_UNZIPPED_DIR)
 
     xml_index = buildXmlIndex()
+    # pdfs que siguen dentro de su zip (preprocess --zip-native) se extraen al moverlos
+    archive_index = loadArchiveIndex(PDF_MANIFEST_PATH)
 
     for _, row in df_filtered.iterrows():
         pdf_path_str = row["pdf_path"]
@@ -160,7 +167,7 @@ def buildTrainSplit():
 
         src_path = Path(pdf_path_str)
 
-        if not src_path.exists():
+        if not ensureExtracted(src_path, archive_index):
             skipped_rows.append(
                 {
                     "reason": "archivo_no_encontrado",
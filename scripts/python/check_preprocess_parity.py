@@ -0,0 +1,67 @@
+import argparse
+import json
+import time
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # processor del modelo a comparar
+    ap.add_argument(
+        "--model-dir",
+        type=str,
+        default="qantev/trocr-base-spanish",
+        help="ruta al modelo (baseline o fine-tuned)",
+    )
+    ap.add_argument(
+        "--mode",
+        choices=["full", "sat-template"],
+        default="sat-template",
+        help="recortes usados en la comparación",
+    )
+    ap.add_argument(
+        "--max-per-category",
+        type=int,
+        default=2,
+        help="pdfs por categoría en la muestra",
+    )
+    ap.add_argument(
+        "--atol",
+        type=float,
+        default=0.05,
+        help="diferencia absoluta máxima tolerada por recorte (espacio normalizado)",
+    )
+
+    args = ap.parse_args()
+
+    from transformers import TrOCRProcessor
+
+    from src.budget_buddy.utils.common_models import resolveModelDir
+    from src.budget_buddy.ocr.trocr_quantize import collectSampleCrops
+    from src.budget_buddy.preprocessing.batch_preprocess import (
+        batchPreprocess,
+        checkPreprocessParity,
+        getProcessorParams,
+    )
+
+    processor = TrOCRProcessor.from_pretrained(resolveModelDir(args.model_dir))
+    images = [c["image"] for c in collectSampleCrops("train", args.mode, dpi=450, max_per_category=args.max_per_category)]
+
+    report = checkPreprocessParity(processor, images, atol=args.atol)
+
+    # tiempos de ambos caminos sobre los mismos recortes
+    start = time.perf_counter()
+    processor(images=[img.convert("RGB") for img in images], return_tensors="pt")
+    report["processor_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batchPreprocess(images, getProcessorParams(processor))
+    report["vectorized_seconds"] = time.perf_counter() - start
+
+    print(json.dumps(report, indent=2))
+    if not report["ok"]:
+        raise SystemExit(f"{report['num_over_tol']} recortes superan atol={args.atol}")
+
+
+if __name__ == "__main__":
+    main()
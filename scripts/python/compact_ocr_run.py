@@ -0,0 +1,40 @@
+import argparse
+from pathlib import Path
+
+from src.budget_buddy.ocr.ocr_sink import compactRunToParquet, loadOcrRun
+
+
+ROOT = Path(".")
+OCR_TRAIN_ROOT = ROOT / "data" / "interim" / "ocr_train"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # corrida a compactar (carpeta bajo data/interim/ocr_train)
+    ap.add_argument(
+        "--run-id",
+        type=str,
+        required=True,
+        help="run_id de la corrida escrita con --sink jsonl",
+    )
+    ap.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="ruta del parquet (default: <run>/ocr_results.parquet)",
+    )
+
+    args = ap.parse_args()
+
+    run_root = OCR_TRAIN_ROOT / args.run_id
+    out_path = compactRunToParquet(run_root, Path(args.out) if args.out else None)
+
+    df = loadOcrRun(run_root)
+    print(f"columnas: {', '.join(df.columns)}")
+    print(df.groupby("category").size().to_string())
+    print(f"listo: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
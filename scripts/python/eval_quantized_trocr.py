@@ -0,0 +1,72 @@
+import argparse
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # modelo a comparar (baseline o fine-tuned)
+    ap.add_argument(
+        "--model-dir",
+        type=str,
+        default="qantev/trocr-base-spanish",
+        help="ruta al modelo (baseline o fine-tuned)",
+    )
+
+    # tipo de cuantización
+    ap.add_argument(
+        "--quantize",
+        choices=["int8"],
+        default="int8",
+        help="cuantización a evaluar contra fp32",
+    )
+
+    # recortes usados en la comparación
+    ap.add_argument(
+        "--mode",
+        choices=["full", "sat-template"],
+        default="sat-template",
+        help="recortes a comparar: página completa o zonas sat-template",
+    )
+    ap.add_argument(
+        "--dpi",
+        type=int,
+        default=450,
+        help="dpi usados al generar las imágenes (cuando no hay cache)",
+    )
+    ap.add_argument(
+        "--max-per-category",
+        type=int,
+        default=3,
+        help="pdfs por categoría en la muestra",
+    )
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="recortes por llamada a generate",
+    )
+
+    args = ap.parse_args()
+
+    # torch/transformers recién después de parsear (--help queda instantáneo)
+    from src.budget_buddy.ocr.trocr_quantize import compareQuantizedAccuracy, saveQuantizationReport
+
+    report = compareQuantizedAccuracy(
+        model_dir=args.model_dir,
+        quantize=args.quantize,
+        mode=args.mode,
+        dpi=args.dpi,
+        max_per_category=args.max_per_category,
+        batch_size=args.batch_size,
+    )
+    out_path = saveQuantizationReport(report)
+
+    print(f"recortes comparados : {report['num_crops']}")
+    print(f"cer medio vs fp32   : {report['mean_cer_vs_fp32']:.4f}")
+    print(f"coincidencia exacta : {report['exact_match_rate']:.2%}")
+    print(f"speedup {args.quantize:<12}: {report['speedup']:.2f}x")
+    print(f"reporte guardado en : {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import json
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # modelo a exportar (baseline o fine-tuned)
+    ap.add_argument(
+        "--model-dir",
+        type=str,
+        default="qantev/trocr-base-spanish",
+        help="ruta al modelo (baseline o fine-tuned)",
+    )
+
+    # regenerar grafos aunque estén al día
+    ap.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="si se pasa, vuelve a exportar aunque exista el cache onnx",
+    )
+
+    # verificación de paridad contra pytorch
+    ap.add_argument(
+        "--check-parity",
+        type=int,
+        default=0,
+        help="pdfs por categoría usados para comparar textos onnx vs pytorch (0 = no)",
+    )
+    ap.add_argument(
+        "--mode",
+        choices=["full", "sat-template"],
+        default="sat-template",
+        help="recortes usados en la verificación",
+    )
+
+    args = ap.parse_args()
+
+    # torch/transformers recién después de parsear (--help queda instantáneo)
+    from src.budget_buddy.ocr.trocr_onnx import exportTrocrOnnx, checkOnnxParity
+    from src.budget_buddy.ocr.trocr_quantize import collectSampleCrops
+
+    onnx_dir = exportTrocrOnnx(args.model_dir, overwrite=args.overwrite)
+    print(f"grafos onnx en: {onnx_dir}")
+
+    if args.check_parity > 0:
+        crops = collectSampleCrops("train", args.mode, dpi=450, max_per_category=args.check_parity)
+        report = checkOnnxParity(args.model_dir, [c["image"] for c in crops])
+        print(f"paridad onnx vs pytorch: {report['match_rate']:.2%} ({report['num_images']} recortes)")
+
+        out_path = onnx_dir / "parity_report.json"
+        out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"reporte de paridad: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
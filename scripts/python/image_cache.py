@@ -0,0 +1,76 @@
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from src.budget_buddy.preprocessing.image_cache import getImageCache
+
+
+def formatMb(size_bytes) -> str:
+    return f"{(size_bytes or 0) / 2**20:.1f} MB"
+
+
+def formatTs(ts) -> str:
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else "-"
+
+
+def printStats(stats: dict):
+    print(f"cache imágenes: {stats['root']}")
+    print(f"\tentradas      : {stats['entries']} ({stats['pdfs']} pdfs)")
+    print(f"\ttamaño        : {formatMb(stats['size_bytes'])}")
+    print(f"\tpresupuesto   : {formatMb(stats['max_bytes']) if stats['max_bytes'] else 'sin límite'}")
+    for kind, counts in sorted(stats["by_kind"].items()):
+        print(f"\t  {kind:<11} : {counts['entries']} entradas, {formatMb(counts['size_bytes'])}")
+    print(f"\tacceso más viejo: {formatTs(stats['oldest_access'])}")
+    print(f"\tacceso más nuevo: {formatTs(stats['newest_access'])}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # raíz del cache (default: data/interim/images/npy)
+    ap.add_argument(
+        "--root",
+        type=str,
+        default=None,
+        help="carpeta del cache npy",
+    )
+
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="tamaño y entradas del cache")
+
+    prune = sub.add_parser("prune", help="desaloja por lru hasta quedar bajo el presupuesto")
+    # sin --max-gb se usa ocr.image_cache.max_gb de config/ocr.yaml
+    prune.add_argument(
+        "--max-gb",
+        type=float,
+        default=None,
+        help="presupuesto en GB (default: config/ocr.yaml)",
+    )
+    prune.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="solo muestra qué se desalojaría",
+    )
+
+    args = ap.parse_args()
+    cache = getImageCache(Path(args.root) if args.root else None)
+
+    if args.command == "stats":
+        printStats(cache.stats())
+        return
+
+    max_bytes = int(args.max_gb * 2**30) if args.max_gb is not None else cache.max_bytes
+    if max_bytes is None:
+        raise SystemExit("no hay presupuesto: pasa --max-gb o define ocr.image_cache.max_gb")
+
+    result = cache.prune(max_bytes=max_bytes, dry_run=args.dry_run)
+    label = "se desalojarían" if args.dry_run else "desalojados"
+    print(f"presupuesto {formatMb(max_bytes)} (baja a {cache.low_watermark:.0%})")
+    print(f"\tantes   : {formatMb(result['before_bytes'])}")
+    print(f"\t{label:<8}: {result['evicted_groups']} grupos, {result['evicted_entries']} entradas")
+    print(f"\tliberado: {formatMb(result['freed_bytes'])}")
+    print(f"\tdespués : {formatMb(result['after_bytes'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+from pathlib import Path
+
+from src.budget_buddy.preprocessing.image_cache import (
+    LEGACY_IMAGES_ROOT,
+    SPLITS_ROOT,
+    getImageCache,
+    migratePngCache,
+)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # raíz del cache png viejo (<split>/<category>/<stem>_p<n>.png)
+    ap.add_argument(
+        "--images-root",
+        type=str,
+        default=str(LEGACY_IMAGES_ROOT),
+        help="carpeta con los pngs por split/categoría",
+    )
+
+    # de aquí salen los pdfs para calcular el sha256 de la llave
+    ap.add_argument(
+        "--splits-root",
+        type=str,
+        default=str(SPLITS_ROOT),
+        help="carpeta con los pdfs por split/categoría",
+    )
+
+    # pngs sin metadato de dpi
+    ap.add_argument(
+        "--default-dpi",
+        type=int,
+        default=450,
+        help="dpi a usar si el png no lo trae",
+    )
+
+    ap.add_argument(
+        "--delete-png",
+        action="store_true",
+        help="si se pasa, borra cada png ya migrado",
+    )
+
+    args = ap.parse_args()
+
+    stats = migratePngCache(
+        images_root=Path(args.images_root),
+        splits_root=Path(args.splits_root),
+        default_dpi=args.default_dpi,
+        delete_png=args.delete_png,
+    )
+
+    print("\nresumen migración → cache npy")
+    print(f"\tpdfs migrados     : {stats['pdfs']}")
+    print(f"\tpáginas nuevas    : {stats['pages']}")
+    print(f"\tya en cache       : {stats['already_cached']}")
+    print(f"\tsin pdf (se dejan): {stats['missing_pdf']}")
+    print(f"\tpng (MB)          : {stats['png_bytes'] / 2**20:.1f}")
+    print(f"\tnpy nuevos (MB)   : {stats['npy_bytes'] / 2**20:.1f}")
+    print(f"\tcache             : {getImageCache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
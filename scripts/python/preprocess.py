@@ -1,6 +1,9 @@
 import argparse
 from pathlib import Path
-from src.budget_buddy.preprocessing.cleaning import unzipAll, buildManifest
+from src.budget_buddy.preprocessing.cleaning import DEFAULT_UNZIP_WORKERS, unzipAll, buildManifest
+from src.budget_buddy.preprocessing.hash_index import DEFAULT_HASH_WORKERS
+from src.budget_buddy.preprocessing.manifest_update import updateManifest
+from src.budget_buddy.preprocessing.zip_manifest import listTrashedPaths
 from src.budget_buddy.utils.io import ensureDirs
 
 
@@ -10,28 +13,61 @@ def main():
     parser.add_argument("--hash", action="store_true", help="calcular sha256 para duplicados por contenido")
     # permitir sobrescribir csv existentes
     parser.add_argument("--overwrite", action="store_true", help="reemplazar csv si existe")
+    # hilos para hashear los pdfs nuevos o modificados (el resto sale del índice)
+    parser.add_argument("--hash-workers", type=int, default=DEFAULT_HASH_WORKERS, help="hilos para sha256")
+    # por defecto todo el manifest lleva sha256; por etapas solo los posibles duplicados
+    # (mismo tamaño y mismos extremos) y el resto de la columna queda vacío
+    parser.add_argument("--staged-hash", action="store_true", help="sha256 solo de los posibles duplicados")
+    # manifest desde los zips sin descomprimir; cada pdf se extrae la primera vez que se usa
+    parser.add_argument("--zip-native", action="store_true", help="no descomprimir: leer y hashear dentro de los zips")
+    # zips descomprimidos en paralelo; los que tienen marcador al día se saltan
+    parser.add_argument("--unzip-workers", type=int, default=DEFAULT_UNZIP_WORKERS, help="zips en paralelo")
+    parser.add_argument("--force-unzip", action="store_true", help="volver a descomprimir aunque haya marcador")
+    # aplica solo altas/bajas/movidos desde el escaneo anterior (estado en manifest_pdfs.scan.json)
+    # junto con --overwrite descarta el estado y rehace el manifest completo
+    parser.add_argument("--incremental", action="store_true", help="actualizar el manifest sin reescanear todo")
     args = parser.parse_args()
 
     root = Path(".")
     raw_dir = root / "data" / "raw" / "pdf"
     interim_unzip_dir = root / "data" / "interim" / "unzipped_pdfs"
     processed_dir = root / "data" / "processed"
+    trash_root = root / "data" / "interim" / ".trash"
 
     manifest_csv = processed_dir / "manifest_pdfs.csv"
     dup_csv = processed_dir / "manifest_duplicates.csv"
 
     ensureDirs([interim_unzip_dir, processed_dir])
 
-    # descomprimir todos los zips
-    unzipAll(raw_dir, interim_unzip_dir)
+    # descomprimir todos los zips (en zip-native se extrae bajo demanda)
+    if not args.zip_native:
+        unzipAll(raw_dir, interim_unzip_dir, workers=args.unzip_workers, force=args.force_unzip)
 
     # generar manifest y archivo de duplicados
+    if args.incremental and not args.zip_native:
+        updateManifest(
+            interim_unzip_dir=interim_unzip_dir,
+            manifest_csv=manifest_csv,
+            duplicates_csv=dup_csv,
+            compute_hash=args.hash,
+            hash_workers=args.hash_workers,
+            full_hash=not args.staged_hash,
+            rescan=args.overwrite,
+        )
+        print(f"listo ✓\n- manifest: {manifest_csv}\n- duplicados: {dup_csv}")
+        return
+
     buildManifest(
         interim_unzip_dir=interim_unzip_dir,
         manifest_csv=manifest_csv,
         duplicates_csv=dup_csv,
         compute_hash=args.hash,
         overwrite=args.overwrite,
+        hash_workers=args.hash_workers,
+        full_hash=not args.staged_hash,
+        raw_dir=raw_dir if args.zip_native else None,
+        # los duplicados ya resueltos siguen dentro del zip: se excluyen por la papelera
+        exclude_paths=listTrashedPaths(trash_root) if args.zip_native else None,
     )
 
     print(f"listo ✓\n- manifest: {manifest_csv}\n- duplicados: {dup_csv}")
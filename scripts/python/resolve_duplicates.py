@@ -3,11 +3,14 @@ import argparse, re, shutil, sys
 from datetime import datetime
 import pandas as pd
 
-from src.budget_buddy.preprocessing.cleaning import scanPdfs, markDuplicatesByName, addHashes
+from src.budget_buddy.preprocessing.cleaning import scanZipPdfs, markDuplicatesByName, addHashes, buildDuplicatesTable
+from src.budget_buddy.preprocessing.manifest_update import updateManifest
+from src.budget_buddy.preprocessing.zip_manifest import ensureExtracted, listTrashedPaths, loadArchiveIndex
 from src.budget_buddy.utils.io import toCsv
 
 ROOT = Path(".")
 INTERIM_UNZIPPED = ROOT / "data" / "interim" / "unzipped_pdfs"
+RAW_PDF_DIR = ROOT / "data" / "raw" / "pdf"
 PROC_DIR = ROOT / "data" / "processed"
 MANIFEST = PROC_DIR / "manifest_pdfs.csv"
 DUPS = PROC_DIR / "manifest_duplicates.csv"
@@ -67,27 +70,24 @@ def printGroup(group_df: pd.DataFrame, group_key: str, by: str):
     print("=" * 60)
 
 
+def isZipNativeManifest() -> bool:
+    # manifest generado con preprocess --zip-native (trae columna storage)
+    return MANIFEST.exists() and "storage" in pd.read_csv(MANIFEST, nrows=0).columns
+
+
 def refreshManifests(compute_hash: bool):
     # reescanea pdfs para generar manifests consistentes
-    df = scanPdfs(INTERIM_UNZIPPED)
+    if not isZipNativeManifest():
+        # solo se vuelven a listar las carpetas que cambiaron (las de los pdfs movidos a la papelera)
+        updateManifest(INTERIM_UNZIPPED, MANIFEST, DUPS, compute_hash=compute_hash)
+        return
+
+    df = scanZipPdfs(RAW_PDF_DIR, INTERIM_UNZIPPED, exclude_paths=listTrashedPaths(TRASH_ROOT))
     df = markDuplicatesByName(df)
     if compute_hash:
         df = addHashes(df)
     toCsv(df, MANIFEST, overwrite=True)
-
-    # construye tabla de duplicados según el criterio disponible
-    keep_cols = [
-        "pdf_filename", "zip_root", "year", "block", "size_bytes",
-        "pdf_path", "first_seen_zip", "is_name_duplicate"
-    ]
-    if compute_hash and "sha256" in df.columns:
-        keep_cols += ["sha256", "is_hash_duplicate"]
-        dups = df[(df["is_name_duplicate"]) | (df["hash_count"] > 1)].copy()
-    else:
-        dups = df[df["is_name_duplicate"]].copy()
-
-    dups = dups[keep_cols].sort_values(["pdf_filename", "year", "block"])
-    toCsv(dups, DUPS, overwrite=True)
+    toCsv(buildDuplicatesTable(df, compute_hash), DUPS, overwrite=True)
 
 
 def loadDuplicates(by: str, pattern: str | None):
@@ -159,6 +159,8 @@ def interactiveResolve(by: str, groups: dict, apply: bool, compute_hash: bool):
             continue
 
         to_drop = gdf.reset_index(drop=True).drop(index=keep_idx)
+        # en manifests zip-native el pdf puede seguir dentro del zip: se extrae para moverlo a la papelera
+        archive_index = loadArchiveIndex(MANIFEST) if apply else {}
 
         if apply and not (trash_run_dir / "manifest_pdfs.bak.csv").exists():
             backupManifests(trash_run_dir)
@@ -166,6 +168,7 @@ def interactiveResolve(by: str, groups: dict, apply: bool, compute_hash: bool):
         for _, r in to_drop.iterrows():
             src = Path(r["pdf_path"])
             if apply:
+                ensureExtracted(src, archive_index)
                 dst = moveToTrash(src, trash_run_dir)
             else:
                 dst = None
@@ -0,0 +1,47 @@
+import argparse
+from pathlib import Path
+
+from src.budget_buddy.ocr.ocr_metrics import buildTextLayerReport
+from src.budget_buddy.ocr.ocr_sink import loadOcrRun
+
+
+ROOT = Path(".")
+OCR_TRAIN_ROOT = ROOT / "data" / "interim" / "ocr_train"
+METRICS_ROOT = ROOT / "outputs" / "tables"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # corrida a reportar (carpeta bajo data/interim/ocr_train)
+    ap.add_argument(
+        "--run-id",
+        type=str,
+        required=True,
+        help="run_id de la corrida ocr",
+    )
+    ap.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="csv de salida (default: outputs/tables/text_layer_<run_id>.csv)",
+    )
+
+    args = ap.parse_args()
+
+    df = loadOcrRun(OCR_TRAIN_ROOT / args.run_id)
+    if df.empty:
+        raise SystemExit(f"la corrida {args.run_id} no tiene resultados")
+
+    report = buildTextLayerReport(df)
+
+    out_path = Path(args.out) if args.out else METRICS_ROOT / f"text_layer_{args.run_id}.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(out_path, index=False)
+
+    print(report.to_string(index=False))
+    print(f"reporte: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
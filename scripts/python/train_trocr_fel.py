@@ -1,7 +1,5 @@
 import argparse
 
-from src.budget_buddy.ocr.trocr_finetune import trainTrocrFel
-
 
 def main():
     parser = argparse.ArgumentParser()
@@ -108,8 +106,18 @@ def main():
         help="aplica data augmentation ligero sobre las imágenes de entrenamiento",
     )
 
+    # pixel_values en tensor sobre gris en vez de pil + processor
+    parser.add_argument(
+        "--vectorized-preprocess",
+        action="store_true",
+        help="arma pixel_values con el preprocess vectorizado (gris → 3 canales en tensor)",
+    )
+
     args = parser.parse_args()
 
+    # torch/transformers recién después de parsear (--help queda instantáneo)
+    from src.budget_buddy.ocr.trocr_finetune import trainTrocrFel
+
     # se inicia el fine-tuning con los parámetros configurados
     trainTrocrFel(
         output_dir=args.output_dir,
@@ -125,6 +133,7 @@ def main():
         seed=args.seed,
         image_mode=args.image_mode,
         use_augment=args.use_augment,
+        vectorized_preprocess=args.vectorized_preprocess,
     )
 
 
@@ -0,0 +1,217 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+import json
+import multiprocessing as mp
+import platform
+import shutil
+import time
+
+from src.budget_buddy.ocr.ocr_sink import JsonFileSink
+from src.budget_buddy.utils.stats import percentile
+from src.budget_buddy.utils.timing import peakRssMb
+
+
+ROOT = Path(".")
+BENCH_ROOT = ROOT / "data" / "interim" / "bench"
+BENCH_IMAGE_SPLIT = "bench"
+METRICS_ROOT = ROOT / "outputs" / "tables"
+BASELINE_PATH = METRICS_ROOT / "ocr_bench_baseline.json"
+
+
+@dataclass
+class BenchCase:
+    mode: str
+    dpi: int
+    batch_size: int
+    backend: str = "torch"
+    device: str = "cpu"
+    quantize: str | None = None
+
+    def key(self) -> str:
+        quant = f"/{self.quantize}" if self.quantize else ""
+        return f"{self.mode}/dpi{self.dpi}/bs{self.batch_size}/{self.backend}{quant}/{self.device}"
+
+
+def buildBenchMatrix(
+    modes: list[str],
+    dpis: list[int],
+    batch_sizes: list[int],
+    backends: list[str],
+    device: str = "cpu",
+) -> list[BenchCase]:
+    # producto cartesiano; "torch-int8" se expande a backend torch + quantize int8
+    cases = []
+    for mode, dpi, batch_size, backend in product(modes, dpis, batch_sizes, backends):
+        quantize = None
+        if backend == "torch-int8":
+            backend, quantize = "torch", "int8"
+        cases.append(BenchCase(mode, dpi, batch_size, backend=backend, device=device, quantize=quantize))
+    return cases
+
+
+class TimingSink(JsonFileSink):
+    # sink json normal que además anota cuándo terminó cada pdf y cuántos slots tuvo
+    def __init__(self, run_root: Path):
+        super().__init__(run_root)
+        self.done_at = {}
+        self.slots = {}
+
+    def exists(self, pdf_path: Path, category: str):
+        # el benchmark siempre procesa todo
+        return None
+
+    def write(self, pdf_path: Path, category: str, payload: dict) -> Path:
+        out_path = super().write(pdf_path, category, payload)
+        self.done_at[str(pdf_path)] = time.perf_counter()
+        self.slots[str(pdf_path)] = len(payload.get("regions") or payload.get("page_texts") or [])
+        return out_path
+
+
+def runBenchCase(case: dict, pdf_items: list[tuple[str, str]], model_dir: str) -> dict:
+    # corre en un proceso nuevo para que el pico de rss sea solo de este caso
+    from src.budget_buddy.ocr.trocr_infer import runOcr
+    from src.budget_buddy.preprocessing.image_cache import setImageCacheRoot
+
+    case = BenchCase(**case)
+    out_base = BENCH_ROOT / "runs" / case.key().replace("/", "_")
+    shutil.rmtree(out_base, ignore_errors=True)
+    # cache de imágenes en frío: el raster forma parte del costo medido
+    # (cache aparte: no toca el de data/interim/images/npy)
+    cache_root = BENCH_ROOT / "image_cache" / case.key().replace("/", "_")
+    shutil.rmtree(cache_root, ignore_errors=True)
+    setImageCacheRoot(cache_root)
+
+    # marca cuándo el flujo toma cada pdf (la latencia se mide desde ahí)
+    pulled_at = {}
+
+    def iterItems():
+        for category, pdf_path in pdf_items:
+            pulled_at[str(pdf_path)] = time.perf_counter()
+            yield category, Path(pdf_path)
+
+    sink = TimingSink(out_base / "run")
+    started = time.perf_counter()
+    runOcr(
+        device_preference=case.device,
+        mode=case.mode,
+        dpi=case.dpi,
+        use_cache=True,
+        overwrite=True,
+        model_dir=model_dir,
+        batch_size=case.batch_size,
+        use_ocr_cache=False,
+        quantize=case.quantize,
+        backend=case.backend,
+        pdf_items=iterItems(),
+        output_base=out_base,
+        image_split=BENCH_IMAGE_SPLIT,
+        ledger_path=out_base / "ledger.jsonl",
+        sink=sink,
+    )
+    finished = time.perf_counter()
+
+    latencies = [sink.done_at[p] - pulled_at[p] for p in sink.done_at if p in pulled_at]
+    first_pull = min(pulled_at.values()) if pulled_at else finished
+    ocr_seconds = max(finished - first_pull, 1e-9)
+    num_pdfs = len(sink.done_at)
+    num_slots = sum(sink.slots.values())
+
+    def ms(v):
+        return None if v is None else round(v * 1000, 2)
+
+    return {
+        "case": case.key(),
+        **asdict(case),
+        "num_pdfs": num_pdfs,
+        "num_slots": num_slots,
+        "wall_seconds": round(finished - started, 3),
+        "startup_seconds": round(first_pull - started, 3),
+        "ocr_seconds": round(ocr_seconds, 3),
+        "pdfs_per_second": round(num_pdfs / ocr_seconds, 4),
+        "slots_per_second": round(num_slots / ocr_seconds, 4),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p90": ms(percentile(latencies, 90)),
+            "p99": ms(percentile(latencies, 99)),
+        },
+        "peak_rss_mb": peakRssMb(),
+    }
+
+
+def runBenchMatrix(cases: list[BenchCase], pdf_items: list[tuple[str, Path]], model_dir: str) -> dict:
+    # un proceso spawn por caso (no hereda memoria ni hilos del anterior)
+    ctx = mp.get_context("spawn")
+    items = [(category, str(path)) for category, path in pdf_items]
+
+    results = []
+    for case in cases:
+        print(f"\n=== benchmark {case.key()} ({len(items)} pdfs) ===")
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            result = pool.submit(runBenchCase, asdict(case), items, model_dir).result()
+        print(
+            f"{result['case']}: {result['slots_per_second']:.2f} slots/s, "
+            f"p99={result['latency_ms']['p99']} ms, rss={result['peak_rss_mb']['self']:.0f} MB"
+        )
+        results.append(result)
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "model_dir": model_dir,
+        "num_pdfs": len(items),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": mp.cpu_count()},
+        "results": results,
+    }
+
+
+def compareToBaseline(report: dict, baseline: dict, tolerance: float = 0.10) -> list[dict]:
+    # regresiones por caso: menos throughput o más p99/rss que la base (± tolerancia)
+    base_by_case = {r["case"]: r for r in baseline.get("results", [])}
+    regressions = []
+
+    for result in report["results"]:
+        base = base_by_case.get(result["case"])
+        if base is None:
+            continue
+
+        checks = [
+            ("slots_per_second", result["slots_per_second"], base["slots_per_second"], "lower"),
+            ("latency_p99_ms", result["latency_ms"]["p99"], base["latency_ms"]["p99"], "higher"),
+            ("peak_rss_mb", result["peak_rss_mb"]["self"], base["peak_rss_mb"]["self"], "higher"),
+        ]
+        for metric, current, previous, bad in checks:
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            if (bad == "lower" and change < -tolerance) or (bad == "higher" and change > tolerance):
+                regressions.append(
+                    {
+                        "case": result["case"],
+                        "metric": metric,
+                        "baseline": previous,
+                        "current": current,
+                        "change": round(change, 4),
+                    }
+                )
+
+    return regressions
+
+
+def saveBenchReport(report: dict, out_path: Path | None = None) -> Path:
+    # guarda el reporte junto a las demás tablas de métricas
+    METRICS_ROOT.mkdir(parents=True, exist_ok=True)
+    if out_path is None:
+        run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        out_path = METRICS_ROOT / f"ocr_bench_{run_id}.json"
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(out_path).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return Path(out_path)
+
+
+def loadBaseline(path: Path = BASELINE_PATH) -> dict | None:
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
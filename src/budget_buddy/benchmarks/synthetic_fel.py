@@ -0,0 +1,162 @@
+from pathlib import Path
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.budget_buddy.layout.sat_template import loadSatTemplate, regionToBoxPx
+
+
+ROOT = Path(".")
+SYNTHETIC_ROOT = ROOT / "data" / "interim" / "bench" / "synthetic_pdfs"
+SYNTHETIC_DPI = 300
+
+EMISORES = [
+    "DISTRIBUIDORA EL CENTRO, SOCIEDAD ANONIMA",
+    "SUPERMERCADOS LA ECONOMIA, S.A.",
+    "FARMACIA SAN JOSE",
+    "RESTAURANTE LOS ANTOJITOS",
+    "COMERCIAL ELECTRONICA GUATEMALA, S.A.",
+    "GASOLINERA LA REFORMA",
+]
+RECEPTORES = ["CONSUMIDOR FINAL", "JUAN PEREZ LOPEZ", "MARIA GARCIA", "EMPRESA DEMO, S.A."]
+PRODUCTOS = [
+    "AGUA PURA 600ML",
+    "CAFE MOLIDO 400G",
+    "ARROZ BLANCO 1LB",
+    "CARGADOR USB-C",
+    "ACETAMINOFEN 500MG",
+    "ALMUERZO EJECUTIVO",
+    "GASOLINA SUPER",
+    "PAPEL BOND CARTA",
+    "AUDIFONOS BLUETOOTH",
+]
+
+
+def getFont(size: int):
+    # pillow >= 10.1 escala la fuente por defecto; si no, se intenta dejavu
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        try:
+            return ImageFont.truetype("DejaVuSans.ttf", size)
+        except OSError:
+            return ImageFont.load_default()
+
+
+def buildInvoiceFields(rng: random.Random) -> dict:
+    # campos de una factura fel inventada (solo para medir velocidad, no exactitud)
+    items = []
+    for _ in range(rng.randint(2, 7)):
+        qty = rng.randint(1, 5)
+        price = round(rng.uniform(3, 450), 2)
+        items.append({"qty": qty, "desc": rng.choice(PRODUCTOS), "price": price, "total": round(qty * price, 2)})
+
+    return {
+        "emisor": rng.choice(EMISORES),
+        "nit_emisor": f"{rng.randint(1000000, 99999999)}-{rng.randint(0, 9)}",
+        "receptor": rng.choice(RECEPTORES),
+        "nit_receptor": rng.choice(["CF", f"{rng.randint(1000000, 9999999)}-{rng.randint(0, 9)}"]),
+        "fecha": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "serie": f"{rng.getrandbits(32):08X}",
+        "numero": str(rng.randint(100000000, 4294967295)),
+        "autorizacion": "-".join(f"{rng.getrandbits(16):04X}" for _ in range(5)),
+        "items": items,
+        "total": round(sum(i["total"] for i in items), 2),
+    }
+
+
+def drawInvoicePage(fields: dict, width: int, height: int, regions: dict) -> Image.Image:
+    # página en gris con el texto dentro de las cajas de config/sat_template.yaml
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    font = getFont(max(12, height // 110))
+    small = getFont(max(10, height // 140))
+    line_h = int(font.size * 1.4) if hasattr(font, "size") else 40
+
+    draw.text((width * 0.06, height * 0.05), "DOCUMENTO TRIBUTARIO ELECTRONICO - FACTURA", font=font, fill=0)
+
+    def box(name):
+        return regionToBoxPx(regions[name], width, height) if name in regions else None
+
+    header = box("header")
+    if header:
+        left, top, _, _ = header
+        lines = [
+            fields["emisor"],
+            f"NIT Emisor: {fields['nit_emisor']}",
+            f"Serie: {fields['serie']}   Numero de DTE: {fields['numero']}",
+            f"Numero de autorizacion: {fields['autorizacion']}",
+            f"Fecha y hora de emision: {fields['fecha']}",
+            f"NIT Receptor: {fields['nit_receptor']}   Nombre Receptor: {fields['receptor']}",
+        ]
+        for i, line in enumerate(lines):
+            draw.text((left + 10, top + 10 + i * line_h), line, font=font, fill=0)
+
+    items = box("items_table")
+    if items:
+        left, top, right, bottom = items
+        cols = [left + 10, left + (right - left) * 0.12, left + (right - left) * 0.65, left + (right - left) * 0.82]
+        draw.rectangle(items, outline=0, width=2)
+        for x, title in zip(cols, ["Cant.", "Descripcion", "P. Unitario", "Total"]):
+            draw.text((x, top + 8), title, font=font, fill=0)
+        draw.line((left, top + line_h + 10, right, top + line_h + 10), fill=0, width=2)
+
+        y = top + line_h + 18
+        for item in fields["items"]:
+            if y + line_h > bottom:
+                break
+            row = [str(item["qty"]), item["desc"], f"Q {item['price']:,.2f}", f"Q {item['total']:,.2f}"]
+            for x, value in zip(cols, row):
+                draw.text((x, y), value, font=font, fill=0)
+            y += line_h
+
+    totals = box("totals_hint")
+    if totals:
+        left, top, _, _ = totals
+        draw.text((left + 10, top + 10), f"TOTAL: Q {fields['total']:,.2f}", font=font, fill=0)
+
+    footer = box("footer_hint")
+    if footer:
+        left, top, _, _ = footer
+        draw.text((left + 10, top + 10), "Certificador: INFILE, S.A. NIT: 12521337", font=small, fill=0)
+        draw.text((left + 10, top + 10 + line_h), "Sujeto a pagos trimestrales ISR", font=small, fill=0)
+
+    return img
+
+
+def generateSyntheticInvoices(
+    num_invoices: int = 20,
+    out_dir: Path = SYNTHETIC_ROOT,
+    seed: int = 0,
+    categories: tuple[str, ...] = ("sintetica_a", "sintetica_b"),
+    pages: int = 1,
+    overwrite: bool = False,
+) -> list[tuple[str, Path]]:
+    # pdfs de una o más páginas rasterizadas (pillow), deterministas por semilla
+    tpl = loadSatTemplate()
+    width = int(tpl["page_size"].get("width", 2550))
+    height = int(tpl["page_size"].get("height", 3300))
+
+    rng = random.Random(seed)
+    items = []
+    for idx in range(num_invoices):
+        category = categories[idx % len(categories)]
+        pdf_path = Path(out_dir) / category / f"synthetic_{seed}_{idx:05d}.pdf"
+
+        # se consume el rng igual aunque el pdf exista para mantener el determinismo
+        page_fields = [buildInvoiceFields(rng) for _ in range(max(1, pages))]
+        items.append((category, pdf_path))
+        if pdf_path.exists() and not overwrite:
+            continue
+
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        page_imgs = [drawInvoicePage(f, width, height, tpl["regions"]) for f in page_fields]
+        page_imgs[0].save(
+            pdf_path,
+            format="PDF",
+            resolution=SYNTHETIC_DPI,
+            save_all=True,
+            append_images=page_imgs[1:],
+        )
+
+    return items
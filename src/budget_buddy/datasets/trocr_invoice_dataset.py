@@ -5,15 +5,27 @@ from PIL import Image, ImageOps, ImageFilter
 from torch.utils.data import Dataset
 
 from src.budget_buddy.layout.sat_template import getSatRegionsBoxes
+from src.budget_buddy.preprocessing.batch_preprocess import batchPreprocess, getProcessorParams
+from src.budget_buddy.preprocessing.hash_index import sha256Cached
+from src.budget_buddy.preprocessing.image_cache import getImageCache, openCachedImage
 
 
 ROOT = Path(".").resolve()
 TRAIN_SPLIT_ROOT = ROOT / "data" / "splits" / "train"
 IMAGES_TRAIN_ROOT = ROOT / "data" / "interim" / "images" / "train"
+# dpi con el que make build-images llena el cache
+TRAIN_IMAGE_DPI = 450
 
 
-def findImageForPdf(category: str, stem: str) -> Path | None:
-    # buscar imagen principal del pdf
+def findImageForPdf(category: str, stem: str, dpi: int = TRAIN_IMAGE_DPI) -> Path | None:
+    # buscar imagen principal del pdf: página 1 en el cache npy (por sha256)
+    pdf_path = TRAIN_SPLIT_ROOT / category / f"{stem}.pdf"
+    if pdf_path.exists():
+        found = getImageCache().pagePaths(sha256Cached(pdf_path), dpi, max_pages=1)
+        if found is not None:
+            return found[1][0]
+
+    # pngs de antes del cache npy (make images-migrate los convierte)
     img_dir = IMAGES_TRAIN_ROOT / category
     if not img_dir.exists():
         return None
@@ -130,19 +142,23 @@ class TrOcrInvoiceDataset(Dataset):
         max_target_length: int = 128,
         image_mode: str = "full",
         use_augment: bool = False,
+        vectorized_preprocess: bool = False,
     ):
         self.processor = processor
         self.pairs = pairs
         self.max_target_length = max_target_length
         self.image_mode = image_mode
         self.use_augment = use_augment
+        self.preprocess_params = getProcessorParams(processor) if vectorized_preprocess else None
 
     def __len__(self) -> int:
         return len(self.pairs)
 
     def __getitem__(self, idx: int) -> dict[str, Any]:
         row = self.pairs[idx]
-        img = Image.open(row["image_path"]).convert("RGB")
+        # en modo vectorizado se trabaja en gris y el rgb aparece recién en el tensor
+        img = openCachedImage(row["image_path"])
+        img = img.convert("L" if self.preprocess_params else "RGB")
         text = row["target_text"]
 
         # recortar encabezado sat si se pidió
@@ -165,7 +181,10 @@ class TrOcrInvoiceDataset(Dataset):
             # blur suave
             img = img.filter(ImageFilter.GaussianBlur(radius=0.5))
 
-        pixel_values = self.processor(images=img, return_tensors="pt").pixel_values[0]
+        if self.preprocess_params:
+            pixel_values = batchPreprocess([img], self.preprocess_params)[0]
+        else:
+            pixel_values = self.processor(images=img, return_tensors="pt").pixel_values[0]
 
         # codificar texto objetivo
         with self.processor.as_target_processor():
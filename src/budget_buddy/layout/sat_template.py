@@ -5,6 +5,14 @@ import yaml
 ROOT = Path(".")
 SAT_TEMPLATE_PATH = ROOT / "config" / "sat_template.yaml"
 
+# presupuesto de decodificación cuando la región no define uno
+DEFAULT_DECODE = {
+    "max_new_tokens": 256,
+    "repetition_cutoff": None,
+    "repetition_max_ngram": 4,
+    "stop_pattern": None,
+}
+
 
 def loadSatTemplate(config_path: Path | None = None):
     # lee el yaml de plantilla sat
@@ -57,4 +65,25 @@ def getSatRegionsBoxes(img_width: int, img_height: int, config_path: Path | None
         box = regionToBoxPx(regions_cfg[name], img_width, img_height)
         boxes[name] = box
 
-    return boxes
\ No newline at end of file
+    return boxes
+
+
+def getActiveRegions(config_path: Path | None = None):
+    # devuelve dict region_name -> coords normalizadas de las regiones activas
+    tpl = loadSatTemplate(config_path=config_path)
+    return {
+        name: tpl["regions"][name]
+        for name in tpl["active_regions"]
+        if name in tpl["regions"]
+    }
+
+
+def getRegionDecodeConfigs(config_path: Path | None = None):
+    # devuelve dict region_name -> reglas de decodificación (con defaults)
+    tpl = loadSatTemplate(config_path=config_path)
+
+    decode_cfgs = {}
+    for name, region_cfg in tpl["regions"].items():
+        decode_cfgs[name] = {**DEFAULT_DECODE, **(region_cfg.get("decode") or {})}
+
+    return decode_cfgs
@@ -0,0 +1,65 @@
+import re
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+
+class RepetitionStop(StoppingCriteria):
+    # corta secuencias cuyo final es el mismo n-grama repetido `cutoff` veces seguidas
+    def __init__(self, cutoff: int, max_ngram: int = 4):
+        self.cutoff = cutoff
+        self.max_ngram = max_ngram
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        seq_len = input_ids.shape[1]
+
+        for n in range(1, self.max_ngram + 1):
+            span = n * self.cutoff
+            if span > seq_len - 1:  # no cuenta el token inicial del decoder
+                break
+            tail = input_ids[:, -span:].reshape(input_ids.shape[0], self.cutoff, n)
+            done |= (tail == tail[:, :1, :]).all(dim=2).all(dim=1)
+
+        return done
+
+
+class PatternStop(StoppingCriteria):
+    # corta cuando el texto generado contiene el patrón (p. ej. salto de línea)
+    def __init__(self, tokenizer, pattern: str):
+        self.tokenizer = tokenizer
+        self.regex = re.compile(pattern)
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        texts = self.tokenizer.batch_decode(input_ids[:, 1:], skip_special_tokens=True)
+        return torch.tensor(
+            [bool(self.regex.search(t)) for t in texts],
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+def buildStoppingCriteria(processor, decode_cfg: dict) -> StoppingCriteriaList | None:
+    # reglas de parada opcionales de la región
+    criteria = []
+
+    if decode_cfg.get("repetition_cutoff"):
+        criteria.append(
+            RepetitionStop(
+                cutoff=int(decode_cfg["repetition_cutoff"]),
+                max_ngram=int(decode_cfg.get("repetition_max_ngram", 4)),
+            )
+        )
+
+    if decode_cfg.get("stop_pattern"):
+        criteria.append(PatternStop(processor.tokenizer, decode_cfg["stop_pattern"]))
+
+    return StoppingCriteriaList(criteria) if criteria else None
+
+
+def countDecodeSteps(generated_ids: torch.LongTensor, pad_token_id: int | None) -> list[int]:
+    # pasos reales por secuencia: tokens generados sin contar inicio ni padding final
+    new_tokens = generated_ids[:, 1:]
+    if pad_token_id is None:
+        return [new_tokens.shape[1]] * new_tokens.shape[0]
+    return (new_tokens != pad_token_id).sum(dim=1).tolist()
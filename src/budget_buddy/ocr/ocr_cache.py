@@ -0,0 +1,181 @@
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+ROOT = Path(".")
+OCR_CACHE_PATH = ROOT / "data" / "interim" / "ocr_cache" / "ocr_results.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def getModelIdentity(model_dir: str) -> str:
+    # identidad del modelo: nombre hf o huella de los archivos locales
+    p = Path(model_dir)
+    if not p.is_dir():
+        return model_dir
+
+    h = hashlib.sha256(str(p.resolve()).encode("utf-8"))
+    for f in sorted(p.rglob("*")):
+        if f.suffix not in {".json", ".bin", ".safetensors"}:
+            continue
+        st = f.stat()
+        h.update(f"{f.relative_to(p)}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return f"{p.name}@{h.hexdigest()[:16]}"
+
+
+class OcrResultCache:
+    # cache persistente texto-por-recorte con expulsión lru por tamaño
+    def __init__(
+        self,
+        model_dir: str,
+        db_path: Path = OCR_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        generation_params: dict | None = None,
+    ):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.namespace = json.dumps(
+            {"model": getModelIdentity(model_dir), "generation": generation_params or {}},
+            sort_keys=True,
+        )
+        self.hits = 0
+        self.misses = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ocr_results_access ON ocr_results(last_access)"
+        )
+        self._conn.commit()
+        # total local: putMany no recorre la tabla salvo cuando pasa de max_bytes
+        self._size_bytes = self._totalBytesLocked()
+
+    def makeKey(self, img, params: dict | None = None) -> str:
+        # hash de pixeles + modelo + parámetros de generación y de preprocess (namespace)
+        h = hashlib.sha256(self.namespace.encode("utf-8"))
+        h.update(json.dumps(params or {}, sort_keys=True).encode("utf-8"))
+        h.update(f"{img.mode}:{img.size[0]}x{img.size[1]}".encode("utf-8"))
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    def getMany(self, keys: list[str]) -> dict[str, str]:
+        # busca varias llaves y refresca su último acceso
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        if not unique:
+            return found
+
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, text FROM ocr_results WHERE key IN ({marks})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE ocr_results SET last_access = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+
+        self.hits += sum(1 for k in keys if k in found)
+        self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def get(self, key: str) -> str | None:
+        return self.getMany([key]).get(key)
+
+    def putMany(self, entries: dict[str, str]):
+        # guarda textos nuevos y aplica el presupuesto de disco
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [
+            (k, txt, len(k) + len(txt.encode("utf-8")), now)
+            for k, txt in entries.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ocr_results(key, text, size_bytes, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            # una llave reemplazada cuenta de más; _evictLocked recalcula desde la tabla
+            self._size_bytes += sum(size for _, _, size, _ in rows)
+            if self._size_bytes > self.max_bytes:
+                self._evictLocked()
+
+    def put(self, key: str, text: str):
+        self.putMany({key: text})
+
+    def _totalBytesLocked(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM ocr_results"
+        ).fetchone()[0]
+
+    def _evictLocked(self) -> int:
+        # expulsa entradas menos usadas hasta quedar bajo max_bytes
+        # el total se relee de la tabla: otros procesos (--workers) escriben en el mismo sqlite
+        total = self._totalBytesLocked()
+        self._size_bytes = total
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        cursor = self._conn.execute(
+            "SELECT key, size_bytes FROM ocr_results ORDER BY last_access ASC"
+        )
+        to_delete = []
+        for key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+            removed += 1
+
+        self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", to_delete)
+        self._conn.commit()
+        self._size_bytes = total
+        return removed
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evictLocked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ocr_results"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "size_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,71 @@
+from pathlib import Path
+import copy
+import yaml
+
+
+ROOT = Path(".")
+OCR_CONFIG_PATH = ROOT / "config" / "ocr.yaml"
+
+# valores por defecto si el yaml no define alguna clave
+DEFAULT_OCR_CONFIG = {
+    "blank_filter": {
+        "enabled": True,
+        "ink_threshold": 200,
+        "min_ink_ratio": 0.002,
+        "min_std": 4.0,
+        "min_ink_rows": 3,
+        "row_ink_ratio": 0.005,
+        "stride": 2,
+    },
+    "preprocess": {
+        "method": "vectorized",
+    },
+    "raster": {
+        "method": "page",
+        "max_side_px": None,
+        "min_dpi": 150,
+    },
+    "text_layer": {
+        "enabled": True,
+        "min_chars": 20,
+        "min_valid_ratio": 0.9,
+        "expect": {"header": r"(?i)\bnit\b"},
+    },
+    "image_cache": {
+        "max_gb": 40,
+        "low_watermark": 0.9,
+    },
+    "server": {
+        "models": ["qantev/trocr-base-spanish"],
+        "device": "auto",
+        "quantize": None,
+        "backend": "torch",
+        "dpi": 300,
+        "max_batch": 16,
+        "window_ms": 15,
+        "metrics_window": 2048,
+    },
+}
+
+
+def mergeConfig(base: dict, override: dict) -> dict:
+    # mezcla recursiva: lo del yaml pisa los defaults
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = mergeConfig(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def loadOcrConfig(config_path: Path | None = None) -> dict:
+    # lee config/ocr.yaml (puede estar vacío)
+    cfg_path = config_path or OCR_CONFIG_PATH
+    if not cfg_path.exists():
+        return copy.deepcopy(DEFAULT_OCR_CONFIG)
+
+    with cfg_path.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    return mergeConfig(DEFAULT_OCR_CONFIG, data.get("ocr", {}))
@@ -0,0 +1,163 @@
+from datetime import datetime
+from pathlib import Path
+import json
+import threading
+
+from tqdm import tqdm
+
+from src.budget_buddy.utils.lazy_import import lazyImport
+from src.budget_buddy.utils.stats import percentile
+from src.budget_buddy.utils.timing import peakRssMb
+
+pd = lazyImport("pandas")
+
+
+RUN_SUMMARY_NAME = "run_summary.json"
+STAGES = ("raster", "crop", "preprocess", "encoder", "decode", "write")
+
+
+def summarizeSources(records: list[dict]) -> dict:
+    # cuánto resolvió la capa de texto del pdf sin raster ni ocr
+    invoices = len(records)
+    slots = sum(r["slots"] for r in records)
+    full = sum(1 for r in records if r.get("source") == "text_layer")
+    mixed = sum(1 for r in records if r.get("source") == "mixed")
+    layer_slots = sum(r.get("text_layer_slots", 0) for r in records)
+    return {
+        "invoices": full,
+        "mixed_invoices": mixed,
+        "invoice_fraction": round(full / invoices, 4) if invoices else None,
+        "slots": layer_slots,
+        "slot_fraction": round(layer_slots / slots, 4) if slots else None,
+    }
+
+
+def buildTextLayerReport(df):
+    # por categoría: facturas y regiones servidas por la capa de texto vs ocr (df de loadOcrRun)
+    df = df.copy()
+    if "source" not in df.columns:
+        df["source"] = "ocr"
+    df["source"] = df["source"].fillna("ocr")
+    region_cols = [c for c in df.columns if c.startswith("source_")]
+
+    def summarize(group):
+        row = {
+            "invoices": len(group),
+            "text_layer": int((group["source"] == "text_layer").sum()),
+            "mixed": int((group["source"] == "mixed").sum()),
+            "ocr": int((group["source"] == "ocr").sum()),
+        }
+        row["text_layer_fraction"] = round(row["text_layer"] / max(row["invoices"], 1), 4)
+        for col in region_cols:
+            served = group[col].dropna()
+            row[f"{col.removeprefix('source_')}_text_layer_fraction"] = (
+                round(float((served == "text_layer").mean()), 4) if len(served) else None
+            )
+        return row
+
+    rows = [{"category": cat, **summarize(group)} for cat, group in df.groupby("category")]
+    rows.append({"category": "__all__", **summarize(df)})
+    return pd.DataFrame(rows)
+
+
+class RunMetrics:
+    # métricas por factura de una corrida; reemplaza los prints por región con una barra opcional
+    def __init__(self, progress: bool = False, position: int = 0, desc: str = "ocr"):
+        self.records = []
+        self.skipped = 0
+        self._slots = 0
+        self._hits = 0
+        self._lock = threading.Lock()
+        self._bar = tqdm(
+            unit="pdf",
+            desc=desc,
+            position=position,
+            disable=not progress,
+            dynamic_ncols=True,
+        )
+
+    def addInvoice(self, payload: dict, write_seconds: float):
+        # resume el payload ya escrito (los tiempos de escritura no caben en el propio payload)
+        steps = payload.get("decode_steps") or {}
+        regions = payload.get("regions") or {}
+        layer_slots = sum(1 for r in regions.values() if r.get("source") == "text_layer")
+        record = {
+            "timings": {**(payload.get("timings") or {}), "write": write_seconds},
+            "slots": len(steps) + layer_slots,
+            "source": payload.get("source", "ocr"),
+            "text_layer_slots": layer_slots,
+            "cache_hits": payload.get("cache_hits", 0),
+            "blank": len(payload.get("skipped_slots") or {}),
+            "decode_steps": sum(n for n in steps.values() if n),
+            "peak_rss_mb": payload.get("peak_rss_mb"),
+        }
+        with self._lock:
+            self.records.append(record)
+            self._bar.update(1)
+            self._slots += record["slots"]
+            self._hits += record["cache_hits"]
+            self._bar.set_postfix(slots=self._slots, cache=self._hits, refresh=False)
+
+    def addSkipped(self):
+        # pdfs con salida previa en la corrida (resume sin --overwrite)
+        with self._lock:
+            self.skipped += 1
+
+    def state(self) -> dict:
+        # lo que un worker fork devuelve al padre (debe ser picklable)
+        with self._lock:
+            return {"records": list(self.records), "skipped": self.skipped}
+
+    def merge(self, state: dict):
+        with self._lock:
+            self.records.extend(state["records"])
+            self.skipped += state["skipped"]
+
+    def summary(self, run_id: str, wall_seconds: float, **extra) -> dict:
+        # totales de la corrida y percentiles por etapa (ms por factura)
+        with self._lock:
+            records = list(self.records)
+
+        def ms(v):
+            return None if v is None else round(v * 1000, 2)
+
+        stages = {}
+        for stage in STAGES:
+            values = [r["timings"][stage] for r in records if stage in r["timings"]]
+            if not values:
+                continue
+            stages[stage] = {
+                "total_s": round(sum(values), 3),
+                "mean_ms": ms(sum(values) / len(values)),
+                "p50_ms": ms(percentile(values, 50)),
+                "p90_ms": ms(percentile(values, 90)),
+                "p99_ms": ms(percentile(values, 99)),
+            }
+
+        invoice_rss = [r["peak_rss_mb"] for r in records if r["peak_rss_mb"] is not None]
+        wall_seconds = max(wall_seconds, 1e-9)
+        return {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            **extra,
+            "invoices": len(records),
+            "skipped_existing": self.skipped,
+            "wall_seconds": round(wall_seconds, 3),
+            "invoices_per_second": round(len(records) / wall_seconds, 4),
+            "slots": sum(r["slots"] for r in records),
+            "cache_hits": sum(r["cache_hits"] for r in records),
+            "blank_slots": sum(r["blank"] for r in records),
+            "decode_steps": sum(r["decode_steps"] for r in records),
+            "text_layer": summarizeSources(records),
+            "stages": stages,
+            "peak_rss_mb": {"max_invoice": max(invoice_rss, default=None), **peakRssMb()},
+        }
+
+    def save(self, run_root: Path, summary: dict) -> Path:
+        out_path = Path(run_root) / RUN_SUMMARY_NAME
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        return out_path
+
+    def close(self):
+        self._bar.close()
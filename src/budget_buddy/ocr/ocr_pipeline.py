@@ -0,0 +1,159 @@
+import multiprocessing as mp
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+
+# marca de fin que viaja por las colas entre etapas
+STOP = object()
+# cada cuánto una etapa bloqueada en una cola revisa si se canceló el pipeline
+POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineConfig:
+    raster_workers: int = 2
+    preprocess_workers: int = 2
+    writer_workers: int = 1
+    queue_size: int = 8
+
+
+def iterQueue(q: queue.Queue):
+    # consume una cola hasta encontrar STOP
+    while True:
+        item = q.get()
+        if item is STOP:
+            return
+        yield item
+
+
+def putOrCancel(q: queue.Queue, item, cancel: threading.Event | None) -> bool:
+    # put bloqueante que se rinde si el pipeline se canceló (nadie va a consumir)
+    while True:
+        try:
+            q.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            if cancel is not None and cancel.is_set():
+                return False
+
+
+def getOrCancel(q: queue.Queue, cancel: threading.Event | None):
+    # get bloqueante; STOP si el pipeline se canceló (lo que quede en la cola se descarta)
+    while True:
+        if cancel is not None and cancel.is_set():
+            return STOP
+        try:
+            return q.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            continue
+
+
+def drainQueue(q: queue.Queue):
+    # vacía la cola para desbloquear a quien esté esperando en put
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+
+def startProcessStage(
+    args_iter,
+    fn,
+    out_q: queue.Queue,
+    workers: int,
+    max_inflight: int,
+    errors: list,
+    name: str = "raster",
+    cancel: threading.Event | None = None,
+) -> threading.Thread:
+    # alimenta un process pool con a lo sumo max_inflight tareas pendientes
+    # con cancel activado deja de enviar tareas y descarta las que no empezaron
+    cancel = cancel or threading.Event()
+
+    def feeder():
+        inflight = deque()
+
+        def emitOldest():
+            args, fut = inflight.popleft()
+            try:
+                result = fut.result()
+            except Exception as exc:
+                print(f"\t[{name}] error: {exc}")
+                errors.append(exc)
+                return
+            putOrCancel(out_q, (args, result), cancel)  # bloquea si la siguiente etapa va atrasada
+
+        # spawn evita heredar hilos de torch en los hijos
+        ctx = mp.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx)
+        failed = False
+        try:
+            for args in args_iter:
+                if cancel.is_set():
+                    break
+                inflight.append((args, pool.submit(fn, *args)))
+                while len(inflight) >= max(1, max_inflight) and not cancel.is_set():
+                    emitOldest()
+
+            while inflight and not cancel.is_set():
+                emitOldest()
+        except Exception as exc:
+            errors.append(exc)
+            failed = True
+        finally:
+            # sin esto los hijos quedan vivos y el join de atexit de concurrent.futures cuelga la salida
+            pool.shutdown(wait=True, cancel_futures=failed or cancel.is_set())
+            putOrCancel(out_q, STOP, cancel)
+
+    thread = threading.Thread(target=feeder, name=f"{name}-feeder", daemon=True)
+    thread.start()
+    return thread
+
+
+def startThreadStage(
+    fn,
+    in_q: queue.Queue,
+    out_q: queue.Queue | None,
+    workers: int,
+    errors: list,
+    name: str,
+    cancel: threading.Event | None = None,
+) -> threading.Thread:
+    # n hilos consumen in_q; el resultado (si no es None) pasa a out_q
+    def worker():
+        while True:
+            item = getOrCancel(in_q, cancel)
+            if item is STOP:
+                putOrCancel(in_q, STOP, cancel)  # deja la marca para los demás hilos
+                return
+            try:
+                result = fn(item)
+            except Exception as exc:
+                print(f"\t[{name}] error: {exc}")
+                errors.append(exc)
+                continue
+            if result is not None and out_q is not None:
+                if not putOrCancel(out_q, result, cancel):
+                    return
+
+    threads = [
+        threading.Thread(target=worker, name=f"{name}-{i}", daemon=True)
+        for i in range(max(1, workers))
+    ]
+    for t in threads:
+        t.start()
+
+    # cierra la etapa cuando terminan todos sus hilos
+    def closer():
+        for t in threads:
+            t.join()
+        if out_q is not None:
+            putOrCancel(out_q, STOP, cancel)
+
+    closer_thread = threading.Thread(target=closer, name=f"{name}-closer", daemon=True)
+    closer_thread.start()
+    return closer_thread
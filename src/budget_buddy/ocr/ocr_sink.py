@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from pathlib import Path
+import json
+import os
+import threading
+
+from src.budget_buddy.utils.lazy_import import lazyImport
+
+pd = lazyImport("pandas")
+
+
+SHARDS_DIRNAME = "shards"
+PARQUET_NAME = "ocr_results.parquet"
+DEFAULT_SHARD_RECORDS = 5000
+SINK_KINDS = ("json", "jsonl")
+
+
+class JsonFileSink:
+    # un json indentado por factura: <run>/<categoria>/<stem>.json
+    def __init__(self, run_root: Path, verbose: bool = False):
+        self.run_root = Path(run_root)
+        self.verbose = verbose
+
+    def outputPath(self, pdf_path: Path, category: str) -> Path:
+        out_dir = self.run_root / category
+        out_dir.mkdir(parents=True, exist_ok=True)
+        return out_dir / (Path(pdf_path).stem + ".json")
+
+    def exists(self, pdf_path: Path, category: str) -> Path | None:
+        out_path = self.outputPath(pdf_path, category)
+        return out_path if out_path.exists() else None
+
+    def write(self, pdf_path: Path, category: str, payload: dict) -> Path:
+        # tmp + replace para no dejar json a medias
+        out_path = self.outputPath(pdf_path, category)
+        tmp_path = out_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(out_path)
+
+        if self.verbose:
+            print(f"\tguardado json OCR en: {out_path}")
+        return out_path
+
+    def close(self):
+        pass
+
+
+class JsonlShardSink:
+    # registros append-only en <run>/shards/part-<pid>-<n>.jsonl; un shard por proceso
+    def __init__(self, run_root: Path, shard_records: int = DEFAULT_SHARD_RECORDS, verbose: bool = False):
+        self.run_root = Path(run_root)
+        self.verbose = verbose
+        self.shard_dir = self.run_root / SHARDS_DIRNAME
+        self.shard_records = max(1, shard_records)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._path = None
+        self._count = 0
+        self._seq = 0
+
+        # pdfs ya escritos en esta corrida (para --resume sobre la misma carpeta)
+        self._done = {
+            (rec.get("category"), rec.get("pdf_path")): path
+            for path, rec in iterShardRecords(self.run_root)
+        }
+
+    def exists(self, pdf_path: Path, category: str) -> Path | None:
+        return self._done.get((category, str(pdf_path)))
+
+    def _openShardLocked(self):
+        # con --workers el sink se hereda por fork: cada pid abre sus propios shards
+        if self._file is not None:
+            self._file.close()
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            path = self.shard_dir / f"part-{os.getpid()}-{self._seq:05d}.jsonl"
+            self._seq += 1
+            if not path.exists():
+                break
+        self._path = path
+        self._file = path.open("a", encoding="utf-8")
+        self._count = 0
+
+    def write(self, pdf_path: Path, category: str, payload: dict) -> Path:
+        line = json.dumps(payload, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._file = None
+                self._seq = 0
+            if self._file is None or self._count >= self.shard_records:
+                self._openShardLocked()
+
+            self._file.write(line)
+            self._file.flush()
+            self._count += 1
+            self._done[(category, str(pdf_path))] = self._path
+
+            path = self._path
+
+        if self.verbose:
+            print(f"\tregistro OCR agregado a: {path}")
+        return path
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+
+
+def makeSink(kind: str, run_root: Path, shard_records: int = DEFAULT_SHARD_RECORDS, verbose: bool = False):
+    # verbose: un print por factura escrita (rompe la barra de --progress)
+    if kind == "json":
+        return JsonFileSink(run_root, verbose=verbose)
+    if kind == "jsonl":
+        return JsonlShardSink(run_root, shard_records=shard_records, verbose=verbose)
+    raise ValueError(f"sink desconocido: {kind} (usa {', '.join(SINK_KINDS)})")
+
+
+def iterShardRecords(run_root: Path):
+    # (shard, registro) de todos los shards; ignora una última línea cortada por un crash
+    shard_dir = Path(run_root) / SHARDS_DIRNAME
+    if not shard_dir.exists():
+        return
+
+    for path in sorted(shard_dir.glob("part-*.jsonl")):
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield path, json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def flattenRecord(payload: dict) -> dict:
+    # una fila por factura: textos por región y tiempos como columnas planas
+    row = {
+        "pdf_path": payload.get("pdf_path"),
+        "category": payload.get("category"),
+        "model": payload.get("model_name"),
+        "num_pages": payload.get("num_pages"),
+        "full_text": payload.get("full_text", ""),
+        "source": payload.get("source", "ocr"),
+    }
+
+    for name, region in (payload.get("regions") or {}).items():
+        row[f"region_{name}"] = region.get("text", "")
+        row[f"source_{name}"] = region.get("source", "ocr")
+        if region.get("decode_steps") is not None:
+            row[f"steps_{name}"] = region["decode_steps"]
+
+    for stage, seconds in (payload.get("timings") or {}).items():
+        if isinstance(seconds, (int, float)):
+            row[f"time_{stage}"] = seconds
+
+    for key in ("cache_hits", "peak_rss_mb"):
+        if payload.get(key) is not None:
+            row[key] = payload[key]
+
+    if payload.get("skipped_slots"):
+        row["skipped_slots"] = json.dumps(payload["skipped_slots"], ensure_ascii=False)
+
+    return row
+
+
+def compactRunToParquet(run_root: Path, out_path: Path | None = None) -> Path:
+    # junta los shards jsonl en una tabla parquet; si un pdf aparece dos veces gana el último
+    run_root = Path(run_root)
+    out_path = Path(out_path) if out_path else run_root / PARQUET_NAME
+
+    rows = [flattenRecord(rec) for _, rec in iterShardRecords(run_root)]
+    if not rows:
+        raise FileNotFoundError(f"no hay shards jsonl en {run_root / SHARDS_DIRNAME}")
+
+    df = pd.DataFrame(rows).drop_duplicates(subset=["category", "pdf_path"], keep="last")
+
+    tmp_path = out_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(out_path)
+
+    print(f"parquet ocr: {out_path} ({len(df)} facturas)")
+    return out_path
+
+
+def loadOcrRun(run_root: Path) -> pd.DataFrame:
+    # parquet compactado > shards jsonl > jsons por archivo (corridas viejas)
+    run_root = Path(run_root)
+
+    parquet_path = run_root / PARQUET_NAME
+    if parquet_path.exists():
+        return pd.read_parquet(parquet_path)
+
+    rows = [flattenRecord(rec) for _, rec in iterShardRecords(run_root)]
+    if rows:
+        return pd.DataFrame(rows).drop_duplicates(subset=["category", "pdf_path"], keep="last")
+
+    rows = []
+    for json_path in sorted(run_root.glob("*/*.json")):
+        with json_path.open("r", encoding="utf-8") as f:
+            rows.append(flattenRecord(json.load(f)))
+    return pd.DataFrame(rows)
@@ -0,0 +1,72 @@
+import multiprocessing as mp
+import traceback
+
+
+def shardIter(items, worker_id: int, workers: int):
+    # reparto round-robin determinista: el item i va al worker i % workers
+    for i, item in enumerate(items):
+        if i % workers == worker_id:
+            yield item
+
+
+def shareModelWeights(model):
+    # pesos en memoria compartida: los hijos los leen sin copiarlos;
+    # si ya vienen mapeados del checkpoint (page cache) no hace falta copiarlos a shm
+    if getattr(model, "mmap_weights_path", None):
+        return model
+    if hasattr(model, "share_memory"):
+        model.share_memory()
+    return model
+
+
+def runForkedWorkers(fn, workers: int) -> list:
+    # corre fn(worker_id) en n procesos fork; heredan el modelo ya cargado (copy-on-write)
+    if "fork" not in mp.get_all_start_methods():
+        raise RuntimeError("--workers requiere fork (linux/macos)")
+
+    ctx = mp.get_context("fork")
+    results_q = ctx.Queue()
+
+    def target(worker_id):
+        try:
+            results_q.put((worker_id, fn(worker_id), None))
+        except Exception:
+            results_q.put((worker_id, None, traceback.format_exc()))
+
+    procs = [
+        ctx.Process(target=target, args=(i,), name=f"ocr-worker-{i}")
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    # leer antes de join para que los hijos no se queden bloqueados en la cola
+    results = [None] * workers
+    errors = []
+    pending = set(range(workers))
+    while pending:
+        alive = any(p.is_alive() for p in procs)
+        try:
+            worker_id, result, error = results_q.get(timeout=1.0)
+        except Exception:
+            if not alive:
+                break
+            continue
+        pending.discard(worker_id)
+        results[worker_id] = result
+        if error:
+            print(f"\t[worker {worker_id}] error:\n{error}")
+            errors.append(worker_id)
+
+    for p in procs:
+        p.join()
+
+    # hijos que murieron sin reportar (p. ej. oom)
+    for worker_id in pending:
+        print(f"\t[worker {worker_id}] terminó sin resultado (exitcode={procs[worker_id].exitcode})")
+        errors.append(worker_id)
+
+    if errors:
+        raise RuntimeError(f"fallaron los workers: {sorted(errors)}")
+
+    return results
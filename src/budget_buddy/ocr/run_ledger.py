@@ -0,0 +1,98 @@
+from pathlib import Path
+from datetime import datetime
+import json
+import threading
+
+from src.budget_buddy.preprocessing.hash_index import sha256Cached
+
+
+ROOT = Path(".")
+OCR_LEDGER_PATH = ROOT / "data" / "interim" / "ocr_train" / "ocr_ledger.jsonl"
+
+
+class RunLedger:
+    # bitácora append-only de pdfs terminados por corrida y configuración
+    def __init__(
+        self,
+        run_id: str,
+        model_dir: str,
+        mode: str,
+        dpi: int,
+        ledger_path: Path = OCR_LEDGER_PATH,
+    ):
+        self.run_id = run_id
+        self.config = {"model": model_dir, "mode": mode, "dpi": dpi}
+        self.ledger_path = Path(ledger_path)
+        self._hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def readEntries(self) -> list[dict]:
+        # lee la bitácora tolerando una última línea cortada por un crash
+        if not self.ledger_path.exists():
+            return []
+
+        entries = []
+        with self.ledger_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def sameConfig(self, entry: dict) -> bool:
+        return all(entry.get(k) == v for k, v in self.config.items())
+
+    def completedRuns(self) -> list[str]:
+        # corridas de esta configuración que terminaron bien, en orden
+        return [
+            e["run_id"]
+            for e in self.readEntries()
+            if e.get("type") == "run" and e.get("status") == "completed" and self.sameConfig(e)
+        ]
+
+    def doneKeys(self, run_ids: set[str]) -> set[tuple[str, str]]:
+        # (pdf_path, sha256) ya terminados en las corridas dadas
+        return {
+            (e["pdf_path"], e["sha256"])
+            for e in self.readEntries()
+            if e.get("type") == "pdf" and e.get("run_id") in run_ids and self.sameConfig(e)
+        }
+
+    def hashPdf(self, pdf_path: Path) -> str:
+        # sha256 memoizado para no leer dos veces el mismo pdf; entre corridas sale del índice persistente
+        key = str(pdf_path)
+        if key not in self._hashes:
+            self._hashes[key] = sha256Cached(pdf_path)
+        return self._hashes[key]
+
+    def isDone(self, pdf_path: Path, done_keys: set[tuple[str, str]]) -> bool:
+        return (str(pdf_path), self.hashPdf(pdf_path)) in done_keys
+
+    def _append(self, entry: dict):
+        entry = {**entry, **self.config, "run_id": self.run_id, "ts": datetime.now().isoformat()}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.ledger_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+
+    def recordPdf(self, pdf_path: Path, category: str, out_path: Path):
+        # se llama después de escribir el json de salida
+        self._append(
+            {
+                "type": "pdf",
+                "pdf_path": str(pdf_path),
+                "category": category,
+                "sha256": self.hashPdf(pdf_path),
+                "out_path": str(out_path),
+            }
+        )
+
+    def markRunComplete(self, processed: int):
+        self._append({"type": "run", "status": "completed", "processed": processed})
@@ -43,6 +43,7 @@ class TrocrTrainingConfig:
     push_to_hub: bool = False
     image_mode: str = "full"
     use_augment: bool = False
+    vectorized_preprocess: bool = False
 
 
 def buildDatasets(
@@ -52,6 +53,7 @@ def buildDatasets(
     seed: int = 42,
     image_mode: str = "full",
     use_augment: bool = False,
+    vectorized_preprocess: bool = False,
 ):
     # recolecta pares (img, texto) para el dataset
     pairs = collectInvoicePairs()
@@ -63,6 +65,7 @@ def buildDatasets(
         max_target_length=max_target_length,
         image_mode=image_mode,
         use_augment=use_augment,
+        vectorized_preprocess=vectorized_preprocess,
     )
 
     n_total = len(full_dataset)
@@ -158,6 +161,7 @@ def saveMetrics(
             "seed": cfg.seed,
             "image_mode": cfg.image_mode,
             "use_augment": cfg.use_augment,
+            "vectorized_preprocess": cfg.vectorized_preprocess,
         },
         "train_metrics": train_metrics,
         "eval_metrics": eval_metrics,
@@ -191,6 +195,7 @@ def trainTrocrFel(
     seed: int = 42,
     image_mode: str = "full",
     use_augment: bool = False,
+    vectorized_preprocess: bool = False,
 ) -> str:
 
     run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
@@ -209,6 +214,7 @@ def trainTrocrFel(
         seed=seed,
         image_mode=image_mode,
         use_augment=use_augment,
+        vectorized_preprocess=vectorized_preprocess,
     )
 
     # asegurar directorio de salida
@@ -217,7 +223,8 @@ def trainTrocrFel(
     device = getDevice(device_preference)
     print(f"usando device: {device}")
 
-    processor, model = loadTrocrModel(cfg.model_name, device)
+    # para entrenar no se mapean los pesos: el optimizador los reescribe
+    processor, model = loadTrocrModel(cfg.model_name, device, mmap_weights=False)
 
     train_dataset, val_dataset = buildDatasets(
         processor=processor,
@@ -226,6 +233,7 @@ def trainTrocrFel(
         seed=cfg.seed,
         image_mode=cfg.image_mode,
         use_augment=cfg.use_augment,  # habilitar augment si toca
+        vectorized_preprocess=cfg.vectorized_preprocess,
     )
 
     # preparar kwargs compatibles con TrainingArguments
@@ -1,28 +1,87 @@
+from __future__ import annotations
+
 import argparse
 import json
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 import os
 
 os.environ["TRANSFORMERS_NO_TORCHVISION"] = "1"
 
-import torch
+from src.budget_buddy.utils.lazy_import import lazyImport
 from src.budget_buddy.utils.common_models import getDevice, loadTrocrModel
-
 from src.budget_buddy.utils.logging_config import quietHf
-quietHf()
+
+# torch se carga al primer uso: --help y los imports de este módulo no lo pagan
+torch = lazyImport("torch")
 
 from src.budget_buddy.utils.io import ensureDirs
-from src.budget_buddy.layout.sat_template import getSatRegionsBoxes
+from src.budget_buddy.utils.timing import addTimings, peakRssMb, timeStage
 from src.budget_buddy.preprocessing.pdf_loader import iterSplitPdfs
-from src.budget_buddy.preprocessing.pdf_to_images import savePdfPagesAsImages, loadCachedImages
+from src.budget_buddy.preprocessing.pdf_to_images import (
+    RASTER_METHODS,
+    buildCropJobs,
+    getOrCreateImages,
+    loadPdfCropsTimed,
+)
+from src.budget_buddy.ocr.ocr_cache import OcrResultCache, DEFAULT_MAX_BYTES
+from src.budget_buddy.ocr.run_ledger import OCR_LEDGER_PATH, RunLedger
+from src.budget_buddy.ocr.ocr_sink import (
+    DEFAULT_SHARD_RECORDS,
+    SINK_KINDS,
+    JsonFileSink,
+    compactRunToParquet,
+    makeSink,
+)
+from src.budget_buddy.ocr.ocr_config import loadOcrConfig
+from src.budget_buddy.ocr.ocr_metrics import RunMetrics
+from src.budget_buddy.preprocessing.crop_filter import findBlankCrops
+from src.budget_buddy.preprocessing.batch_preprocess import batchPreprocess, getProcessorParams
+from src.budget_buddy.layout.sat_template import DEFAULT_DECODE, getActiveRegions, getRegionDecodeConfigs
+from src.budget_buddy.ocr.ocr_workers import (
+    runForkedWorkers,
+    shardIter,
+    shareModelWeights,
+)
+from src.budget_buddy.utils.parallel import splitThreads
+from src.budget_buddy.ocr.ocr_pipeline import (
+    PipelineConfig,
+    STOP,
+    drainQueue,
+    iterQueue,
+    startProcessStage,
+    startThreadStage,
+)
 
 
 ROOT = Path(".")
 TRAIN_SPLIT_ROOT = ROOT / "data" / "splits" / "train"
 RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
-OCR_OUTPUT_ROOT = ROOT / "data" / "interim" / "ocr_train" / RUN_ID
+OCR_BASE_ROOT = ROOT / "data" / "interim" / "ocr_train"
+OCR_OUTPUT_ROOT = OCR_BASE_ROOT / RUN_ID
 IMAGE_SPLIT = "train"
+PREPROCESS_METHODS = ("vectorized", "processor")
+PREPROCESS_METHOD = "vectorized"
+VERBOSE = False
+
+
+def setRunId(run_id: str):
+    # reutiliza la carpeta de una corrida previa (resume)
+    global RUN_ID, OCR_OUTPUT_ROOT
+    RUN_ID = run_id
+    OCR_OUTPUT_ROOT = OCR_BASE_ROOT / run_id
+
+
+def setOutputBase(base: Path, image_split: str | None = None):
+    # corridas fuera de ocr_train (p. ej. benchmarks): salidas y cache de imágenes aparte
+    global OCR_BASE_ROOT, OCR_OUTPUT_ROOT, IMAGE_SPLIT
+    OCR_BASE_ROOT = Path(base)
+    OCR_OUTPUT_ROOT = OCR_BASE_ROOT / RUN_ID
+    if image_split:
+        IMAGE_SPLIT = image_split
 
 
 def getImagesForPdf(
@@ -31,27 +90,205 @@ def getImagesForPdf(
     dpi: int = 300,
     use_cache: bool = True,
 ):
-    # intenta cargar imágenes cacheadas
-    images = []
-
-    if use_cache:
-        images = loadCachedImages(IMAGE_SPLIT, category, pdf_path)
-
-    if images:
-        return images
-
-    # si no hay cache se generan los pngs
-    print("  no hay imágenes cacheadas, generando pngs...")
-    savePdfPagesAsImages(
+    # cache o raster del split de entrenamiento
+    return getOrCreateImages(
         split=IMAGE_SPLIT,
         category=category,
         pdf_path=pdf_path,
         dpi=dpi,
-        overwrite=False,
+        use_cache=use_cache,
+        verbose=VERBOSE,
     )
 
-    images = loadCachedImages(IMAGE_SPLIT, category, pdf_path)
-    return images
+
+def setVerbose(verbose: bool):
+    # prints por pdf y por región (en corridas grandes el print pesa en el perfil)
+    global VERBOSE
+    VERBOSE = verbose
+
+
+def setPreprocessMethod(method: str):
+    # vectorized: resize/normalize en tensor sobre gris; processor: camino pil original
+    global PREPROCESS_METHOD
+    if method not in PREPROCESS_METHODS:
+        raise ValueError(f"preprocess desconocido: {method} (usa {PREPROCESS_METHODS})")
+    PREPROCESS_METHOD = method
+
+
+def preprocessImages(processor, images):
+    # convierte recortes pil a tensor de pixeles (todos al mismo tamaño)
+    if PREPROCESS_METHOD == "vectorized":
+        return batchPreprocess(images, getProcessorParams(processor))
+
+    # el image processor de vit espera rgb; los pngs se guardan en gris
+    images = [img if img.mode == "RGB" else img.convert("RGB") for img in images]
+    return processor(images=images, return_tensors="pt").pixel_values
+
+
+def getPreprocessIdentity(processor) -> dict:
+    # método y parámetros del preprocess: con otros, el mismo recorte da otro texto
+    return {"method": PREPROCESS_METHOD, **getProcessorParams(processor)}
+
+
+def getSlotDecodeConfig(
+    slot: str,
+    region_decode: dict | None = None,
+    max_new_tokens: int = 256,
+):
+    # regiones sat usan su presupuesto del yaml; páginas completas el default
+    if region_decode and slot in region_decode:
+        return region_decode[slot]
+    return {**DEFAULT_DECODE, "max_new_tokens": max_new_tokens}
+
+
+def generateTexts(
+    processor,
+    model,
+    pixel_values,
+    device: torch.device,
+    max_new_tokens: int = 256,
+    decode_cfg: dict | None = None,
+    timings: dict | None = None,
+):
+    # un solo generate para todo el tensor; devuelve (textos, pasos por secuencia)
+    # con timings suma segundos de encoder y de decodificación por separado
+    # decoding hereda de clases de transformers: se importa al generar
+    from src.budget_buddy.ocr.decoding import buildStoppingCriteria, countDecodeSteps
+
+    decode_cfg = decode_cfg or {**DEFAULT_DECODE, "max_new_tokens": max_new_tokens}
+
+    gen_kwargs = {}
+    stopping = buildStoppingCriteria(processor, decode_cfg)
+    if stopping is not None:
+        gen_kwargs["stopping_criteria"] = stopping
+
+    encoder_timed = timings is not None and hasattr(model, "get_encoder")
+    with torch.no_grad():
+        pixel_values = pixel_values.to(device)
+        if encoder_timed:
+            # encoder aparte; generate reutiliza encoder_outputs y solo corre el decoder
+            with timeStage(timings, "encoder"):
+                gen_kwargs["encoder_outputs"] = model.get_encoder()(pixel_values=pixel_values, return_dict=True)
+                if device.type == "cuda":
+                    torch.cuda.synchronize()
+        elif timings is not None:
+            # el backend onnx separa encoder y decoder por dentro
+            gen_kwargs["timings"] = timings
+
+        with timeStage(timings if encoder_timed else None, "decode"):
+            generated_ids = model.generate(
+                pixel_values=pixel_values,
+                max_new_tokens=decode_cfg["max_new_tokens"],
+                **gen_kwargs,
+            )
+
+    # el padding de las secuencias se quita con skip_special_tokens
+    decoded = processor.batch_decode(generated_ids, skip_special_tokens=True)
+    steps = countDecodeSteps(generated_ids, processor.tokenizer.pad_token_id)
+    return [text.strip() for text in decoded], steps
+
+
+def ocrImagesBatchWithSteps(
+    processor,
+    model,
+    images,
+    device: torch.device,
+    max_new_tokens: int = 256,
+    batch_size: int = 8,
+    cache: OcrResultCache | None = None,
+    skip: list[bool] | None = None,
+    decode_cfgs: list[dict] | None = None,
+    slot_timings: list[dict] | None = None,
+):
+    # corre trocr por lotes, un solo generate por lote y por config de decodificación
+    # slot_timings (uno por imagen) recibe su parte de preprocess/encoder/decode de cada lote
+    texts = [None] * len(images)
+    steps = [None] * len(images)  # None = no se decodificó (cache o en blanco)
+    batch_size = max(1, batch_size)
+    if decode_cfgs is None:
+        decode_cfgs = [{**DEFAULT_DECODE, "max_new_tokens": max_new_tokens}] * len(images)
+
+    # recortes marcados como vacíos salen con texto vacío sin pasar por el modelo
+    if skip is not None:
+        texts = ["" if is_blank else None for is_blank in skip]
+        steps = [0 if is_blank else None for is_blank in skip]
+
+    # consulta el cache antes de generar
+    keys = None
+    if cache is not None:
+        keys = [
+            cache.makeKey(img, cfg) if text is None else None
+            for img, text, cfg in zip(images, texts, decode_cfgs)
+        ]
+        hits = cache.getMany([k for k in keys if k is not None])
+        texts = [hits.get(k) if k is not None else text for k, text in zip(keys, texts)]
+
+    # agrupa por config; recortes idénticos (facturas duplicadas) se generan una sola vez
+    todo_by_cfg = {}
+    for idx, text in enumerate(texts):
+        if text is None:
+            cfg_key = json.dumps(decode_cfgs[idx], sort_keys=True)
+            group = todo_by_cfg.setdefault(cfg_key, {})
+            group.setdefault(keys[idx] if keys else idx, []).append(idx)
+
+    new_entries = {}
+    for group in todo_by_cfg.values():
+        todo_groups = list(group.items())
+        cfg = decode_cfgs[todo_groups[0][1][0]]
+
+        for start in range(0, len(todo_groups), batch_size):
+            chunk = todo_groups[start:start + batch_size]
+            chunk_timings = {} if slot_timings is not None else None
+            with timeStage(chunk_timings, "preprocess"):
+                pixel_values = preprocessImages(processor, [images[idxs[0]] for _, idxs in chunk])
+            chunk_texts, chunk_steps = generateTexts(
+                processor,
+                model,
+                pixel_values,
+                device,
+                decode_cfg=cfg,
+                timings=chunk_timings,
+            )
+
+            for (key, idxs), text, n_steps in zip(chunk, chunk_texts, chunk_steps):
+                for idx in idxs:
+                    texts[idx] = text
+                    steps[idx] = n_steps
+                    if slot_timings is not None:
+                        addTimings(slot_timings[idx], chunk_timings, 1 / (len(chunk) * len(idxs)))
+                if keys:
+                    new_entries[key] = text
+
+    if cache is not None:
+        cache.putMany(new_entries)
+
+    return texts, steps
+
+
+def ocrImagesBatch(
+    processor,
+    model,
+    images,
+    device: torch.device,
+    max_new_tokens: int = 256,
+    batch_size: int = 8,
+    cache: OcrResultCache | None = None,
+    skip: list[bool] | None = None,
+    decode_cfgs: list[dict] | None = None,
+):
+    # igual que ocrImagesBatchWithSteps pero solo devuelve textos
+    texts, _ = ocrImagesBatchWithSteps(
+        processor,
+        model,
+        images,
+        device,
+        max_new_tokens=max_new_tokens,
+        batch_size=batch_size,
+        cache=cache,
+        skip=skip,
+        decode_cfgs=decode_cfgs,
+    )
+    return texts
 
 
 def ocrSingleImage(
@@ -62,14 +299,37 @@ def ocrSingleImage(
     max_new_tokens: int = 256,
 ):
     # corre trocr para una sola imagen
-    inputs = processor(images=img, return_tensors="pt").to(device)
-    with torch.no_grad():
-        generated_ids = model.generate(
-            **inputs,
-            max_new_tokens=max_new_tokens,
-        )
-    text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-    return text.strip()
+    return ocrImagesBatch(
+        processor,
+        model,
+        [img],
+        device,
+        max_new_tokens=max_new_tokens,
+        batch_size=1,
+    )[0]
+
+
+def getDebugSampleDir(
+    debug_dir: Path | None,
+    pdf_stem: str | None,
+    category: str | None,
+):
+    # prepara carpeta de debug si aplica
+    if debug_dir is None or pdf_stem is None or category is None:
+        return None
+
+    sample_dir = debug_dir / category / pdf_stem
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    return sample_dir
+
+
+def saveDebugSlot(sample_dir: Path | None, slot: str, img, text: str):
+    # guarda imagen y texto de un slot para debug
+    if sample_dir is None:
+        return
+
+    img.save(sample_dir / f"{slot}.png")
+    (sample_dir / f"{slot}.txt").write_text(text, encoding="utf-8")
 
 
 def ocrImagesFullPage(
@@ -81,37 +341,32 @@ def ocrImagesFullPage(
     debug_dir: Path | None = None,
     pdf_stem: str | None = None,
     category: str | None = None,
+    batch_size: int = 8,
+    cache: OcrResultCache | None = None,
+    blank_cfg: dict | None = None,
 ):
-    page_texts = []
-
-    # prepara carpeta de debug si aplica
-    sample_dir = None
-    if debug_dir is not None and pdf_stem is not None and category is not None:
-        sample_dir = debug_dir / category / pdf_stem
-        sample_dir.mkdir(parents=True, exist_ok=True)
-
-    for idx, img in enumerate(images):
-        # guarda imagen para debug
-        if sample_dir is not None:
-            img.save(sample_dir / f"page_{idx+1}.png")
+    sample_dir = getDebugSampleDir(debug_dir, pdf_stem, category)
+
+    jobs = buildCropJobs(images, mode="full")
+    skip = findBlankCrops([img for _, img in jobs], blank_cfg)
+    texts = ocrImagesBatch(
+        processor,
+        model,
+        [img for _, img in jobs],
+        device,
+        max_new_tokens=max_new_tokens,
+        batch_size=batch_size,
+        cache=cache,
+        skip=skip,
+    )
 
-        text = ocrSingleImage(
-            processor,
-            model,
-            img,
-            device,
-            max_new_tokens=max_new_tokens,
-        )
+    page_texts = []
+    for idx, ((slot, img), text, is_blank) in enumerate(zip(jobs, texts, skip)):
         page_texts.append(text)
-
-        # guarda texto para debug
-        if sample_dir is not None:
-            (sample_dir / f"page_{idx+1}.txt").write_text(
-                text,
-                encoding="utf-8",
-            )
-
-        print(f"\tpágina {idx + 1} (full) → {len(text)} chars")
+        saveDebugSlot(sample_dir, slot, img, text)
+        if VERBOSE:
+            note = " (en blanco, omitida)" if is_blank else ""
+            print(f"\tpágina {idx + 1} (full) → {len(text)} chars{note}")
 
     return page_texts
 
@@ -125,52 +380,42 @@ def ocrImagesSatTemplate(
     debug_dir: Path | None = None,
     pdf_stem: str | None = None,
     category: str | None = None,
+    batch_size: int = 8,
+    cache: OcrResultCache | None = None,
+    blank_cfg: dict | None = None,
 ):
     # retorna si no hay imágenes
     if not images:
         return {}, [], ""
 
-    img = images[0]
-    img_width, img_height = img.size
-
-    # obtiene cajas del template sat
-    boxes = getSatRegionsBoxes(img_width, img_height)
+    sample_dir = getDebugSampleDir(debug_dir, pdf_stem, category)
+
+    jobs = buildCropJobs(images, mode="sat-template")
+    skip = findBlankCrops([img for _, img in jobs], blank_cfg)
+
+    # cada región usa su presupuesto y reglas de parada
+    region_decode = getRegionDecodeConfigs()
+    texts, steps = ocrImagesBatchWithSteps(
+        processor,
+        model,
+        [img for _, img in jobs],
+        device,
+        max_new_tokens=max_new_tokens,
+        batch_size=batch_size,
+        cache=cache,
+        skip=skip,
+        decode_cfgs=[getSlotDecodeConfig(name, region_decode) for name, _ in jobs],
+    )
 
-    region_texts = {}
     ordered_texts = []
-
-    # prepara carpeta de debug si aplica
-    sample_dir = None
-    if debug_dir is not None and pdf_stem is not None and category is not None:
-        sample_dir = debug_dir / category / pdf_stem
-        sample_dir.mkdir(parents=True, exist_ok=True)
-
-    for region_name, box in boxes.items():
-        crop_img = img.crop(box)
-
-        # guarda recorte si debug
-        if sample_dir is not None:
-            crop_img.save(sample_dir / f"{region_name}.png")
-
-        text = ocrSingleImage(
-            processor,
-            model,
-            crop_img,
-            device,
-            max_new_tokens=max_new_tokens,
-        )
-
-        region_texts[region_name] = text
+    for (region_name, crop_img), text, is_blank, n_steps in zip(jobs, texts, skip, steps):
         ordered_texts.append((region_name, text))
+        saveDebugSlot(sample_dir, region_name, crop_img, text)
+        if VERBOSE:
+            note = " (en blanco, omitida)" if is_blank else f" ({n_steps} pasos)" if n_steps else ""
+            print(f"\tregion {region_name} → {len(text)} chars{note}")
 
-        # guarda texto si debug
-        if sample_dir is not None:
-            (sample_dir / f"{region_name}.txt").write_text(
-                text,
-                encoding="utf-8",
-            )
-
-        print(f"\tregion {region_name} → {len(text)} chars")
+    region_texts = dict(ordered_texts)
 
     # une textos en orden
     parts = [txt for _, txt in ordered_texts if txt]
@@ -179,73 +424,27 @@ def ocrImagesSatTemplate(
     return region_texts, ordered_texts, full_text
 
 
-def buildOutputPath(pdf_path: Path, category: str):
-    # arma ruta de salida para json
-    rel_name = pdf_path.stem + ".json"
-    out_dir = OCR_OUTPUT_ROOT / category
-    out_dir.mkdir(parents=True, exist_ok=True)
-    return out_dir / rel_name
-
-
-def ocrPdf(
-    processor,
-    model,
-    device: torch.device,
+def buildPayload(
     pdf_path: Path,
     category: str,
     mode: str,
-    dpi: int,
-    use_cache: bool,
-    overwrite: bool,
     model_dir: str,
-    debug_dir: Path | None = None,
+    num_pages: int,
+    slot_texts: list[tuple[str, str]],
+    skipped_slots: dict[str, str] | None = None,
+    decode_steps: dict[str, int | None] | None = None,
+    timings: dict[str, float] | None = None,
+    slot_timings: dict[str, dict] | None = None,
+    layer_slots: list[str] | None = None,
 ):
-    # salida esperada para el json final
-    out_path = buildOutputPath(pdf_path, category)
-
-    if out_path.exists() and not overwrite:
-        print(f"\n[skip] ya existe: {out_path}")
-        return out_path
-
-    print(f"\nprocesando pdf: {pdf_path}  |  modo={mode}")
-
-    # cargar imágenes del pdf (cache o raster)
-    images = getImagesForPdf(
-        category=category,
-        pdf_path=pdf_path,
-        dpi=dpi,
-        use_cache=use_cache,
-    )
-    if not images:
-        print("\tno se pudieron obtener imágenes, se omite")
-        return None
-
-    # nombre base para guardados de debug
-    pdf_stem = pdf_path.stem
-
-    # elegir flujo de ocr según modo
+    # arma textos finales según el modo
     if mode == "full":
-        page_texts = ocrImagesFullPage(
-            processor,
-            model,
-            images,
-            device,
-            debug_dir=debug_dir,
-            pdf_stem=pdf_stem,
-            category=category,
-        )
+        page_texts = [txt for _, txt in slot_texts]
         full_text = "\n\n".join(page_texts)
         region_texts = {}
     else:
-        region_texts, ordered_texts, full_text = ocrImagesSatTemplate(
-            processor,
-            model,
-            images,
-            device,
-            debug_dir=debug_dir,
-            pdf_stem=pdf_stem,
-            category=category,
-        )
+        region_texts = dict(slot_texts)
+        full_text = "\n\n".join(txt for _, txt in slot_texts if txt)
         page_texts = [full_text]
 
     # construir json para guardar resultados
@@ -253,7 +452,7 @@ def ocrPdf(
         "pdf_path": str(pdf_path),
         "category": category,
         "model_name": model_dir,
-        "num_pages": len(images),
+        "num_pages": num_pages,
         "page_texts": page_texts,
         "full_text": full_text,
     }
@@ -267,29 +466,513 @@ def ocrPdf(
         payload["header_text"] = region_texts.get("header", "")
         payload["items_text"] = region_texts.get("items_table", "")
 
-    # escribir json en disco
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    # qué camino produjo cada texto: capa de texto del pdf u ocr
+    layer_slots = set(layer_slots or [])
+    if not layer_slots:
+        payload["source"] = "ocr"
+    elif layer_slots >= {name for name, _ in slot_texts}:
+        payload["source"] = "text_layer"
+    else:
+        payload["source"] = "mixed"
+    for name, region in payload.get("regions", {}).items():
+        region["source"] = "text_layer" if name in layer_slots else "ocr"
+
+    # pasos de decodificación usados por slot (None = vino del cache)
+    if decode_steps:
+        payload["decode_steps"] = dict(decode_steps)
+        payload["cache_hits"] = sum(1 for n in decode_steps.values() if n is None)
+        for name, n_steps in decode_steps.items():
+            if name in payload.get("regions", {}):
+                payload["regions"][name]["decode_steps"] = n_steps
+
+    # segundos por etapa de la factura y pico de rss del proceso al terminarla
+    if timings:
+        payload["timings"] = {stage: round(sec, 4) for stage, sec in timings.items()}
+        payload["peak_rss_mb"] = round(peakRssMb()["self"], 1)
+    if slot_timings:
+        for name, slot_t in slot_timings.items():
+            if slot_t and name in payload.get("regions", {}):
+                payload["regions"][name]["timings"] = {stage: round(sec, 4) for stage, sec in slot_t.items()}
+
+    # slots que no pasaron por el modelo y por qué
+    if skipped_slots:
+        payload["skipped_slots"] = dict(skipped_slots)
+        for name, reason in skipped_slots.items():
+            if name in payload.get("regions", {}):
+                payload["regions"][name]["skipped"] = reason
+
+    return payload
+
+
+def mergeSlotTexts(layer_texts: dict[str, str], ocr_texts: dict[str, str]) -> list[tuple[str, str]]:
+    # regiones en el orden de la plantilla, vengan de la capa de texto o del ocr
+    if not layer_texts:
+        return list(ocr_texts.items())
+
+    order = [name for name in getActiveRegions() if name in layer_texts or name in ocr_texts]
+    return [(name, layer_texts[name] if name in layer_texts else ocr_texts[name]) for name in order]
+
+
+def ocrPdfBatch(
+    processor,
+    model,
+    device: torch.device,
+    items: list[tuple[str, Path]],
+    mode: str,
+    dpi: int,
+    use_cache: bool,
+    overwrite: bool,
+    model_dir: str,
+    batch_size: int = 8,
+    debug_dir: Path | None = None,
+    cache: OcrResultCache | None = None,
+    ledger: RunLedger | None = None,
+    blank_cfg: dict | None = None,
+    region_decode: dict | None = None,
+    sink=None,
+    metrics: RunMetrics | None = None,
+    raster_cfg: dict | None = None,
+    text_layer_cfg: dict | None = None,
+):
+    # procesa varios pdfs juntando sus recortes en lotes compartidos
+    sink = sink or JsonFileSink(OCR_OUTPUT_ROOT, verbose=VERBOSE)
+    results: list[Path | None] = [None] * len(items)
+    pending = []  # (idx, category, pdf_path, num_pages, jobs, timings, layer_texts)
+
+    for idx, (category, pdf_path) in enumerate(items):
+        # salida ya escrita en esta corrida
+        out_path = sink.exists(pdf_path, category)
+
+        if out_path is not None and not overwrite:
+            if VERBOSE:
+                print(f"\n[skip] ya existe: {out_path}")
+            if metrics is not None:
+                metrics.addSkipped()
+            results[idx] = out_path
+            if ledger is not None:
+                ledger.recordPdf(pdf_path, category, out_path)
+            continue
+
+        if VERBOSE:
+            print(f"\nprocesando pdf: {pdf_path}  |  modo={mode}")
+
+        # capa de texto del pdf y recortes de lo que falte (cache o raster de página / solo regiones)
+        num_pages, jobs, timings, layer_texts = loadPdfCropsTimed(
+            IMAGE_SPLIT,
+            category,
+            pdf_path,
+            mode,
+            dpi=dpi,
+            use_cache=use_cache,
+            raster_cfg=raster_cfg,
+            text_layer_cfg=text_layer_cfg,
+            verbose=VERBOSE,
+        )
+        if not jobs and not layer_texts:
+            print(f"\tno se pudieron obtener imágenes, se omite: {pdf_path}")
+            continue
+
+        pending.append((idx, category, pdf_path, num_pages, jobs, timings, layer_texts))
+
+    if not pending:
+        return results
+
+    # aplana todos los recortes y recuerda a qué (pdf, slot) pertenecen
+    flat_images = [img for *_, jobs, _, _ in pending for _, img in jobs]
+    flat_skip = findBlankCrops(flat_images, blank_cfg)
+    flat_cfgs = [
+        getSlotDecodeConfig(slot, region_decode)
+        for *_, jobs, _, _ in pending
+        for slot, _ in jobs
+    ]
+    flat_timings = [{} for _ in flat_images]
+    texts, steps = ocrImagesBatchWithSteps(
+        processor,
+        model,
+        flat_images,
+        device,
+        batch_size=batch_size,
+        cache=cache,
+        skip=flat_skip,
+        decode_cfgs=flat_cfgs,
+        slot_timings=flat_timings,
+    )
+
+    cursor = 0
+    for idx, category, pdf_path, num_pages, jobs, timings, layer_texts in pending:
+        pdf_texts = texts[cursor:cursor + len(jobs)]
+        pdf_skip = flat_skip[cursor:cursor + len(jobs)]
+        pdf_steps = steps[cursor:cursor + len(jobs)]
+        pdf_slot_timings = flat_timings[cursor:cursor + len(jobs)]
+        cursor += len(jobs)
+
+        sample_dir = getDebugSampleDir(debug_dir, pdf_path.stem, category)
+        ocr_texts = {}
+        skipped_slots = {}
+        for (slot, img), text, is_blank, slot_t in zip(jobs, pdf_texts, pdf_skip, pdf_slot_timings):
+            ocr_texts[slot] = text
+            saveDebugSlot(sample_dir, slot, img, text)
+            addTimings(timings, slot_t)
+            if is_blank:
+                skipped_slots[slot] = "blank"
+            if VERBOSE:
+                note = " (en blanco, omitida)" if is_blank else ""
+                print(f"\t[{pdf_path.stem}] {slot} → {len(text)} chars{note}")
+
+        payload = buildPayload(
+            pdf_path=pdf_path,
+            category=category,
+            mode=mode,
+            model_dir=model_dir,
+            num_pages=num_pages,
+            slot_texts=mergeSlotTexts(layer_texts, ocr_texts),
+            skipped_slots=skipped_slots,
+            decode_steps={slot: n for (slot, _), n in zip(jobs, pdf_steps)},
+            timings=timings,
+            slot_timings={slot: t for (slot, _), t in zip(jobs, pdf_slot_timings)},
+            layer_slots=list(layer_texts),
+        )
+        write_timings = {}
+        with timeStage(write_timings, "write"):
+            out_path = sink.write(pdf_path, category, payload)
+        if metrics is not None:
+            metrics.addInvoice(payload, write_timings["write"])
+        results[idx] = out_path
+        if ledger is not None:
+            ledger.recordPdf(pdf_path, category, out_path)
+
+    return results
 
-    print(f"\tguardado json OCR en: {out_path}")
-    return out_path
 
+def ocrPdf(
+    processor,
+    model,
+    device: torch.device,
+    pdf_path: Path,
+    category: str,
+    mode: str,
+    dpi: int,
+    use_cache: bool,
+    overwrite: bool,
+    model_dir: str,
+    debug_dir: Path | None = None,
+    batch_size: int = 8,
+    cache: OcrResultCache | None = None,
+    ledger: RunLedger | None = None,
+    blank_cfg: dict | None = None,
+    region_decode: dict | None = None,
+    sink=None,
+    metrics: RunMetrics | None = None,
+    raster_cfg: dict | None = None,
+    text_layer_cfg: dict | None = None,
+):
+    # mismo flujo que el batch pero con un solo pdf
+    return ocrPdfBatch(
+        processor=processor,
+        model=model,
+        device=device,
+        items=[(category, pdf_path)],
+        mode=mode,
+        dpi=dpi,
+        use_cache=use_cache,
+        overwrite=overwrite,
+        model_dir=model_dir,
+        batch_size=batch_size,
+        debug_dir=debug_dir,
+        cache=cache,
+        ledger=ledger,
+        blank_cfg=blank_cfg,
+        region_decode=region_decode,
+        sink=sink,
+        metrics=metrics,
+        raster_cfg=raster_cfg,
+        text_layer_cfg=text_layer_cfg,
+    )[0]
+
+
+def iterPdfGroups(pdf_iter, group_size: int):
+    # agrupa (category, pdf_path) para compartir lotes entre pdfs
+    group = []
+    for item in pdf_iter:
+        group.append(item)
+        if len(group) >= group_size:
+            yield group
+            group = []
+
+    if group:
+        yield group
+
+
+def iterTrainPdfs(
+    max_per_category: int | None = None,
+    ledger: RunLedger | None = None,
+    done_keys: set[tuple[str, str]] | None = None,
+    shard: tuple[int, int] | None = None,
+    pdf_items=None,
+):
+    if pdf_items is not None:
+        # iterable explícito de (category, pdf_path), p. ej. facturas sintéticas
+        pdfs = iter(pdf_items)
+    else:
+        # verificar que el split exista
+        if not TRAIN_SPLIT_ROOT.exists():
+            raise FileNotFoundError(
+                f"no existe {TRAIN_SPLIT_ROOT}, corre build-train primero"
+            )
 
-def iterTrainPdfs(max_per_category: int | None = None):
-    # verificar que el split exista
-    if not TRAIN_SPLIT_ROOT.exists():
-        raise FileNotFoundError(
-            f"no existe {TRAIN_SPLIT_ROOT}, corre build-train primero"
+        pdfs = iterSplitPdfs(
+            split="train",
+            max_per_category=max_per_category,
         )
 
+    # con --workers cada proceso toma solo su parte (antes de hashear)
+    if shard is not None:
+        pdfs = shardIter(pdfs, *shard)
+
     # iterar pdfs del split de entrenamiento
-    for category, pdf_path in iterSplitPdfs(
-        split="train",
-        max_per_category=max_per_category,
-    ):
+    for category, pdf_path in pdfs:
+        # omite pdfs ya registrados en la bitácora (mismo contenido y config)
+        if ledger is not None and done_keys and ledger.isDone(pdf_path, done_keys):
+            if VERBOSE:
+                print(f"[ledger] ya procesado: {pdf_path}")
+            continue
+
         yield category, pdf_path
 
 
+def runOcrPipelined(
+    processor,
+    model,
+    device: torch.device,
+    pdf_iter,
+    mode: str,
+    dpi: int,
+    use_cache: bool,
+    overwrite: bool,
+    model_dir: str,
+    batch_size: int,
+    pipeline_cfg: PipelineConfig,
+    debug_dir: Path | None = None,
+    cache: OcrResultCache | None = None,
+    ledger: RunLedger | None = None,
+    blank_cfg: dict | None = None,
+    region_decode: dict | None = None,
+    sink=None,
+    metrics: RunMetrics | None = None,
+    raster_cfg: dict | None = None,
+    text_layer_cfg: dict | None = None,
+):
+    # raster (procesos) → preprocess (hilos) → generate (este hilo) → escritura (hilo)
+    sink = sink or JsonFileSink(OCR_OUTPUT_ROOT, verbose=VERBOSE)
+    errors = []
+    written = []
+
+    crops_q = queue.Queue(maxsize=pipeline_cfg.queue_size)
+    pixels_q = queue.Queue(maxsize=pipeline_cfg.queue_size)
+    write_q = queue.Queue(maxsize=pipeline_cfg.queue_size)
+    # si el modelo falla, raster y preprocess dejan de producir en vez de quedar bloqueados
+    cancel = threading.Event()
+
+    def iterRasterArgs():
+        # filtra pdfs ya procesados antes de rasterizar
+        for category, pdf_path in pdf_iter:
+            out_path = sink.exists(pdf_path, category)
+            if out_path is not None and not overwrite:
+                if VERBOSE:
+                    print(f"\n[skip] ya existe: {out_path}")
+                if metrics is not None:
+                    metrics.addSkipped()
+                continue
+            # VERBOSE va como argumento: los procesos del raster no heredan setVerbose
+            yield (IMAGE_SPLIT, category, pdf_path, mode, dpi, use_cache, raster_cfg, text_layer_cfg, VERBOSE)
+
+    def preprocessStage(result):
+        (_, category, pdf_path, *_), (num_pages, jobs, timings, layer_texts) = result
+        if not jobs and not layer_texts:
+            print(f"\tno se pudieron obtener imágenes, se omite: {pdf_path}")
+            return None
+
+        # recortes en blanco salen vacíos sin pasar por el modelo
+        skip = findBlankCrops([img for _, img in jobs], blank_cfg)
+        texts = ["" if is_blank else None for is_blank in skip]
+        steps = [0 if is_blank else None for is_blank in skip]
+        decode_cfgs = [getSlotDecodeConfig(slot, region_decode) for slot, _ in jobs]
+        keys = [None] * len(jobs)
+
+        # los recortes ya vistos no pasan por el modelo
+        if cache is not None:
+            keys = [
+                cache.makeKey(img, cfg) if text is None else None
+                for (_, img), text, cfg in zip(jobs, texts, decode_cfgs)
+            ]
+            hits = cache.getMany([k for k in keys if k is not None])
+            texts = [hits.get(k) if k is not None else text for k, text in zip(keys, texts)]
+
+        todo = [i for i, text in enumerate(texts) if text is None]
+        slot_timings = [{} for _ in jobs]
+        pixel_values = None
+        if todo:
+            prep_timings = {}
+            with timeStage(prep_timings, "preprocess"):
+                pixel_values = preprocessImages(processor, [jobs[i][1] for i in todo])
+            addTimings(timings, prep_timings)
+            for i in todo:
+                addTimings(slot_timings[i], prep_timings, 1 / len(todo))
+
+        return {
+            "category": category,
+            "pdf_path": pdf_path,
+            "num_pages": num_pages,
+            "jobs": jobs,
+            "keys": keys,
+            "todo": todo,
+            "pixel_values": pixel_values,
+            "texts": texts,
+            "steps": steps,
+            "decode_cfgs": decode_cfgs,
+            "skipped_slots": {slot: "blank" for (slot, _), is_blank in zip(jobs, skip) if is_blank},
+            "timings": timings,
+            "slot_timings": slot_timings,
+            "layer_texts": layer_texts,
+            "remaining": len(todo),
+        }
+
+    def writeStage(item):
+        pdf_path, category = item["pdf_path"], item["category"]
+        sample_dir = getDebugSampleDir(debug_dir, pdf_path.stem, category)
+
+        ocr_texts = {}
+        for (slot, img), text in zip(item["jobs"], item["texts"]):
+            ocr_texts[slot] = text
+            saveDebugSlot(sample_dir, slot, img, text)
+
+        payload = buildPayload(
+            pdf_path=pdf_path,
+            category=category,
+            mode=mode,
+            model_dir=model_dir,
+            num_pages=item["num_pages"],
+            slot_texts=mergeSlotTexts(item["layer_texts"], ocr_texts),
+            skipped_slots=item["skipped_slots"],
+            decode_steps={slot: n for (slot, _), n in zip(item["jobs"], item["steps"])},
+            timings=item["timings"],
+            slot_timings={slot: t for (slot, _), t in zip(item["jobs"], item["slot_timings"])},
+            layer_slots=list(item["layer_texts"]),
+        )
+        write_timings = {}
+        with timeStage(write_timings, "write"):
+            out_path = sink.write(pdf_path, category, payload)
+        if metrics is not None:
+            metrics.addInvoice(payload, write_timings["write"])
+        if ledger is not None:
+            ledger.recordPdf(pdf_path, category, out_path)
+        written.append(out_path)
+
+    feeder = startProcessStage(
+        iterRasterArgs(),
+        loadPdfCropsTimed,
+        crops_q,
+        workers=pipeline_cfg.raster_workers,
+        max_inflight=pipeline_cfg.queue_size,
+        errors=errors,
+        cancel=cancel,
+    )
+    preprocess = startThreadStage(
+        preprocessStage,
+        crops_q,
+        pixels_q,
+        workers=pipeline_cfg.preprocess_workers,
+        errors=errors,
+        name="preprocess",
+        cancel=cancel,
+    )
+    writer = startThreadStage(
+        writeStage,
+        write_q,
+        None,
+        workers=pipeline_cfg.writer_workers,
+        errors=errors,
+        name="writer",
+    )
+
+    def runBatch(rows, decode_cfg):
+        # rows: lista de (item, fila en pixel_values); un generate por lote
+        pixel_values = torch.stack([item["pixel_values"][r] for item, r in rows])
+        batch_timings = {}
+        texts, steps = generateTexts(
+            processor,
+            model,
+            pixel_values,
+            device,
+            decode_cfg=decode_cfg,
+            timings=batch_timings,
+        )
+
+        new_entries = {}
+        for (item, r), text, n_steps in zip(rows, texts, steps):
+            slot_idx = item["todo"][r]
+            item["texts"][slot_idx] = text
+            item["steps"][slot_idx] = n_steps
+            # el costo del lote se reparte en partes iguales entre sus recortes
+            addTimings(item["slot_timings"][slot_idx], batch_timings, 1 / len(rows))
+            addTimings(item["timings"], batch_timings, 1 / len(rows))
+            if cache is not None:
+                new_entries[item["keys"][slot_idx]] = text
+
+            item["remaining"] -= 1
+            if item["remaining"] == 0:
+                write_q.put(item)
+
+        if cache is not None:
+            cache.putMany(new_entries)
+
+    # consumidor único del modelo: llena lotes (por config de decodificación)
+    # con recortes de varias facturas
+    pending_by_cfg = {}  # cfg_key -> (decode_cfg, filas pendientes)
+    batch_size = max(1, batch_size)
+    try:
+        for item in iterQueue(pixels_q):
+            if VERBOSE:
+                print(f"\nprocesando pdf: {item['pdf_path']}  |  modo={mode}")
+
+            # todo vino del cache: directo a escritura
+            if item["remaining"] == 0:
+                write_q.put(item)
+                continue
+
+            for r, slot_idx in enumerate(item["todo"]):
+                cfg = item["decode_cfgs"][slot_idx]
+                cfg_key = json.dumps(cfg, sort_keys=True)
+                _, rows = pending_by_cfg.setdefault(cfg_key, (cfg, []))
+                rows.append((item, r))
+
+                if len(rows) >= batch_size:
+                    runBatch(rows[:batch_size], cfg)
+                    del rows[:batch_size]
+
+        for cfg, rows in pending_by_cfg.values():
+            if rows:
+                runBatch(rows, cfg)
+    except BaseException:
+        # las facturas ya completas se siguen escribiendo; el resto se descarta
+        cancel.set()
+        raise
+    finally:
+        if cancel.is_set():
+            drainQueue(pixels_q)
+            drainQueue(crops_q)
+        write_q.put(STOP)
+        writer.join()
+        # el feeder cierra el process pool antes de salir: no quedan hijos vivos
+        preprocess.join()
+        feeder.join()
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} errores en el pipeline ocr") from errors[0]
+
+    return len(written)
+
+
 def runOcr(
     max_per_category: int | None = None,
     device_preference: str = "auto",
@@ -299,40 +982,276 @@ def runOcr(
     overwrite: bool = False,
     model_dir: str = "qantev/trocr-base-spanish",
     debug_dir: Path | None = None,
+    batch_size: int = 8,
+    pipeline_cfg: PipelineConfig | None = None,
+    use_ocr_cache: bool = True,
+    ocr_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    resume_run_id: str | None = None,
+    incremental: bool = False,
+    quantize: str | None = None,
+    backend: str = "torch",
+    workers: int = 1,
+    sink_kind: str = "json",
+    shard_records: int = DEFAULT_SHARD_RECORDS,
+    compact_parquet: bool = False,
+    preprocess: str | None = None,
+    pdf_items=None,
+    output_base: Path | None = None,
+    image_split: str | None = None,
+    ledger_path: Path | None = None,
+    sink=None,
+    progress: bool = False,
+    verbose: bool = False,
+    raster: str | None = None,
+    text_layer: bool | None = None,
 ):
+    started = time.perf_counter()
+    setVerbose(verbose)
+
+    # salidas fuera de data/interim/ocr_train si se pide (benchmarks)
+    if output_base is not None:
+        setOutputBase(output_base, image_split=image_split)
+
+    # reutilizar carpeta de salida si se reanuda una corrida
+    if resume_run_id:
+        setRunId(resume_run_id)
+
+    if backend == "onnx" and quantize:
+        raise ValueError("--quantize solo aplica al backend torch")
+    if workers > 1 and (backend != "torch" or pipeline_cfg is not None):
+        raise ValueError("--workers solo aplica al backend torch sin --pipeline")
+
+    # backend y cuantización cambian los textos, así que son parte de la identidad del modelo
+    model_label = model_dir
+    if backend != "torch":
+        model_label += f"#{backend}"
+    if quantize:
+        model_label += f"#{quantize}"
+
+    # bitácora de pdfs terminados para esta configuración
+    ledger = RunLedger(
+        RUN_ID,
+        model_dir=model_label,
+        mode=mode,
+        dpi=dpi,
+        ledger_path=ledger_path or OCR_LEDGER_PATH,
+    )
+    done_keys = set()
+    if resume_run_id:
+        done_keys = ledger.doneKeys({resume_run_id})
+        print(f"reanudando corrida {resume_run_id}: {len(done_keys)} pdfs ya terminados")
+    elif incremental:
+        completed = ledger.completedRuns()
+        done_keys = ledger.doneKeys(set(completed))
+        last_run = completed[-1] if completed else "ninguna"
+        print(f"modo incremental (última corrida completa: {last_run}): {len(done_keys)} pdfs sin cambios")
+
     # asegurar carpetas de salida
     ensureDirs([OCR_OUTPUT_ROOT])
 
+    # json por factura o shards jsonl append-only en la carpeta de la corrida
+    sink = sink or makeSink(sink_kind, OCR_OUTPUT_ROOT, shard_records=shard_records, verbose=verbose)
+
     # seleccionar device según preferencia
     device = getDevice(device_preference)
     print(f"usando device: {device}")
     if device.type == "cuda":
         print(f"cuda disponible, device name: {torch.cuda.get_device_name(0)}")
 
+    if workers > 1 and device.type != "cpu":
+        raise RuntimeError("--workers solo corre en cpu (usa --device cpu)")
+
     # cargar modelo trocr
-    processor, model = loadTrocrModel(model_dir, device)
-
-    processed = 0
-    # recorrer todos los pdfs del entrenamiento
-    for category, pdf_path in iterTrainPdfs(max_per_category=max_per_category):
-        out_path = ocrPdf(
-            processor=processor,
-            model=model,
-            device=device,
-            pdf_path=pdf_path,
-            category=category,
-            mode=mode,
-            dpi=dpi,
-            use_cache=use_cache,
-            overwrite=overwrite,
-            model_dir=model_dir,
-            debug_dir=debug_dir,
+    quietHf()
+    if backend == "onnx":
+        from src.budget_buddy.ocr.trocr_onnx import loadOnnxTrocrModel
+
+        if device.type != "cpu":
+            raise RuntimeError("backend onnx solo corre en cpu (usa --device cpu)")
+        processor, model = loadOnnxTrocrModel(model_dir)
+        print("backend onnxruntime (cpu)")
+    else:
+        processor, model = loadTrocrModel(model_dir, device, quantize=quantize)
+        if quantize:
+            print(f"modelo cuantizado: {quantize}")
+
+    # filtro de recortes en blanco según config/ocr.yaml
+    ocr_cfg = loadOcrConfig()
+    blank_cfg = ocr_cfg["blank_filter"]
+
+    # preprocess vectorizado en gris (o el processor original si se pide)
+    setPreprocessMethod(preprocess or ocr_cfg["preprocess"]["method"])
+
+    # sat-template: raster de página completa o solo de las cajas sat (--raster pisa el yaml)
+    raster_cfg = dict(ocr_cfg["raster"])
+    if raster:
+        raster_cfg["method"] = raster
+    # sat-template: regiones con capa de texto completa no pasan por raster ni ocr
+    text_layer_cfg = dict(ocr_cfg["text_layer"])
+    if text_layer is not None:
+        text_layer_cfg["enabled"] = text_layer
+    if mode != "full":
+        print(f"raster sat-template: {raster_cfg['method']}, capa de texto: {text_layer_cfg['enabled']}")
+
+    # presupuestos de decodificación por región (solo sat-template)
+    region_decode = getRegionDecodeConfigs() if mode != "full" else None
+
+    def openCache():
+        # cache de textos por recorte compartido entre corridas
+        if not use_ocr_cache:
+            return None
+        return OcrResultCache(
+            model_dir,
+            max_bytes=ocr_cache_max_bytes,
+            generation_params={
+                "quantize": quantize,
+                "backend": backend,
+                "preprocess": getPreprocessIdentity(processor),
+            },
+        )
+
+    def runSequential(pdf_iter, cache, metrics):
+        processed = 0
+        # recorrer los pdfs del entrenamiento en grupos de batch_size pdfs
+        for group in iterPdfGroups(pdf_iter, group_size=max(1, batch_size)):
+            out_paths = ocrPdfBatch(
+                processor=processor,
+                model=model,
+                device=device,
+                items=group,
+                mode=mode,
+                dpi=dpi,
+                use_cache=use_cache,
+                overwrite=overwrite,
+                model_dir=model_dir,
+                batch_size=batch_size,
+                debug_dir=debug_dir,
+                cache=cache,
+                ledger=ledger,
+                blank_cfg=blank_cfg,
+                region_decode=region_decode,
+                sink=sink,
+                metrics=metrics,
+                raster_cfg=raster_cfg,
+                text_layer_cfg=text_layer_cfg,
+            )
+
+            processed += sum(1 for p in out_paths if p is not None)
+        return processed
+
+    # tiempos por etapa en cada payload + resumen de la corrida; barra solo con --progress
+    metrics = RunMetrics(progress=progress)
+
+    cache = None
+    if workers > 1:
+        # un solo modelo en memoria compartida; cada hijo hereda RUN_ID y escribe en la misma carpeta
+        shareModelWeights(model)
+        threads = splitThreads(workers)
+        print(f"workers={workers}, hilos torch por worker={threads}")
+
+        def runShard(worker_id):
+            torch.set_num_threads(threads)
+            # sqlite no sobrevive al fork: cada hijo abre su conexión
+            shard_cache = openCache()
+            shard_metrics = RunMetrics(progress=progress, position=worker_id, desc=f"ocr[{worker_id}]")
+            try:
+                shard_iter = iterTrainPdfs(
+                    max_per_category=max_per_category,
+                    ledger=ledger,
+                    done_keys=done_keys,
+                    shard=(worker_id, workers),
+                    pdf_items=pdf_items,
+                )
+                processed = runSequential(shard_iter, shard_cache, shard_metrics)
+                return {"processed": processed, "metrics": shard_metrics.state()}
+            finally:
+                shard_metrics.close()
+                sink.close()
+                if shard_cache is not None:
+                    shard_cache.close()
+
+        processed = 0
+        for result in runForkedWorkers(runShard, workers):
+            processed += result["processed"]
+            metrics.merge(result["metrics"])
+    else:
+        cache = openCache()
+        pdf_iter = iterTrainPdfs(
+            max_per_category=max_per_category,
+            ledger=ledger,
+            done_keys=done_keys,
+            pdf_items=pdf_items,
         )
 
-        if out_path is not None:
-            processed += 1
+        if pipeline_cfg is not None:
+            processed = runOcrPipelined(
+                processor=processor,
+                model=model,
+                device=device,
+                pdf_iter=pdf_iter,
+                mode=mode,
+                dpi=dpi,
+                use_cache=use_cache,
+                overwrite=overwrite,
+                model_dir=model_dir,
+                batch_size=batch_size,
+                pipeline_cfg=pipeline_cfg,
+                debug_dir=debug_dir,
+                cache=cache,
+                ledger=ledger,
+                blank_cfg=blank_cfg,
+                region_decode=region_decode,
+                sink=sink,
+                metrics=metrics,
+                raster_cfg=raster_cfg,
+                text_layer_cfg=text_layer_cfg,
+            )
+        else:
+            processed = runSequential(pdf_iter, cache, metrics)
+
+    sink.close()
+    metrics.close()
 
     print(f"\nocr terminado, facturas procesadas: {processed}")
+    print(f"salidas en: {OCR_OUTPUT_ROOT}  (run_id={RUN_ID})")
+    ledger.markRunComplete(processed)
+
+    if compact_parquet and sink_kind == "jsonl":
+        compactRunToParquet(OCR_OUTPUT_ROOT)
+
+    if cache is not None:
+        stats = cache.stats()
+        print(
+            f"cache ocr → hits={stats['hits']} misses={stats['misses']} "
+            f"entradas={stats['entries']} ({stats['size_bytes'] / 1e6:.1f} MB)"
+        )
+        cache.close()
+
+    # resumen de esta ejecución (en un resume cubre solo lo procesado ahora)
+    summary = metrics.summary(
+        RUN_ID,
+        time.perf_counter() - started,
+        model=model_label,
+        mode=mode,
+        dpi=dpi,
+        batch_size=batch_size,
+        workers=workers,
+        pipeline=pipeline_cfg is not None,
+        preprocess=PREPROCESS_METHOD,
+        raster=raster_cfg["method"] if mode != "full" else "page",
+        text_layer=text_layer_cfg["enabled"] and mode != "full",
+    )
+    summary_path = metrics.save(OCR_OUTPUT_ROOT, summary)
+    stage_ms = ", ".join(f"{stage}={st['p50_ms']}" for stage, st in summary["stages"].items())
+    print(f"p50 por factura (ms): {stage_ms or '-'}")
+    print(f"resumen de la corrida: {summary_path}")
+
+    return {
+        "run_id": RUN_ID,
+        "output_root": str(OCR_OUTPUT_ROOT),
+        "processed": processed,
+        "summary_path": str(summary_path),
+    }
 
 
 def main():
@@ -401,11 +1320,158 @@ def main():
         help="si se pasa, guarda recortes e inputs del modelo en esta carpeta",
     )
 
+    # tamaño de lote para generate (recortes de varias facturas)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="recortes por llamada a generate; 1 reproduce el flujo uno a uno",
+    )
+
+    # pipeline por etapas con colas acotadas
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="raster, preprocess, generate y escritura en etapas concurrentes",
+    )
+    parser.add_argument(
+        "--raster-workers",
+        type=int,
+        default=2,
+        help="procesos para rasterizar/cargar pngs (con --pipeline)",
+    )
+    parser.add_argument(
+        "--preprocess-workers",
+        type=int,
+        default=2,
+        help="hilos para el preprocess de TrOCRProcessor (con --pipeline)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8,
+        help="capacidad de cada cola entre etapas (con --pipeline)",
+    )
+
+    # cache persistente de resultados por recorte
+    parser.add_argument(
+        "--no-ocr-cache",
+        action="store_true",
+        help="si se pasa, no consulta ni llena el cache de textos ocr",
+    )
+    parser.add_argument(
+        "--ocr-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="tamaño máximo del cache de textos ocr antes de expulsar (lru)",
+    )
+
+    # reanudar o procesar solo lo nuevo según la bitácora
+    run_group = parser.add_mutually_exclusive_group()
+    run_group.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        metavar="RUN_ID",
+        help="reanuda una corrida previa, omitiendo pdfs ya terminados en ella",
+    )
+    run_group.add_argument(
+        "--incremental",
+        action="store_true",
+        help="procesa solo pdfs nuevos o cambiados desde corridas completas con la misma config",
+    )
+
+    # cuantización para hosts sin gpu
+    parser.add_argument(
+        "--quantize",
+        choices=["none", "int8"],
+        default="none",
+        help="int8 aplica cuantización dinámica a las capas lineales (solo cpu)",
+    )
+
+    # formato de salida de la corrida
+    parser.add_argument(
+        "--sink",
+        choices=list(SINK_KINDS),
+        default="json",
+        help="json: un archivo por factura; jsonl: shards append-only en <run>/shards",
+    )
+    parser.add_argument(
+        "--shard-records",
+        type=int,
+        default=DEFAULT_SHARD_RECORDS,
+        help="registros por shard jsonl antes de abrir uno nuevo (con --sink jsonl)",
+    )
+    parser.add_argument(
+        "--compact-parquet",
+        action="store_true",
+        help="al terminar, compacta los shards jsonl en <run>/ocr_results.parquet",
+    )
+
+    # cómo se arman los pixel_values
+    parser.add_argument(
+        "--preprocess",
+        choices=list(PREPROCESS_METHODS),
+        default=None,
+        help="vectorized (tensor sobre recortes en gris) o processor (pil + TrOCRProcessor); default en config/ocr.yaml",
+    )
+
+    # procesos de ocr en cpu que comparten los pesos del modelo
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="procesos ocr en cpu (fork) con el modelo compartido; reparte los hilos de torch entre ellos",
+    )
+
+    # motor de inferencia
+    parser.add_argument(
+        "--backend",
+        choices=["torch", "onnx"],
+        default="torch",
+        help="torch (eager) u onnx (onnxruntime en cpu, exporta y cachea los grafos)",
+    )
+
+    # raster de la página 1 en sat-template
+    parser.add_argument(
+        "--raster",
+        choices=list(RASTER_METHODS),
+        default=None,
+        help="page (página completa + recorte) o regions (pdftoppm solo sobre las cajas sat); default en config/ocr.yaml",
+    )
+
+    # atajo para fel digitales
+    parser.add_argument(
+        "--no-text-layer",
+        action="store_true",
+        help="ignora la capa de texto del pdf y pasa todas las regiones por trocr",
+    )
+
+    # salida en consola
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="muestra una barra de progreso por factura (tqdm)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="imprime cada pdf y cada región (lento en corridas grandes)",
+    )
+
     args = parser.parse_args()
 
     # crear path solo si se definió
     debug_dir = Path(args.debug_crops_dir) if args.debug_crops_dir else None
 
+    pipeline_cfg = None
+    if args.pipeline:
+        pipeline_cfg = PipelineConfig(
+            raster_workers=args.raster_workers,
+            preprocess_workers=args.preprocess_workers,
+            queue_size=args.queue_size,
+        )
+
     runOcr(
         max_per_category=args.max_per_category,
         device_preference=args.device,
@@ -415,6 +1481,23 @@ def main():
         overwrite=args.overwrite,
         model_dir=args.model_dir,
         debug_dir=debug_dir,
+        batch_size=args.batch_size,
+        pipeline_cfg=pipeline_cfg,
+        use_ocr_cache=not args.no_ocr_cache,
+        ocr_cache_max_bytes=args.ocr_cache_max_mb * 1024 * 1024,
+        resume_run_id=args.resume,
+        incremental=args.incremental,
+        quantize=None if args.quantize == "none" else args.quantize,
+        backend=args.backend,
+        workers=max(1, args.workers),
+        sink_kind=args.sink,
+        shard_records=args.shard_records,
+        compact_parquet=args.compact_parquet,
+        preprocess=args.preprocess,
+        progress=args.progress,
+        verbose=args.verbose,
+        raster=args.raster,
+        text_layer=False if args.no_text_layer else None,
     )
 
 
@@ -0,0 +1,316 @@
+from pathlib import Path
+import json
+
+import numpy as np
+import torch
+from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+from src.budget_buddy.utils.common_models import resolveModelDir
+from src.budget_buddy.utils.timing import timeStage
+
+
+ROOT = Path(".")
+ONNX_ROOT = ROOT / "models" / "onnx"
+ONNX_OPSET = 17
+
+ENCODER_FILE = "encoder.onnx"
+DECODER_INIT_FILE = "decoder_init.onnx"
+DECODER_PAST_FILE = "decoder_with_past.onnx"
+META_FILE = "onnx_meta.json"
+
+
+def getOnnxDir(modelDir: str) -> Path:
+    # carpeta local: subcarpeta onnx/; modelo del hub: bajo models/onnx
+    p = Path(modelDir)
+    if p.is_dir():
+        return p / "onnx"
+    return ONNX_ROOT / modelDir.replace("/", "__")
+
+
+def isOnnxExportFresh(onnx_dir: Path, modelDir: str) -> bool:
+    # los grafos valen si existen y son más nuevos que los pesos locales
+    files = [onnx_dir / f for f in (ENCODER_FILE, DECODER_INIT_FILE, DECODER_PAST_FILE, META_FILE)]
+    if not all(f.exists() for f in files):
+        return False
+
+    p = Path(modelDir)
+    if not p.is_dir():
+        return True
+
+    weights = list(p.glob("*.safetensors")) + list(p.glob("*.bin"))
+    newest = max((w.stat().st_mtime for w in weights), default=0.0)
+    return min(f.stat().st_mtime for f in files) >= newest
+
+
+class _EncoderWrapper(torch.nn.Module):
+    # pixel_values -> encoder_hidden_states
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+        self.enc_to_dec_proj = getattr(model, "enc_to_dec_proj", None)
+
+    def forward(self, pixel_values):
+        hidden = self.encoder(pixel_values=pixel_values, return_dict=True).last_hidden_state
+        if self.enc_to_dec_proj is not None:
+            hidden = self.enc_to_dec_proj(hidden)
+        return hidden
+
+
+class _DecoderWrapper(torch.nn.Module):
+    # (input_ids, encoder_hidden_states, *past) -> (logits, *present)
+    def __init__(self, model, num_layers: int, with_past: bool):
+        super().__init__()
+        self.decoder = model.decoder
+        self.num_layers = num_layers
+        self.with_past = with_past
+
+    def forward(self, input_ids, encoder_hidden_states, *past_flat):
+        past = None
+        if self.with_past:
+            # formato legacy: por capa (k_self, v_self, k_cross, v_cross)
+            past = tuple(
+                tuple(past_flat[i * 4:(i + 1) * 4])
+                for i in range(self.num_layers)
+            )
+
+        out = self.decoder(
+            input_ids=input_ids,
+            encoder_hidden_states=encoder_hidden_states,
+            past_key_values=past,
+            use_cache=True,
+            return_dict=True,
+        )
+
+        present = out.past_key_values
+        if hasattr(present, "to_legacy_cache"):
+            present = present.to_legacy_cache()
+
+        flat = [t for layer in present for t in layer]
+        return (out.logits, *flat)
+
+
+def getPastNames(num_layers: int, prefix: str) -> list[str]:
+    names = []
+    for i in range(num_layers):
+        names += [
+            f"{prefix}.{i}.self.key",
+            f"{prefix}.{i}.self.value",
+            f"{prefix}.{i}.cross.key",
+            f"{prefix}.{i}.cross.value",
+        ]
+    return names
+
+
+def exportTrocrOnnx(modelDir: str, overwrite: bool = False) -> Path:
+    # exporta encoder + decoder (inicial y con past) y los cachea por modelo
+    modelDir = resolveModelDir(modelDir)
+    onnx_dir = getOnnxDir(modelDir)
+    if not overwrite and isOnnxExportFresh(onnx_dir, modelDir):
+        return onnx_dir
+
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+    processor = TrOCRProcessor.from_pretrained(modelDir)
+    model = VisionEncoderDecoderModel.from_pretrained(modelDir)
+    model.eval()
+
+    num_layers = model.config.decoder.decoder_layers
+    size = processor.image_processor.size
+    height, width = size["height"], size["width"]
+
+    pixel_values = torch.randn(1, 3, height, width)
+    start_id = model.config.decoder_start_token_id
+    if start_id is None:
+        start_id = model.config.decoder.bos_token_id
+
+    print(f"exportando onnx de {modelDir} → {onnx_dir}")
+    with torch.no_grad():
+        encoder = _EncoderWrapper(model)
+        torch.onnx.export(
+            encoder,
+            (pixel_values,),
+            str(onnx_dir / ENCODER_FILE),
+            input_names=["pixel_values"],
+            output_names=["encoder_hidden_states"],
+            dynamic_axes={
+                "pixel_values": {0: "batch"},
+                "encoder_hidden_states": {0: "batch", 1: "enc_seq"},
+            },
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+
+        enc_hidden = encoder(pixel_values)
+        input_ids = torch.full((1, 1), start_id, dtype=torch.long)
+        present_names = getPastNames(num_layers, "present")
+        past_names = getPastNames(num_layers, "past")
+
+        # paso inicial: sin past
+        init_axes = {
+            "input_ids": {0: "batch", 1: "dec_seq"},
+            "encoder_hidden_states": {0: "batch", 1: "enc_seq"},
+            "logits": {0: "batch", 1: "dec_seq"},
+        }
+        for name in present_names:
+            init_axes[name] = {0: "batch", 2: "total_seq" if ".self." in name else "enc_seq"}
+
+        torch.onnx.export(
+            _DecoderWrapper(model, num_layers, with_past=False),
+            (input_ids, enc_hidden),
+            str(onnx_dir / DECODER_INIT_FILE),
+            input_names=["input_ids", "encoder_hidden_states"],
+            output_names=["logits"] + present_names,
+            dynamic_axes=init_axes,
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+
+        # pasos siguientes: un token nuevo + past de los pasos previos
+        decoder = _DecoderWrapper(model, num_layers, with_past=False)
+        init_out = decoder(input_ids, enc_hidden)
+        past = list(init_out[1:])
+
+        past_axes = dict(init_axes)
+        for name in past_names:
+            past_axes[name] = {0: "batch", 2: "past_seq" if ".self." in name else "enc_seq"}
+
+        torch.onnx.export(
+            _DecoderWrapper(model, num_layers, with_past=True),
+            (input_ids, enc_hidden, *past),
+            str(onnx_dir / DECODER_PAST_FILE),
+            input_names=["input_ids", "encoder_hidden_states"] + past_names,
+            output_names=["logits"] + present_names,
+            dynamic_axes=past_axes,
+            opset_version=ONNX_OPSET,
+            dynamo=False,
+        )
+
+    meta = {
+        "model_dir": modelDir,
+        "num_layers": num_layers,
+        "decoder_start_token_id": start_id,
+        "eos_token_id": model.config.decoder.eos_token_id,
+        "pad_token_id": model.config.decoder.pad_token_id,
+    }
+    (onnx_dir / META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    processor.save_pretrained(str(onnx_dir))
+    return onnx_dir
+
+
+class OnnxTrocrModel:
+    # greedy decoding con onnxruntime; imita model.generate para el resto del código
+    def __init__(self, onnx_dir: Path, num_threads: int | None = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise RuntimeError("backend onnx requiere onnxruntime (pip install onnxruntime)") from exc
+
+        self.onnx_dir = Path(onnx_dir)
+        self.meta = json.loads((self.onnx_dir / META_FILE).read_text(encoding="utf-8"))
+        self.num_layers = self.meta["num_layers"]
+        self.past_names = getPastNames(self.num_layers, "past")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            opts.intra_op_num_threads = num_threads
+        providers = ["CPUExecutionProvider"]
+
+        self.encoder = ort.InferenceSession(str(self.onnx_dir / ENCODER_FILE), opts, providers=providers)
+        self.decoder_init = ort.InferenceSession(str(self.onnx_dir / DECODER_INIT_FILE), opts, providers=providers)
+        self.decoder_past = ort.InferenceSession(str(self.onnx_dir / DECODER_PAST_FILE), opts, providers=providers)
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        if torch.device(device).type != "cpu":
+            raise RuntimeError("backend onnx solo corre en cpu")
+        return self
+
+    def generate(
+        self,
+        pixel_values,
+        max_new_tokens: int = 256,
+        stopping_criteria=None,
+        timings: dict | None = None,
+        **kwargs,
+    ):
+        pixel_np = pixel_values.detach().cpu().numpy().astype(np.float32)
+        batch = pixel_np.shape[0]
+
+        start_id = self.meta["decoder_start_token_id"]
+        eos_id = self.meta["eos_token_id"]
+        pad_id = self.meta["pad_token_id"]
+
+        with timeStage(timings, "encoder"):
+            enc_hidden = self.encoder.run(None, {"pixel_values": pixel_np})[0]
+
+        with timeStage(timings, "decode"):
+            ids = self._decode(enc_hidden, batch, start_id, eos_id, pad_id, max_new_tokens, stopping_criteria)
+
+        return torch.from_numpy(ids)
+
+    def _decode(self, enc_hidden, batch, start_id, eos_id, pad_id, max_new_tokens, stopping_criteria):
+        ids = np.full((batch, 1), start_id, dtype=np.int64)
+        outputs = self.decoder_init.run(
+            None,
+            {"input_ids": ids, "encoder_hidden_states": enc_hidden},
+        )
+
+        finished = np.zeros(batch, dtype=bool)
+        for _ in range(max_new_tokens):
+            logits, present = outputs[0], outputs[1:]
+            next_ids = logits[:, -1, :].argmax(axis=-1).astype(np.int64)
+
+            # secuencias terminadas se rellenan con pad
+            next_ids = np.where(finished, pad_id, next_ids)
+            ids = np.concatenate([ids, next_ids[:, None]], axis=1)
+
+            finished |= next_ids == eos_id
+
+            # mismas reglas de parada por secuencia que usa generate de hf
+            if stopping_criteria is not None:
+                stop = stopping_criteria(torch.from_numpy(ids), None)
+                finished |= np.asarray(stop, dtype=bool)
+
+            if finished.all():
+                break
+
+            feed = {"input_ids": next_ids[:, None], "encoder_hidden_states": enc_hidden}
+            feed.update(zip(self.past_names, present))
+            outputs = self.decoder_past.run(None, feed)
+
+        return ids
+
+
+def loadOnnxTrocrModel(modelDir: str, num_threads: int | None = None):
+    # exporta si hace falta y devuelve (processor, modelo onnx)
+    onnx_dir = exportTrocrOnnx(modelDir)
+    processor = TrOCRProcessor.from_pretrained(str(onnx_dir))
+    return processor, OnnxTrocrModel(onnx_dir, num_threads=num_threads)
+
+
+def checkOnnxParity(modelDir: str, images, batch_size: int = 8) -> dict:
+    # compara textos del backend onnx contra pytorch sobre los mismos recortes
+    from src.budget_buddy.utils.common_models import loadTrocrModel
+    from src.budget_buddy.ocr.trocr_infer import ocrImagesBatch
+
+    device = torch.device("cpu")
+    processor, torch_model = loadTrocrModel(modelDir, device)
+    torch_texts = ocrImagesBatch(processor, torch_model, images, device, batch_size=batch_size)
+
+    onnx_processor, onnx_model = loadOnnxTrocrModel(modelDir)
+    onnx_texts = ocrImagesBatch(onnx_processor, onnx_model, images, device, batch_size=batch_size)
+
+    mismatches = [
+        {"index": i, "torch": a, "onnx": b}
+        for i, (a, b) in enumerate(zip(torch_texts, onnx_texts))
+        if a != b
+    ]
+    return {
+        "model_dir": modelDir,
+        "num_images": len(images),
+        "num_mismatches": len(mismatches),
+        "match_rate": 1 - len(mismatches) / len(images) if images else 1.0,
+        "mismatches": mismatches,
+    }
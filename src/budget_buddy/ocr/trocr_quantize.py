@@ -0,0 +1,123 @@
+from pathlib import Path
+from datetime import datetime
+import json
+import time
+
+import torch
+
+from src.budget_buddy.utils.common_models import loadTrocrModel
+from src.budget_buddy.preprocessing.pdf_loader import iterSplitPdfs
+from src.budget_buddy.preprocessing.pdf_to_images import loadPdfCrops
+from src.budget_buddy.ocr.trocr_infer import ocrImagesBatch
+
+
+ROOT = Path(".")
+METRICS_ROOT = ROOT / "outputs" / "tables"
+
+
+def levenshtein(a: str, b: str) -> int:
+    # distancia de edición por caracteres (dos filas)
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def charErrorRate(reference: str, hypothesis: str) -> float:
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return levenshtein(reference, hypothesis) / len(reference)
+
+
+def collectSampleCrops(
+    split: str,
+    mode: str,
+    dpi: int,
+    max_per_category: int,
+):
+    # recortes de muestra tomados del split (usa el cache de imágenes)
+    crops = []
+    for category, pdf_path in iterSplitPdfs(split=split, max_per_category=max_per_category):
+        _, jobs = loadPdfCrops(split, category, pdf_path, mode, dpi=dpi)
+        crops.extend(
+            {"pdf_path": str(pdf_path), "slot": slot, "image": img}
+            for slot, img in jobs
+        )
+    return crops
+
+
+def timedOcr(processor, model, images, batch_size: int):
+    start = time.perf_counter()
+    texts = ocrImagesBatch(
+        processor,
+        model,
+        images,
+        torch.device("cpu"),
+        batch_size=batch_size,
+    )
+    return texts, time.perf_counter() - start
+
+
+def compareQuantizedAccuracy(
+    model_dir: str,
+    quantize: str = "int8",
+    split: str = "train",
+    mode: str = "sat-template",
+    dpi: int = 450,
+    max_per_category: int = 3,
+    batch_size: int = 8,
+) -> dict:
+    # compara textos y velocidad fp32 vs cuantizado sobre la misma muestra
+    crops = collectSampleCrops(split, mode, dpi, max_per_category)
+    if not crops:
+        raise RuntimeError(f"no se encontraron recortes de muestra en split={split}")
+    images = [c["image"] for c in crops]
+
+    device = torch.device("cpu")
+    processor, fp32_model = loadTrocrModel(model_dir, device)
+    fp32_texts, fp32_secs = timedOcr(processor, fp32_model, images, batch_size)
+    del fp32_model
+
+    _, q_model = loadTrocrModel(model_dir, device, quantize=quantize)
+    q_texts, q_secs = timedOcr(processor, q_model, images, batch_size)
+
+    rows = []
+    for crop, ref, hyp in zip(crops, fp32_texts, q_texts):
+        rows.append(
+            {
+                "pdf_path": crop["pdf_path"],
+                "slot": crop["slot"],
+                "cer_vs_fp32": charErrorRate(ref, hyp),
+                "exact_match": ref == hyp,
+            }
+        )
+
+    n = len(rows)
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "model_dir": model_dir,
+        "quantize": quantize,
+        "mode": mode,
+        "num_crops": n,
+        "mean_cer_vs_fp32": sum(r["cer_vs_fp32"] for r in rows) / n,
+        "exact_match_rate": sum(r["exact_match"] for r in rows) / n,
+        "fp32_crops_per_sec": n / fp32_secs if fp32_secs else None,
+        "quantized_crops_per_sec": n / q_secs if q_secs else None,
+        "speedup": fp32_secs / q_secs if q_secs else None,
+        "crops": rows,
+    }
+    return report
+
+
+def saveQuantizationReport(report: dict) -> Path:
+    # guarda el reporte junto a las demás tablas de métricas
+    METRICS_ROOT.mkdir(parents=True, exist_ok=True)
+    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    out_path = METRICS_ROOT / f"trocr_quant_{report['quantize']}_{run_id}.json"
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return out_path
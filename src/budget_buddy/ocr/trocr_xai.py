@@ -6,10 +6,10 @@ import torch
 import numpy as np
 from PIL import Image
 
-import matplotlib.pyplot as plt
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
 
 from src.budget_buddy.utils.common_models import getDevice, loadTrocrModelForExplain
+from src.budget_buddy.preprocessing.image_cache import openCachedImage
 
 
 
@@ -25,7 +25,7 @@ def loadTrocrModelForExplain(model_path_or_name: str, device: torch.device):
 
 def computeVisualImportanceMap(model, processor, image_path: str, device: torch.device) -> np.ndarray:
     # genera mapa simple de importancia a partir de la norma de los embeddings de visión
-    img = Image.open(image_path).convert("RGB")
+    img = openCachedImage(image_path).convert("RGB")
 
     inputs = processor(images=img, return_tensors="pt").to(device)
     with torch.no_grad():
@@ -65,12 +65,15 @@ def saveHeatmapOverlay(
     alpha: float = 0.5,
 ):
     # guarda imagen original con heatmap superpuesto
-    img = Image.open(image_path).convert("RGB")
+    img = openCachedImage(image_path).convert("RGB")
     img_w, img_h = img.size
 
     heatmap_img = Image.fromarray((heatmap * 255).astype(np.uint8))
     heatmap_img = heatmap_img.resize((img_w, img_h), resample=Image.BILINEAR)
 
+    # matplotlib solo hace falta al dibujar
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(6, 8))
     plt.imshow(img)
     plt.imshow(heatmap_img, cmap="jet", alpha=alpha)
@@ -0,0 +1,155 @@
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+
+from src.budget_buddy.ocr.ocr_pipeline import STOP
+from src.budget_buddy.ocr.trocr_infer import ocrImagesBatchWithSteps
+from src.budget_buddy.utils.stats import percentile
+
+
+class LatencyStats:
+    # ventana deslizante de muestras para p50/p99
+    def __init__(self, window: int = 2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, value: float):
+        with self._lock:
+            self.samples.append(value)
+            self.count += 1
+
+    def summary(self, scale: float = 1000.0) -> dict:
+        with self._lock:
+            values = list(self.samples)
+            count = self.count
+
+        def scaled(v):
+            return None if v is None else round(v * scale, 2)
+
+        return {
+            "count": count,
+            "p50": scaled(percentile(values, 50)),
+            "p99": scaled(percentile(values, 99)),
+            "max": scaled(max(values) if values else None),
+        }
+
+
+@dataclass
+class CropRequest:
+    image: object
+    decode_cfg: dict
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    # junta recortes de peticiones concurrentes en un solo generate por lote
+    def __init__(
+        self,
+        processor,
+        model,
+        device,
+        max_batch: int = 16,
+        window_ms: float = 15,
+        metrics_window: int = 2048,
+        name: str = "default",
+    ):
+        self.processor = processor
+        self.model = model
+        self.device = device
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window_ms) / 1000
+        self.name = name
+
+        self.queue_wait = LatencyStats(metrics_window)
+        self.batch_time = LatencyStats(metrics_window)
+        self.occupancy = deque(maxlen=metrics_window)
+        self.batches = 0
+        self.generate_calls = 0
+
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, decode_cfg: dict) -> Future:
+        req = CropRequest(image=image, decode_cfg=decode_cfg)
+        self._q.put(req)
+        return req.future
+
+    def _collect(self) -> list[CropRequest] | None:
+        # bloquea hasta el primer recorte y espera a lo sumo window para llenar el lote
+        first = self._q.get()
+        if first is STOP:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                req = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if req is STOP:
+                self._q.put(STOP)
+                break
+            batch.append(req)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            for req in batch:
+                self.queue_wait.add(started - req.enqueued_at)
+
+            try:
+                texts, steps = ocrImagesBatchWithSteps(
+                    self.processor,
+                    self.model,
+                    [req.image for req in batch],
+                    self.device,
+                    batch_size=self.max_batch,
+                    decode_cfgs=[req.decode_cfg for req in batch],
+                )
+            except Exception as exc:
+                for req in batch:
+                    req.future.set_exception(exc)
+                continue
+
+            self.batch_time.add(time.perf_counter() - started)
+            self.occupancy.append(len(batch) / self.max_batch)
+            self.batches += 1
+            # un generate por config de decodificación distinta dentro del lote
+            self.generate_calls += len({repr(sorted(req.decode_cfg.items())) for req in batch})
+
+            for req, text, n_steps in zip(batch, texts, steps):
+                req.future.set_result((text, n_steps))
+
+    def metrics(self) -> dict:
+        occupancy = list(self.occupancy)
+        return {
+            "model": self.name,
+            "max_batch": self.max_batch,
+            "window_ms": self.window * 1000,
+            "queue_depth": self._q.qsize(),
+            "batches": self.batches,
+            "generate_calls": self.generate_calls,
+            "occupancy_mean": round(sum(occupancy) / len(occupancy), 3) if occupancy else None,
+            "occupancy_p50": percentile(occupancy, 50),
+            "queue_wait_ms": self.queue_wait.summary(),
+            "batch_time_ms": self.batch_time.summary(),
+        }
+
+    def close(self):
+        self._q.put(STOP)
+        self._thread.join(timeout=5)
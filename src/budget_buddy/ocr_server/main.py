@@ -0,0 +1,154 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
+import asyncio
+import io
+import tempfile
+import time
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from PIL import Image
+
+from src.budget_buddy.ocr.ocr_config import loadOcrConfig
+from src.budget_buddy.ocr.trocr_infer import buildPayload, getSlotDecodeConfig, setPreprocessMethod
+from src.budget_buddy.ocr.trocr_onnx import loadOnnxTrocrModel
+from src.budget_buddy.layout.sat_template import getRegionDecodeConfigs
+from src.budget_buddy.preprocessing.crop_filter import findBlankCrops
+from src.budget_buddy.preprocessing.pdf_to_images import buildCropJobs, pdfToImages
+from src.budget_buddy.utils.common_models import getDevice, loadTrocrModel
+from src.budget_buddy.ocr_server.batcher import LatencyStats, MicroBatcher
+
+
+# estado del servicio: un batcher por modelo cargado
+SERVER_CFG = loadOcrConfig()
+BATCHERS: dict[str, MicroBatcher] = {}
+REQUEST_LATENCY: dict[str, LatencyStats] = {}
+
+
+def loadBatchers(server_cfg: dict) -> dict[str, MicroBatcher]:
+    # carga cada modelo una sola vez y lo deja caliente detrás de su batcher
+    device = getDevice(server_cfg["device"])
+    batchers = {}
+
+    for model_dir in server_cfg["models"]:
+        if server_cfg["backend"] == "onnx":
+            processor, model = loadOnnxTrocrModel(model_dir)
+        else:
+            processor, model = loadTrocrModel(model_dir, device, quantize=server_cfg["quantize"])
+
+        batchers[model_dir] = MicroBatcher(
+            processor,
+            model,
+            device,
+            max_batch=server_cfg["max_batch"],
+            window_ms=server_cfg["window_ms"],
+            metrics_window=server_cfg["metrics_window"],
+            name=model_dir,
+        )
+        REQUEST_LATENCY[model_dir] = LatencyStats(server_cfg["metrics_window"])
+        print(f"modelo listo: {model_dir} ({device})")
+
+    return batchers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setPreprocessMethod(SERVER_CFG["preprocess"]["method"])
+    BATCHERS.update(loadBatchers(SERVER_CFG["server"]))
+    yield
+    for batcher in BATCHERS.values():
+        batcher.close()
+    BATCHERS.clear()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def loadUploadImages(filename: str, data: bytes, dpi: int) -> list[Image.Image]:
+    # pdf → páginas vía poppler; cualquier otra cosa se abre como imagen
+    if filename.lower().endswith(".pdf") or data[:5] == b"%PDF-":
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            tmp.write(data)
+            tmp.flush()
+            return pdfToImages(Path(tmp.name), dpi=dpi)
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"archivo no es pdf ni imagen: {exc}")
+    return [img.convert("L")]
+
+
+@app.post("/ocr")
+async def ocr_upload(
+    file: UploadFile = File(...),
+    mode: str = Query("sat-template", pattern="^(full|sat-template)$"),
+    model: str | None = None,
+):
+    model_dir = model or SERVER_CFG["server"]["models"][0]
+    batcher = BATCHERS.get(model_dir)
+    if batcher is None:
+        raise HTTPException(status_code=404, detail=f"modelo no cargado: {model_dir}")
+
+    started = time.perf_counter()
+    data = await file.read()
+    images = await asyncio.to_thread(
+        loadUploadImages, file.filename or "", data, SERVER_CFG["server"]["dpi"]
+    )
+    if not images:
+        raise HTTPException(status_code=400, detail="no se pudieron obtener imágenes")
+
+    jobs = buildCropJobs(images, mode)
+    skip = findBlankCrops([img for _, img in jobs], SERVER_CFG["blank_filter"])
+    region_decode = getRegionDecodeConfigs() if mode != "full" else None
+
+    # cada recorte entra a la cola compartida; los vacíos no pasan por el modelo
+    pending = [
+        None if is_blank else asyncio.wrap_future(
+            batcher.submit(img, getSlotDecodeConfig(slot, region_decode))
+        )
+        for (slot, img), is_blank in zip(jobs, skip)
+    ]
+    results = await asyncio.gather(*(p for p in pending if p is not None))
+
+    results_iter = iter(results)
+    slot_texts, decode_steps, skipped_slots = [], {}, {}
+    for (slot, _), p in zip(jobs, pending):
+        if p is None:
+            slot_texts.append((slot, ""))
+            decode_steps[slot] = 0
+            skipped_slots[slot] = "blank"
+            continue
+        text, n_steps = next(results_iter)
+        slot_texts.append((slot, text))
+        decode_steps[slot] = n_steps
+
+    payload = buildPayload(
+        pdf_path=Path(file.filename or "upload"),
+        category="",
+        mode=mode,
+        model_dir=model_dir,
+        num_pages=len(images),
+        slot_texts=slot_texts,
+        skipped_slots=skipped_slots,
+        decode_steps=decode_steps,
+    )
+
+    elapsed = time.perf_counter() - started
+    REQUEST_LATENCY[model_dir].add(elapsed)
+    payload["latency_ms"] = round(elapsed * 1000, 2)
+    return payload
+
+
+@app.get("/metrics")
+def metrics():
+    # p50/p99 por petición y ocupación de lotes para ajustar window_ms / max_batch
+    return {
+        name: {**batcher.metrics(), "request_latency_ms": REQUEST_LATENCY[name].summary()}
+        for name, batcher in BATCHERS.items()
+    }
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "models": list(BATCHERS)}
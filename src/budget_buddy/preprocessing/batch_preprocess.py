@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import numpy as np
+from PIL import Image
+
+from src.budget_buddy.utils.lazy_import import lazyImport
+
+torch = lazyImport("torch")
+
+
+# enums de resample de PIL → modos de torch.nn.functional.interpolate
+RESAMPLE_MODES = {
+    Image.NEAREST: "nearest",
+    Image.BILINEAR: "bilinear",
+    Image.BICUBIC: "bicubic",
+}
+
+
+def getProcessorParams(processor) -> dict:
+    # copia los parámetros del image processor (vit) para replicarlos en tensor
+    ip = getattr(processor, "image_processor", processor)
+    size = ip.size
+    return {
+        "height": size["height"],
+        "width": size["width"],
+        "mode": RESAMPLE_MODES.get(ip.resample, "bilinear"),
+        "do_rescale": ip.do_rescale,
+        "rescale_factor": ip.rescale_factor,
+        "do_normalize": ip.do_normalize,
+        "mean": list(ip.image_mean),
+        "std": list(ip.image_std),
+    }
+
+
+def toGrayArray(img: Image.Image) -> np.ndarray:
+    # los pngs y recortes ya vienen en gris; los rgb se colapsan una sola vez
+    if img.mode != "L":
+        img = img.convert("L")
+    return np.asarray(img)
+
+
+def batchPreprocess(images: list[Image.Image], params: dict, device=None):
+    # recortes en gris → tensor (n, 3, h, w) normalizado como TrOCRProcessor
+    n = len(images)
+    out = torch.empty((n, 1, params["height"], params["width"]), dtype=torch.float32, device=device)
+    mode = params["mode"]
+    antialias = mode in ("bilinear", "bicubic")
+
+    # un interpolate por tamaño de recorte (en sat-template cada región comparte tamaño)
+    groups = {}
+    for idx, img in enumerate(images):
+        arr = toGrayArray(img)
+        groups.setdefault(arr.shape, []).append((idx, arr))
+
+    for members in groups.values():
+        idxs = [idx for idx, _ in members]
+        stack = torch.from_numpy(np.stack([arr for _, arr in members]))[:, None]
+        stack = stack.to(out.device).float()
+
+        resized = torch.nn.functional.interpolate(
+            stack,
+            size=(params["height"], params["width"]),
+            mode=mode,
+            antialias=antialias,
+            **({} if mode == "nearest" else {"align_corners": False}),
+        )
+        # PIL redondea y recorta a uint8 tras el resize
+        resized = resized.round().clamp_(0, 255)
+        out[idxs] = resized
+
+    if params["do_rescale"]:
+        out = out * params["rescale_factor"]
+
+    # el paso a 3 canales ocurre recién acá, por broadcasting con mean/std por canal
+    mean = torch.tensor(params["mean"], dtype=out.dtype, device=out.device).view(1, -1, 1, 1)
+    std = torch.tensor(params["std"], dtype=out.dtype, device=out.device).view(1, -1, 1, 1)
+    if params["do_normalize"]:
+        return (out - mean) / std
+    return out.expand(-1, mean.shape[1], -1, -1).contiguous()
+
+
+def checkPreprocessParity(processor, images: list[Image.Image], atol: float = 0.05) -> dict:
+    # compara contra el camino original (pil rgb + processor) sobre los mismos recortes
+    reference = processor(images=[img.convert("RGB") for img in images], return_tensors="pt").pixel_values
+    fast = batchPreprocess(images, getProcessorParams(processor))
+
+    diff = (reference - fast).abs()
+    per_image = diff.flatten(1).max(dim=1).values
+    return {
+        "num_images": len(images),
+        "max_abs_diff": float(diff.max()) if len(images) else 0.0,
+        "mean_abs_diff": float(diff.mean()) if len(images) else 0.0,
+        "num_over_tol": int((per_image > atol).sum()),
+        "atol": atol,
+        "ok": bool((per_image <= atol).all()),
+    }
@@ -1,24 +1,115 @@
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import json
+import os
 import re
+import shutil
+import threading
 import pandas as pd
 from tqdm import tqdm
 
-from src.budget_buddy.utils.io import sha256File, toCsv
+from src.budget_buddy.preprocessing.hash_index import DEFAULT_HASH_WORKERS, hashFiles, sha256Cached
+from src.budget_buddy.preprocessing.zip_manifest import (
+    STORAGE_ARCHIVE,
+    STORAGE_EXTRACTED,
+    hashArchiveMembers,
+    isPdfMember,
+)
+from src.budget_buddy.utils.io import toCsv
 
 # regex para leer year y block desde nombre
 BLOCK_RE = re.compile(r"(?P<year>\d{4})_b(?P<block>[1-6])\.zip$", re.IGNORECASE)
+# se escribe dentro de la carpeta temporal antes del rename: si existe, la extracción terminó
+UNZIP_MARKER = ".unzip_complete.json"
+DEFAULT_UNZIP_WORKERS = min(8, os.cpu_count() or 1)
 
-def unzipAll(raw_dir: Path, interim_unzip_dir: Path):
-    # descomprime cada zip en carpeta propia
+def archiveStamp(zip_path: Path) -> dict:
+    # tamaño y mtime del zip: comparar esto es O(1), sin leer el archivo
+    st = zip_path.stat()
+    return {"zip": zip_path.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def readUnzipMarker(out_dir: Path) -> dict | None:
+    marker_path = out_dir / UNZIP_MARKER
+    if not marker_path.exists():
+        return None
+    try:
+        return json.loads(marker_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def writeUnzipMarker(out_dir: Path, zip_path: Path, **extra):
+    marker = {**archiveStamp(zip_path), "sha256": sha256Cached(zip_path), **extra}
+    (out_dir / UNZIP_MARKER).write_text(json.dumps(marker, indent=2), encoding="utf-8")
+
+def isUnzipCurrent(zip_path: Path, out_dir: Path) -> bool:
+    # la carpeta corresponde al zip actual (marcador escrito al terminar la extracción)
+    marker = readUnzipMarker(out_dir)
+    if marker is None:
+        return False
+
+    stamp = archiveStamp(zip_path)
+    if marker.get("size") == stamp["size"] and marker.get("mtime_ns") == stamp["mtime_ns"]:
+        return True
+
+    # zip copiado de nuevo o tocado: decide el contenido
+    if stamp["size"] == marker.get("size") and marker.get("sha256") == sha256Cached(zip_path):
+        writeUnzipMarker(out_dir, zip_path, members=marker.get("members"))
+        return True
+    return False
+
+def extractArchive(zip_path: Path, out_dir: Path) -> int:
+    # extrae a una carpeta oculta y la renombra al final: una caída nunca deja una carpeta "lista" a medias
+    tag = f"{os.getpid()}-{threading.get_ident()}"
+    tmp_dir = out_dir.parent / f".{out_dir.name}.tmp-{tag}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        zf.extractall(tmp_dir)
+        members = len(zf.namelist())
+    writeUnzipMarker(tmp_dir, zip_path, members=members)
+
+    if out_dir.exists():
+        # el zip cambió: se reemplaza la carpeta completa
+        old_dir = out_dir.parent / f".{out_dir.name}.old-{tag}"
+        os.rename(out_dir, old_dir)
+        os.rename(tmp_dir, out_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.rename(tmp_dir, out_dir)
+    return members
+
+def unzipAll(raw_dir: Path, interim_unzip_dir: Path, workers: int = DEFAULT_UNZIP_WORKERS, force: bool = False):
+    # descomprime cada zip en carpeta propia, varios a la vez
+    interim_unzip_dir.mkdir(parents=True, exist_ok=True)
     zips = sorted(raw_dir.glob("*.zip"))
-    for z in tqdm(zips, desc="unzip"):
+
+    # restos de una corrida que se cortó a la mitad
+    for stale in [*interim_unzip_dir.glob(".*.tmp-*"), *interim_unzip_dir.glob(".*.old-*")]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+    todo = []
+    for z in zips:
         out_dir = interim_unzip_dir / z.stem
-        if any(out_dir.glob("**/*")):
+        if not force and isUnzipCurrent(z, out_dir):
             continue  # ya estaba descomprimido
-        out_dir.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(z, "r") as zf:
-            zf.extractall(out_dir)
+        if not force and readUnzipMarker(out_dir) is None and out_dir.is_dir() and next(out_dir.iterdir(), None):
+            # carpeta de antes de los marcadores: se adopta tal cual (re-extraer traería de vuelta
+            # los pdfs ya movidos a splits o a la papelera); --force-unzip la regenera
+            writeUnzipMarker(out_dir, z, adopted=True)
+            print(f"\t[unzip] carpeta existente sin marcador, se adopta: {out_dir}")
+            continue
+        todo.append(z)
+
+    if not todo:
+        return
+
+    # zlib suelta el gil al descomprimir: con hilos alcanza
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda z: extractArchive(z, interim_unzip_dir / z.stem), todo)
+        for _ in tqdm(results, total=len(todo), desc="unzip"):
+            pass
 
 def parseBlock(zip_name: str):
     # extrae year y block del nombre
@@ -27,25 +118,83 @@ def parseBlock(zip_name: str):
         return None, None
     return int(m.group("year")), int(m.group("block"))
 
-def scanPdfs(interim_unzip_dir: Path):
+def scanPdfs(interim_unzip_dir: Path, skip_roots: set[str] | None = None):
     # recorre todos los pdfs bajo /unzipped
     rows = []
     for zip_root in sorted(interim_unzip_dir.iterdir()):
-        if not zip_root.is_dir():
+        # las carpetas ocultas son extracciones en curso (.tmp) o reemplazos (.old)
+        if not zip_root.is_dir() or zip_root.name.startswith(".") or zip_root.name in (skip_roots or set()):
             continue
-        year, block = parseBlock(zip_root.name + ".zip")
         for pdf in zip_root.rglob("*.pdf"):
-            rows.append({
-                "zip_root": zip_root.name,
-                "year": year,
-                "block": block,
-                "pdf_relpath": str(pdf.relative_to(zip_root)),
-                "pdf_filename": pdf.name,
-                "pdf_path": str(pdf),
-                "size_bytes": pdf.stat().st_size,
-            })
+            rows.append(buildPdfRow(zip_root.name, pdf, str(pdf.relative_to(zip_root)), pdf.stat().st_size))
     return pd.DataFrame(rows)
 
+def buildPdfRow(zip_root: str, pdf_path, pdf_relpath: str, size_bytes: int) -> dict:
+    # fila base del manifest para un pdf descomprimido
+    year, block = parseBlock(zip_root + ".zip")
+    return {
+        "zip_root": zip_root,
+        "year": year,
+        "block": block,
+        "pdf_relpath": pdf_relpath,
+        "pdf_filename": Path(pdf_path).name,
+        "pdf_path": str(pdf_path),
+        "size_bytes": size_bytes,
+    }
+
+def scanZipPdfs(raw_dir: Path, interim_unzip_dir: Path, exclude_paths: set[str] | None = None):
+    # manifest leído del directorio central de cada zip (infolist): no se descomprime nada
+    # pdf_path es donde quedaría el pdf al extraerlo, igual que con unzipAll + scanPdfs
+    exclude_paths = exclude_paths or set()
+    rows = []
+    zip_roots = set()
+    for z in sorted(raw_dir.glob("*.zip")):
+        zip_roots.add(z.stem)
+        year, block = parseBlock(z.name)
+        with zipfile.ZipFile(z, "r") as zf:
+            for info in zf.infolist():
+                if not isPdfMember(info):
+                    continue
+                pdf_path = interim_unzip_dir / z.stem / info.filename
+                if str(pdf_path) in exclude_paths:
+                    continue
+                rows.append({
+                    "zip_root": z.stem,
+                    "year": year,
+                    "block": block,
+                    "pdf_relpath": info.filename,
+                    "pdf_filename": Path(info.filename).name,
+                    "pdf_path": str(pdf_path),
+                    "size_bytes": info.file_size,
+                    "storage": STORAGE_EXTRACTED if pdf_path.exists() else STORAGE_ARCHIVE,
+                    "zip_path": str(z),
+                    "zip_member": info.filename,
+                })
+
+    # carpetas ya descomprimidas cuyo zip ya no está en raw (solo existen en disco)
+    extracted = pd.DataFrame()
+    if interim_unzip_dir.exists():
+        extracted = scanPdfs(interim_unzip_dir, skip_roots=zip_roots)
+    if not extracted.empty:
+        extracted["storage"] = STORAGE_EXTRACTED
+
+    return pd.concat([pd.DataFrame(rows), extracted], ignore_index=True)
+
+def hashManifestRows(rows: pd.DataFrame, workers: int = DEFAULT_HASH_WORKERS, kind: str = "full"):
+    # sha256 por fila: del archivo en disco o del stream del miembro dentro del zip
+    if "storage" not in rows.columns:
+        return hashFiles(list(rows["pdf_path"]), workers=workers, kind=kind)
+
+    hashes = pd.Series(None, index=rows.index, dtype=object)
+    in_zip = rows["storage"] == STORAGE_ARCHIVE
+    on_disk = rows[~in_zip]
+    archived = rows[in_zip]
+    hashes.loc[on_disk.index] = hashFiles(list(on_disk["pdf_path"]), workers=workers, kind=kind)
+    hashes.loc[archived.index] = hashArchiveMembers(
+        list(archived["zip_path"]), list(archived["zip_member"]), kind=kind, workers=workers
+    )
+    return list(hashes)
+
 def markDuplicatesByName(df: pd.DataFrame):
     # marca duplicados por nombre
     df["name_count"] = df.groupby("pdf_filename")["pdf_filename"].transform("count")
@@ -56,31 +205,77 @@ def markDuplicatesByName(df: pd.DataFrame):
     )  # zip donde apareció primero
     return df
 
-def addHashes(df: pd.DataFrame):
-    # calcula sha256 por archivo
-    hashes = []
-    for path in tqdm(df["pdf_path"], desc="sha256"):
-        hashes.append(sha256File(Path(path)))
-    df["sha256"] = hashes
-    df["hash_count"] = df.groupby("sha256")["sha256"].transform("count")
+def findContentDuplicates(df: pd.DataFrame, also_hash=None, workers: int = DEFAULT_HASH_WORKERS):
+    # sha256 solo donde hace falta: tamaño → primeros/últimos 64 KiB → archivo completo
+    # also_hash: máscara de filas que necesitan el sha256 aunque sean únicas (p. ej. duplicados por nombre)
+    size_count = df.groupby("size_bytes")["size_bytes"].transform("count")
+    candidates = df[size_count > 1]
+
+    # etapa 2: hash parcial solo dentro de colisiones de tamaño
+    partial = pd.Series(
+        hashManifestRows(candidates, workers=workers, kind="partial"),
+        index=candidates.index,
+        dtype=object,
+    )
+    partial_count = (
+        candidates.assign(partial=partial)
+        .groupby(["size_bytes", "partial"])["partial"]
+        .transform("count")
+    )
+
+    # etapa 3: hash completo de lo que sigue chocando
+    need_full = df.index.isin(partial_count[partial_count > 1].index)
+    if also_hash is not None:
+        need_full |= also_hash.to_numpy(dtype=bool)
+    full_rows = df[need_full]
+
+    sha256 = pd.Series(None, index=df.index, dtype=object)
+    sha256.loc[full_rows.index] = hashManifestRows(full_rows, workers=workers)
+
+    print(
+        f"sha256 por etapas: {len(df)} pdfs, {len(candidates)} con tamaño repetido, "
+        f"{int((partial_count > 1).sum())} con hash parcial repetido, {len(full_rows)} hasheados completos"
+    )
+    return sha256
+
+def addHashes(df: pd.DataFrame, workers: int = DEFAULT_HASH_WORKERS, full_hash: bool = True):
+    # sha256 de todos los pdfs; con full_hash=False solo de los duplicados posibles (el resto queda vacío)
+    if full_hash:
+        df["sha256"] = hashManifestRows(df, workers=workers)
+    else:
+        also = df["is_name_duplicate"] if "is_name_duplicate" in df.columns else None
+        df["sha256"] = findContentDuplicates(df, also_hash=also, workers=workers)
+
+    # un archivo sin sha256 no comparte contenido con ningún otro
+    df["hash_count"] = df.groupby("sha256")["sha256"].transform("count").fillna(1).astype(int)
     df["is_hash_duplicate"] = df["hash_count"] > 1
     return df
 
 def buildManifest(interim_unzip_dir: Path, manifest_csv: Path, duplicates_csv: Path,
-                  compute_hash=False, overwrite=False):
+                  compute_hash=False, overwrite=False, hash_workers=DEFAULT_HASH_WORKERS,
+                  full_hash=True, raw_dir: Path | None = None, exclude_paths: set[str] | None = None):
     # construye manifest y reporte de duplicados
-    df = scanPdfs(interim_unzip_dir)
+    # con raw_dir se lee directo de los zips (columna storage: archive | extracted)
+    if raw_dir is not None:
+        df = scanZipPdfs(raw_dir, interim_unzip_dir, exclude_paths=exclude_paths)
+    else:
+        df = scanPdfs(interim_unzip_dir)
     if df.empty:
-        raise RuntimeError("no se encontraron pdfs en data/interim/unzipped")
+        raise RuntimeError("no se encontraron pdfs en data/interim/unzipped ni en los zips")
 
     df = markDuplicatesByName(df)
     if compute_hash:
-        df = addHashes(df)
+        df = addHashes(df, workers=hash_workers, full_hash=full_hash)
 
     # guarda manifest general
     toCsv(df, manifest_csv, overwrite=overwrite)
 
     # crea lista reducida de duplicados
+    toCsv(buildDuplicatesTable(df, compute_hash), duplicates_csv, overwrite=overwrite)
+    return df
+
+def buildDuplicatesTable(df: pd.DataFrame, compute_hash: bool):
+    # lista reducida de duplicados (manifest_duplicates.csv)
     keep_cols = [
         "pdf_filename", "zip_root", "year", "block",
         "size_bytes", "pdf_path", "first_seen_zip",
@@ -90,5 +285,4 @@ def buildManifest(interim_unzip_dir: Path, manifest_csv: Path, duplicates_csv: P
         keep_cols += ["sha256", "is_hash_duplicate"]
 
     dups = df[df["is_name_duplicate"] | (df["is_hash_duplicate"] if compute_hash else False)].copy()
-    dups = dups[keep_cols].sort_values(["pdf_filename", "year", "block"])
-    toCsv(dups, duplicates_csv, overwrite=overwrite)
+    return dups[keep_cols].sort_values(["pdf_filename", "year", "block"])
@@ -0,0 +1,47 @@
+import numpy as np
+from PIL import Image
+
+
+def computeInkStats(img: Image.Image, ink_threshold: int = 200, row_ink_ratio: float = 0.005, stride: int = 1) -> dict:
+    # estadísticas baratas del recorte en gris: tinta, varianza y perfil por filas
+    gray = img if img.mode == "L" else img.convert("L")
+    arr = np.asarray(gray)
+    if stride > 1:
+        arr = arr[::stride, ::stride]
+
+    if arr.size == 0:
+        return {"ink_ratio": 0.0, "std": 0.0, "ink_rows": 0}
+
+    ink = arr < ink_threshold
+    row_profile = ink.mean(axis=1)
+
+    return {
+        "ink_ratio": float(ink.mean()),
+        "std": float(arr.std()),
+        "ink_rows": int((row_profile >= row_ink_ratio).sum()),
+    }
+
+
+def isLowInformationCrop(img: Image.Image, cfg: dict) -> bool:
+    # true si el recorte está casi en blanco y no vale un pase del modelo
+    if not cfg.get("enabled", True):
+        return False
+
+    stats = computeInkStats(
+        img,
+        ink_threshold=cfg["ink_threshold"],
+        row_ink_ratio=cfg["row_ink_ratio"],
+        stride=cfg.get("stride", 1),
+    )
+    return (
+        stats["ink_ratio"] < cfg["min_ink_ratio"]
+        or stats["std"] < cfg["min_std"]
+        or stats["ink_rows"] < cfg["min_ink_rows"]
+    )
+
+
+def findBlankCrops(images: list[Image.Image], cfg: dict | None) -> list[bool]:
+    # máscara de recortes a saltar (todo false si no hay config)
+    if not cfg or not cfg.get("enabled", True):
+        return [False] * len(images)
+    return [isLowInformationCrop(img, cfg) for img in images]
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import sqlite3
+import threading
+import time
+
+from tqdm import tqdm
+
+from src.budget_buddy.utils.io import sha256Edges, sha256File
+
+
+ROOT = Path(".")
+HASH_INDEX_PATH = ROOT / "data" / "interim" / "hash_index.sqlite"
+# lecturas grandes: en un montaje de red cada read es un round-trip
+HASH_CHUNK_SIZE = 8 << 20
+# hashlib suelta el gil al actualizar bloques grandes: los hilos sí escalan
+DEFAULT_HASH_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# full: sha256 del archivo completo | partial: sha256 de los primeros y últimos 64 KiB
+HASH_KINDS = {
+    "full": ("hashes", lambda p: sha256File(p, chunk_size=HASH_CHUNK_SIZE)),
+    "partial": ("partial_hashes", sha256Edges),
+}
+
+
+def statKey(st: os.stat_result) -> tuple[int, int, int]:
+    # si cambia tamaño, mtime o inodo (archivo reemplazado) el hash guardado ya no vale
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class HashIndex:
+    # sha256 por archivo guardado en sqlite; solo se vuelve a leer lo que cambió en disco
+    def __init__(self, path: Path = HASH_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for table, _ in HASH_KINDS.values():
+            self._conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    hashed_at REAL NOT NULL
+                )
+                """
+            )
+        self._conn.commit()
+
+    def getMany(self, keys: dict[str, tuple[int, int, int]], kind: str = "full") -> dict[str, str]:
+        # {ruta: (size, mtime_ns, inode)} → {ruta: sha256} de las que siguen iguales
+        found = {}
+        items = list(keys.items())
+        with self._lock:
+            # sqlite limita la cantidad de parámetros por consulta
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT path, size, mtime_ns, inode, sha256 FROM {HASH_KINDS[kind][0]} "
+                    f"WHERE path IN ({','.join('?' * len(chunk))})",
+                    [path for path, _ in chunk],
+                ).fetchall()
+                for path, size, mtime_ns, inode, sha256 in rows:
+                    if keys[path] == (size, mtime_ns, inode):
+                        found[path] = sha256
+        return found
+
+    def putMany(self, rows: list[tuple[str, tuple[int, int, int], str]], kind: str = "full"):
+        # (ruta, stat key, sha256) en una sola transacción
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {HASH_KINDS[kind][0]}(path, size, mtime_ns, inode, sha256, hashed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, *key, sha256, now) for path, key, sha256 in rows],
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_INDEXES: dict[tuple[int, str], HashIndex] = {}
+
+
+def getHashIndex(path: Path | None = None) -> HashIndex:
+    # una conexión por proceso: sqlite no sobrevive al fork
+    path = Path(path) if path is not None else HASH_INDEX_PATH
+    key = (os.getpid(), str(path.resolve()))
+    if key not in _INDEXES:
+        _INDEXES[key] = HashIndex(path)
+    return _INDEXES[key]
+
+
+def hashFiles(
+    paths: list,
+    index: HashIndex | None = None,
+    workers: int = DEFAULT_HASH_WORKERS,
+    progress: bool = True,
+    kind: str = "full",
+) -> list[str]:
+    # sha256 en el mismo orden que paths; los archivos sin cambios salen del índice
+    index = index or getHashIndex()
+    _, hash_fn = HASH_KINDS[kind]
+    abs_paths = [str(Path(p).resolve()) for p in paths]
+    keys = {path: statKey(os.stat(path)) for path in abs_paths}
+    hashes = index.getMany(keys, kind=kind)
+
+    todo = [path for path in keys if path not in hashes]
+    if todo:
+        pending = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = pool.map(hash_fn, todo)
+            bar = tqdm(results, total=len(todo), desc=f"sha256 {kind}", disable=not progress)
+            for path, sha256 in zip(todo, bar):
+                hashes[path] = sha256
+                pending.append((path, keys[path], sha256))
+                # se guarda por tandas: si se corta a la mitad no se pierde lo ya leído
+                if len(pending) >= 256:
+                    index.putMany(pending, kind=kind)
+                    pending = []
+        if pending:
+            index.putMany(pending, kind=kind)
+
+    return [hashes[path] for path in abs_paths]
+
+
+def sha256Cached(path: Path) -> str:
+    # sha256 de un solo archivo pasando por el índice (llaves del cache de imágenes)
+    return hashFiles([path], progress=False)[0]
@@ -0,0 +1,391 @@
+from pathlib import Path
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from src.budget_buddy.preprocessing.hash_index import sha256Cached
+
+
+ROOT = Path(".")
+LEGACY_IMAGES_ROOT = ROOT / "data" / "interim" / "images"
+IMAGE_CACHE_ROOT = LEGACY_IMAGES_ROOT / "npy"
+SPLITS_ROOT = ROOT / "data" / "splits"
+INDEX_NAME = "index.sqlite"
+PAGE_VARIANT = "page"
+# los procesos spawn (pipeline, benchmark) heredan la raíz por el entorno
+IMAGE_CACHE_ENV = "BUDGET_BUDDY_IMAGE_CACHE"
+LEGACY_PAGE_RE = re.compile(r"^(?P<stem>.+)_p(?P<page>\d+)\.png$")
+# presupuesto de disco (config/ocr.yaml → ocr.image_cache); max_gb null = sin límite
+DEFAULT_IMAGE_CACHE = {
+    "max_gb": None,
+    "low_watermark": 0.9,
+}
+
+
+def loadArray(path: Path) -> np.ndarray:
+    # vista de solo lectura sobre el archivo (mmap): no se copia ni se descomprime nada
+    return np.load(path, mmap_mode="r")
+
+
+def arrayToImage(arr: np.ndarray) -> Image.Image:
+    # uint8 2d contiguo → imagen "L" que comparte el buffer del mmap
+    return Image.fromarray(arr)
+
+
+def openCachedImage(path: Path | str) -> Image.Image:
+    # abre una página del cache npy o un png/jpg cualquiera
+    path = Path(path)
+    if path.suffix == ".npy":
+        return arrayToImage(loadArray(path))
+    return Image.open(path)
+
+
+class ImageCache:
+    # páginas y recortes en gris (uint8, 1 canal) como .npy mapeables
+    # índice sqlite al lado, con llave (sha256 del pdf, página, dpi, variante)
+    # con max_bytes se desalojan los grupos (pdf, dpi, variante) usados hace más tiempo
+    def __init__(
+        self,
+        root: Path = IMAGE_CACHE_ROOT,
+        max_bytes: int | None = None,
+        low_watermark: float = DEFAULT_IMAGE_CACHE["low_watermark"],
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / INDEX_NAME), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                sha256 TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                dpi INTEGER NOT NULL,
+                variant TEXT NOT NULL,
+                path TEXT NOT NULL,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                num_pages INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                pdf_path TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (sha256, page, dpi, variant)
+            )
+            """
+        )
+        # índices creados antes del lru no tienen last_access
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(images)")}
+        if "last_access" not in columns:
+            self._conn.execute("ALTER TABLE images ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE images SET last_access = created_at")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS images_last_access ON images(last_access)")
+        self._conn.commit()
+        self._size_bytes = self._totalBytes()
+
+    def arrayPath(self, sha256: str, page: int, dpi: int, variant: str = PAGE_VARIANT) -> Path:
+        # dos niveles por prefijo del hash para no llenar un solo directorio
+        suffix = "" if variant == PAGE_VARIANT else f"_{variant}"
+        return self.root / sha256[:2] / f"{sha256}_p{page}_{dpi}{suffix}.npy"
+
+    def _rows(self, sha256: str, dpi: int, variant: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT page, path, num_pages FROM images "
+                "WHERE sha256 = ? AND dpi = ? AND variant = ? ORDER BY page",
+                (sha256, dpi, variant),
+            ).fetchall()
+
+    def pagePaths(
+        self,
+        sha256: str,
+        dpi: int,
+        max_pages: int | None = None,
+        variant: str = PAGE_VARIANT,
+    ) -> tuple[int, list[Path]] | None:
+        # (total de páginas del pdf, archivos de las primeras max_pages) o None si falta alguna
+        rows = self._rows(sha256, dpi, variant)
+        if not rows:
+            return None
+
+        num_pages = rows[0][2]
+        want = num_pages if max_pages is None else min(num_pages, max_pages)
+        by_page = {page: self.root / rel for page, rel, _ in rows}
+        paths = [by_page.get(page) for page in range(1, want + 1)]
+        if any(p is None or not p.exists() for p in paths):
+            return None
+        return num_pages, paths
+
+    def getPages(
+        self,
+        sha256: str,
+        dpi: int,
+        max_pages: int | None = None,
+        variant: str = PAGE_VARIANT,
+    ) -> tuple[int, list[np.ndarray]] | None:
+        # arreglos mmap de las páginas pedidas; None = no está (completo) en el cache
+        found = self.pagePaths(sha256, dpi, max_pages=max_pages, variant=variant)
+        if found is None:
+            return None
+
+        num_pages, paths = found
+        try:
+            arrays = [loadArray(p) for p in paths]
+        except (OSError, ValueError):
+            # archivo truncado o borrado a mano: se regenera
+            return None
+
+        self.touch(sha256, dpi, len(paths), variant)
+        return num_pages, arrays
+
+    def touch(self, sha256: str, dpi: int, max_page: int, variant: str = PAGE_VARIANT):
+        # marca de uso para el lru (solo las páginas leídas)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE images SET last_access = ? "
+                "WHERE sha256 = ? AND dpi = ? AND variant = ? AND page <= ?",
+                (time.time(), sha256, dpi, variant, max_page),
+            )
+            self._conn.commit()
+
+    def put(
+        self,
+        sha256: str,
+        page: int,
+        dpi: int,
+        arr: np.ndarray,
+        num_pages: int,
+        variant: str = PAGE_VARIANT,
+        pdf_path: Path | None = None,
+    ) -> Path:
+        # escribe a un temporal y renombra: un lector nunca ve un .npy a medias
+        arr = np.ascontiguousarray(arr, dtype=np.uint8)
+        if arr.ndim != 2:
+            raise ValueError(f"se esperaba un arreglo 2d en gris, llegó {arr.shape}")
+
+        path = self.arrayPath(sha256, page, dpi, variant)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            np.save(f, arr)
+        os.replace(tmp_path, path)
+
+        size_bytes = path.stat().st_size
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images("
+                "sha256, page, dpi, variant, path, height, width, num_pages, size_bytes, pdf_path, created_at, last_access"
+                ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    sha256,
+                    page,
+                    dpi,
+                    variant,
+                    str(path.relative_to(self.root)),
+                    arr.shape[0],
+                    arr.shape[1],
+                    num_pages,
+                    size_bytes,
+                    str(pdf_path) if pdf_path is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self._conn.commit()
+            self._size_bytes += size_bytes
+
+        # el total local no ve lo que escriben otros procesos; prune lo recalcula del índice
+        if self.max_bytes and self._size_bytes > self.max_bytes:
+            self.prune()
+        return path
+
+    def _totalBytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM images").fetchone()[0]
+
+    def prune(self, max_bytes: int | None = None, dry_run: bool = False) -> dict:
+        # desaloja por lru hasta bajar de max_bytes * low_watermark (margen para no podar en cada put)
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self._totalBytes()
+        result = {"before_bytes": total, "evicted_groups": 0, "evicted_entries": 0, "freed_bytes": 0}
+        if max_bytes is None or total <= max_bytes:
+            result["after_bytes"] = total
+            return result
+
+        target = int(max_bytes * self.low_watermark)
+        with self._lock:
+            # un pdf a medias obliga a rasterizarlo entero: se desaloja el grupo completo
+            groups = self._conn.execute(
+                "SELECT sha256, dpi, variant, SUM(size_bytes), COUNT(*) FROM images "
+                "GROUP BY sha256, dpi, variant ORDER BY MAX(last_access)"
+            ).fetchall()
+
+        for sha256, dpi, variant, size_bytes, entries in groups:
+            if total <= target:
+                break
+            if not dry_run:
+                self.evict(sha256, dpi, variant)
+            total -= size_bytes
+            result["evicted_groups"] += 1
+            result["evicted_entries"] += entries
+            result["freed_bytes"] += size_bytes
+
+        result["after_bytes"] = total
+        if not dry_run:
+            self._size_bytes = self._totalBytes()
+        return result
+
+    def evict(self, sha256: str, dpi: int, variant: str = PAGE_VARIANT):
+        # primero el índice: un lector concurrente ve un fallo de cache, nunca un archivo borrado
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM images WHERE sha256 = ? AND dpi = ? AND variant = ?",
+                (sha256, dpi, variant),
+            ).fetchall()
+            self._conn.execute(
+                "DELETE FROM images WHERE sha256 = ? AND dpi = ? AND variant = ?",
+                (sha256, dpi, variant),
+            )
+            self._conn.commit()
+
+        # en linux un mmap abierto sigue válido aunque se borre el archivo
+        for (rel,) in rows:
+            (self.root / rel).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total, pdfs, oldest, newest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), COUNT(DISTINCT sha256), "
+                "MIN(last_access), MAX(last_access) FROM images"
+            ).fetchone()
+            by_variant = self._conn.execute(
+                "SELECT CASE WHEN variant = ? THEN 'page' ELSE 'region' END AS kind, COUNT(*), SUM(size_bytes) "
+                "FROM images GROUP BY kind",
+                (PAGE_VARIANT,),
+            ).fetchall()
+        return {
+            "entries": entries,
+            "size_bytes": total,
+            "pdfs": pdfs,
+            "max_bytes": self.max_bytes,
+            "oldest_access": oldest,
+            "newest_access": newest,
+            "by_kind": {kind: {"entries": n, "size_bytes": size} for kind, n, size in by_variant},
+            "root": str(self.root),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_CACHES: dict[tuple[int, str], ImageCache] = {}
+
+
+def setImageCacheRoot(root: Path):
+    # cache aparte (p. ej. benchmarks en frío); afecta a getImageCache sin argumentos
+    os.environ[IMAGE_CACHE_ENV] = str(root)
+
+
+def getImageCacheRoot() -> Path:
+    return Path(os.environ.get(IMAGE_CACHE_ENV) or IMAGE_CACHE_ROOT)
+
+
+def getImageCacheBudget(cfg: dict | None = None) -> tuple[int | None, float]:
+    # (bytes máximos, fracción a la que baja un prune) desde la config de ocr
+    if cfg is None:
+        from src.budget_buddy.ocr.ocr_config import loadOcrConfig
+
+        cfg = loadOcrConfig().get("image_cache")
+    cfg = {**DEFAULT_IMAGE_CACHE, **(cfg or {})}
+    max_bytes = int(float(cfg["max_gb"]) * 2**30) if cfg["max_gb"] else None
+    return max_bytes, float(cfg["low_watermark"])
+
+
+def getImageCache(root: Path | None = None) -> ImageCache:
+    # una conexión por proceso y raíz: sqlite no sobrevive al fork
+    root = Path(root) if root is not None else getImageCacheRoot()
+    key = (os.getpid(), str(root.resolve()))
+    if key not in _CACHES:
+        max_bytes, low_watermark = getImageCacheBudget()
+        _CACHES[key] = ImageCache(root, max_bytes=max_bytes, low_watermark=low_watermark)
+    return _CACHES[key]
+
+
+def groupLegacyPngs(images_root: Path) -> dict[tuple[str, str, str], list[tuple[int, Path]]]:
+    # pngs viejos images/<split>/<category>/<stem>_p<n>.png agrupados por pdf
+    groups = {}
+    for split_dir in sorted(Path(images_root).iterdir()):
+        if not split_dir.is_dir() or split_dir.resolve() == getImageCacheRoot().resolve():
+            continue
+        for cat_dir in sorted(split_dir.iterdir()):
+            if not cat_dir.is_dir():
+                continue
+            for png_path in cat_dir.glob("*.png"):
+                m = LEGACY_PAGE_RE.match(png_path.name)
+                if m is None:
+                    continue
+                key = (split_dir.name, cat_dir.name, m.group("stem"))
+                groups.setdefault(key, []).append((int(m.group("page")), png_path))
+
+    # orden numérico (p10 después de p9)
+    return {key: sorted(pages) for key, pages in groups.items()}
+
+
+def getPngDpi(img: Image.Image, default_dpi: int) -> int:
+    # el png guarda pixeles por metro: 450 dpi vuelve como 449.99...
+    dpi = img.info.get("dpi")
+    if not dpi:
+        return default_dpi
+    return int(round(float(dpi[0])))
+
+
+def migratePngCache(
+    images_root: Path = LEGACY_IMAGES_ROOT,
+    splits_root: Path = SPLITS_ROOT,
+    default_dpi: int = 450,
+    delete_png: bool = False,
+    cache: ImageCache | None = None,
+) -> dict:
+    # convierte el cache png por split/categoría al cache npy por (sha256, página, dpi)
+    cache = cache or getImageCache()
+    stats = {"pdfs": 0, "pages": 0, "already_cached": 0, "missing_pdf": 0, "png_bytes": 0, "npy_bytes": 0}
+
+    for (split, category, stem), pages in groupLegacyPngs(images_root).items():
+        pdf_path = Path(splits_root) / split / category / f"{stem}.pdf"
+        if not pdf_path.exists():
+            # sin el pdf no hay sha256 (p. ej. sintéticos ya borrados); se deja el png
+            stats["missing_pdf"] += 1
+            continue
+
+        sha256 = sha256Cached(pdf_path)
+        num_pages = len(pages)
+        for page, png_path in pages:
+            with Image.open(png_path) as img:
+                dpi = getPngDpi(img, default_dpi)
+                if cache.pagePaths(sha256, dpi, max_pages=page) is not None:
+                    stats["already_cached"] += 1
+                    out_path = None
+                else:
+                    gray = img if img.mode == "L" else img.convert("L")
+                    out_path = cache.put(sha256, page, dpi, np.asarray(gray), num_pages, pdf_path=pdf_path)
+
+            stats["png_bytes"] += png_path.stat().st_size
+            if out_path is not None:
+                stats["pages"] += 1
+                stats["npy_bytes"] += out_path.stat().st_size
+            if delete_png:
+                png_path.unlink()
+
+        stats["pdfs"] += 1
+
+    return stats
@@ -0,0 +1,296 @@
+from pathlib import Path
+import json
+import os
+import time
+
+import pandas as pd
+
+from src.budget_buddy.preprocessing.cleaning import (
+    addHashes,
+    buildDuplicatesTable,
+    buildPdfRow,
+    findContentDuplicates,
+    hashManifestRows,
+    markDuplicatesByName,
+)
+from src.budget_buddy.preprocessing.hash_index import DEFAULT_HASH_WORKERS
+from src.budget_buddy.utils.io import toCsv
+
+
+STATE_VERSION = 1
+HASH_COLUMNS = ["sha256", "hash_count", "is_hash_duplicate"]
+# un directorio modificado justo antes del escaneo anterior puede volver a cambiar en el mismo
+# tick de mtime (fs de red con resolución gruesa): esos se vuelven a listar
+MTIME_SLACK_NS = 2_000_000_000
+
+
+def getStatePath(manifest_csv: Path) -> Path:
+    # el estado del escaneo vive junto al manifest al que corresponde
+    return manifest_csv.with_name(f"{manifest_csv.stem}.scan.json")
+
+
+def fileStamp(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def loadScanState(state_path: Path, manifest_csv: Path, interim_unzip_dir: Path) -> dict | None:
+    # None si no hay estado o si el manifest se tocó por fuera (undo, otra corrida): escaneo completo
+    if not state_path.exists():
+        return None
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if state.get("version") != STATE_VERSION or state.get("root") != str(interim_unzip_dir):
+        return None
+    if state.get("manifest") != fileStamp(manifest_csv):
+        return None
+    return state
+
+
+def saveScanState(state_path: Path, manifest_csv: Path, interim_unzip_dir: Path, dirs: dict, scanned_at_ns: int):
+    state = {
+        "version": STATE_VERSION,
+        "root": str(interim_unzip_dir),
+        "scanned_at_ns": scanned_at_ns,
+        "manifest": fileStamp(manifest_csv),
+        "dirs": dirs,
+    }
+    tmp_path = state_path.with_name(f"{state_path.name}.tmp")
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
+def walkPdfs(interim_unzip_dir: Path, prev_dirs: dict, prev_scanned_at_ns: int) -> tuple[dict, dict, int]:
+    # os.scandir solo en directorios cuyo mtime cambió; los demás reutilizan el listado anterior
+    # (el mtime de un directorio cambia al crear, borrar o renombrar entradas directas)
+    # devuelve (estado por directorio, {pdf_path: (zip_root, relpath, size, inode)}, directorios listados)
+    dirs = {}
+    files = {}
+    listed = 0
+    trust_before_ns = prev_scanned_at_ns - MTIME_SLACK_NS
+
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        dir_path = os.path.join(str(interim_unzip_dir), rel) if rel else str(interim_unzip_dir)
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+
+        entry = prev_dirs.get(rel)
+        if entry is None or entry["mtime_ns"] != mtime_ns or mtime_ns >= trust_before_ns:
+            entry = {"mtime_ns": mtime_ns, "files": {}, "dirs": []}
+            with os.scandir(dir_path) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        # en la raíz, las carpetas ocultas son extracciones en curso de unzipAll
+                        if rel or not e.name.startswith("."):
+                            entry["dirs"].append(e.name)
+                    elif rel and e.name.endswith(".pdf") and e.is_file():
+                        st = e.stat()
+                        entry["files"][e.name] = [st.st_size, st.st_ino]
+            listed += 1
+
+        dirs[rel] = entry
+        stack.extend(f"{rel}/{name}" if rel else name for name in entry["dirs"])
+
+        if rel:
+            zip_root, _, sub = rel.partition("/")
+            for name, (size, inode) in entry["files"].items():
+                relpath = f"{sub}/{name}" if sub else name
+                files[os.path.join(dir_path, name)] = (zip_root, relpath, size, inode)
+
+    return dirs, files, listed
+
+
+def previousInodes(prev_dirs: dict, interim_unzip_dir: Path) -> dict[str, tuple[int, int]]:
+    # {pdf_path: (size, inode)} del escaneo anterior
+    out = {}
+    for rel, entry in prev_dirs.items():
+        if not rel:
+            continue
+        dir_path = os.path.join(str(interim_unzip_dir), rel)
+        for name, (size, inode) in entry["files"].items():
+            out[os.path.join(dir_path, name)] = (size, inode)
+    return out
+
+
+def updateGroupCounts(df: pd.DataFrame, key: str, count_col: str, flag_col: str, touched: set):
+    # recuenta solo los grupos tocados por el delta (el subconjunto trae el grupo completo)
+    if not touched:
+        return
+    mask = df[key].isin(touched)
+    counts = df.loc[mask, key].value_counts()
+    df.loc[mask, count_col] = df.loc[mask, key].map(counts)
+    df.loc[mask, flag_col] = df.loc[mask, count_col] > 1
+
+
+def updateManifest(
+    interim_unzip_dir: Path,
+    manifest_csv: Path,
+    duplicates_csv: Path,
+    compute_hash: bool = False,
+    hash_workers: int = DEFAULT_HASH_WORKERS,
+    full_hash: bool = True,
+    state_path: Path | None = None,
+    rescan: bool = False,
+) -> dict:
+    # aplica al manifest solo lo que cambió en disco (altas, bajas, movidos) desde el escaneo anterior
+    # rescan ignora el estado guardado: escaneo completo que deja estado nuevo
+    state_path = state_path or getStatePath(manifest_csv)
+    state = None if rescan else loadScanState(state_path, manifest_csv, interim_unzip_dir)
+    prev_dirs = state["dirs"] if state else {}
+
+    scanned_at_ns = time.time_ns()
+    dirs, files, listed = walkPdfs(interim_unzip_dir, prev_dirs, state["scanned_at_ns"] if state else 0)
+    summary = {"dirs": len(dirs), "dirs_listed": listed, "pdfs": len(files), "incremental": state is not None}
+
+    # sha256 como texto aunque venga todo vacío (si no, pandas lo lee como float)
+    df = pd.read_csv(manifest_csv, dtype={"sha256": object}) if state else None
+    # un manifest zip-native o con otras columnas no se puede parchar: se rehace
+    if df is not None and ("storage" in df.columns or (compute_hash and "sha256" not in df.columns)):
+        df = None
+        summary["incremental"] = False
+
+    if df is None:
+        if not files:
+            raise RuntimeError("no se encontraron pdfs en data/interim/unzipped")
+        df = pd.DataFrame([buildPdfRow(zr, path, relpath, size) for path, (zr, relpath, size, _) in files.items()])
+        df = markDuplicatesByName(df)
+        if compute_hash:
+            df = addHashes(df, workers=hash_workers, full_hash=full_hash)
+        summary.update(added=len(df), removed=0, moved=0, modified=0)
+    else:
+        if not compute_hash:
+            df = df.drop(columns=HASH_COLUMNS, errors="ignore")
+        prev_files = previousInodes(prev_dirs, interim_unzip_dir)
+        df = applyDelta(df, files, prev_files, compute_hash, hash_workers, full_hash, summary)
+
+    toCsv(df, manifest_csv, overwrite=True)
+    toCsv(buildDuplicatesTable(df, compute_hash), duplicates_csv, overwrite=True)
+    saveScanState(state_path, manifest_csv, interim_unzip_dir, dirs, scanned_at_ns)
+
+    print(
+        f"manifest {'incremental' if summary['incremental'] else 'completo'}: "
+        f"{summary['dirs_listed']}/{summary['dirs']} carpetas listadas, {summary['pdfs']} pdfs "
+        f"(+{summary['added']} -{summary['removed']} movidos={summary['moved']} modificados={summary['modified']})"
+    )
+    return summary
+
+
+def applyDelta(
+    df: pd.DataFrame,
+    files: dict,
+    prev_files: dict,
+    compute_hash: bool,
+    hash_workers: int,
+    full_hash: bool,
+    summary: dict,
+) -> pd.DataFrame:
+    # parcha el manifest anterior con el resultado del walk
+    # sin compute_hash el df ya viene sin columnas de hash
+    df = df.reset_index(drop=True)
+    known = set(df["pdf_path"])
+    removed = known - files.keys()
+    added = files.keys() - known
+
+    # movido = misma identidad de archivo (inodo y tamaño) que desaparece de una ruta y aparece en otra
+    removed_by_ino = {prev_files[p]: p for p in removed if p in prev_files}
+    moved = {}
+    for path in added:
+        zip_root, relpath, size, inode = files[path]
+        old_path = removed_by_ino.pop((size, inode), None)
+        if old_path is not None:
+            moved[old_path] = path
+    removed -= moved.keys()
+    added -= set(moved.values())
+
+    # mismo archivo con otro tamaño (solo se ve si su carpeta se volvió a listar)
+    modified = {
+        path for path in known & files.keys()
+        if path in prev_files and prev_files[path][0] != files[path][2]
+    }
+    summary.update(added=len(added), removed=len(removed), moved=len(moved), modified=len(modified))
+
+    path_index = pd.Series(df.index, index=df["pdf_path"])
+    touched_names = set()
+    touched_sizes = set()
+    touched_shas = set()
+
+    gone = path_index[list(removed)].tolist()
+    touched_names |= set(df.loc[gone, "pdf_filename"])
+    touched_sizes |= set(df.loc[gone, "size_bytes"])
+    if compute_hash:
+        touched_shas |= set(df.loc[gone, "sha256"].dropna())
+    df = df.drop(index=gone)
+
+    for old_path, new_path in moved.items():
+        # el contenido es el mismo: el sha256 se conserva
+        i = path_index[old_path]
+        zip_root, relpath, size, _ = files[new_path]
+        row = buildPdfRow(zip_root, new_path, relpath, size)
+        touched_names |= {df.at[i, "pdf_filename"], row["pdf_filename"]}
+        for col, value in row.items():
+            df.at[i, col] = value
+
+    for path in modified:
+        i = path_index[path]
+        touched_sizes |= {df.at[i, "size_bytes"], files[path][2]}
+        df.at[i, "size_bytes"] = files[path][2]
+        if compute_hash:
+            if pd.notna(df.at[i, "sha256"]):
+                touched_shas.add(df.at[i, "sha256"])
+            df.at[i, "sha256"] = None
+
+    if added:
+        new_rows = pd.DataFrame([buildPdfRow(files[path][0], path, files[path][1], files[path][2]) for path in sorted(added)])
+        touched_names |= set(new_rows["pdf_filename"])
+        touched_sizes |= set(new_rows["size_bytes"])
+        df = pd.concat([df, new_rows], ignore_index=True)
+    df = df.reset_index(drop=True)
+
+    # duplicados por nombre: conteo y primer zip solo de los nombres tocados
+    updateGroupCounts(df, "pdf_filename", "name_count", "is_name_duplicate", touched_names)
+    mask = df["pdf_filename"].isin(touched_names)
+    if mask.any():
+        df.loc[mask, "first_seen_zip"] = (
+            df[mask].sort_values(["pdf_filename", "year", "block"], na_position="last")
+              .groupby("pdf_filename")["zip_root"].transform("first")
+        )
+    df["name_count"] = df["name_count"].astype(int)
+    df["is_name_duplicate"] = df["is_name_duplicate"].astype(bool)
+
+    if not compute_hash:
+        return df
+
+    if full_hash:
+        # todo el manifest lleva sha256: solo faltan los nuevos y los modificados
+        subset = df[df["sha256"].isna()]
+        if not subset.empty:
+            df.loc[subset.index, "sha256"] = hashManifestRows(subset, workers=hash_workers)
+            touched_shas |= set(df.loc[subset.index, "sha256"])
+    else:
+        # duplicados por contenido: solo pueden cambiar dentro de los tamaños tocados
+        # (más los nuevos duplicados por nombre, que necesitan su sha256)
+        need = df["size_bytes"].isin(touched_sizes) | (df["is_name_duplicate"] & df["sha256"].isna())
+        subset = df[need]
+        if not subset.empty:
+            sha256 = findContentDuplicates(subset, also_hash=subset["is_name_duplicate"], workers=hash_workers)
+            # un sha256 ya conocido sigue valiendo aunque la etapa lo descarte por único
+            df.loc[subset.index, "sha256"] = sha256.where(sha256.notna(), subset["sha256"])
+            touched_shas |= set(df.loc[subset.index, "sha256"].dropna())
+
+    updateGroupCounts(df, "sha256", "hash_count", "is_hash_duplicate", touched_shas)
+    no_sha = df["sha256"].isna()
+    df.loc[no_sha, "hash_count"] = 1
+    df.loc[no_sha, "is_hash_duplicate"] = False
+    df["hash_count"] = df["hash_count"].fillna(1).astype(int)
+    df["is_hash_duplicate"] = df["is_hash_duplicate"].fillna(False).astype(bool)
+    return df
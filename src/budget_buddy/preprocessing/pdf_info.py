@@ -0,0 +1,21 @@
+from pathlib import Path
+import re
+
+from pdf2image import pdfinfo_from_path
+
+
+PAGE_SIZE_RE = re.compile(r"([\d.]+) x ([\d.]+) pts")
+
+
+def getFirstPageInfo(pdf_path: Path) -> dict:
+    # tamaño de la página 1 en puntos (ya rotada) y total de páginas, sin rasterizar
+    info = pdfinfo_from_path(str(pdf_path))
+    match = PAGE_SIZE_RE.search(str(info.get("Page size", "")))
+    if match is None:
+        raise ValueError(f"pdfinfo no reporta tamaño de página: {pdf_path}")
+
+    width, height = float(match.group(1)), float(match.group(2))
+    if int(info.get("Page rot", 0) or 0) % 180 == 90:
+        width, height = height, width
+
+    return {"pages": int(info.get("Pages", 1)), "width_pts": width, "height_pts": height}
@@ -1,29 +1,47 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import hashlib
+import io
+import json
+import math
+import multiprocessing as mp
+import subprocess
+import time
+
+import numpy as np
 from pdf2image import convert_from_path
 from PIL import Image
+from tqdm import tqdm
 
-from src.budget_buddy.utils.io import ensureDirs
+from src.budget_buddy.utils.timing import timeStage
+from src.budget_buddy.utils.parallel import splitThreads
+from src.budget_buddy.layout.sat_template import getActiveRegions, getSatRegionsBoxes, regionToBoxPx
+from src.budget_buddy.preprocessing.hash_index import sha256Cached
+from src.budget_buddy.preprocessing.image_cache import arrayToImage, getImageCache
+from src.budget_buddy.preprocessing.pdf_info import getFirstPageInfo
+from src.budget_buddy.preprocessing.text_layer import extractSatTextLayer
 from src.budget_buddy.preprocessing.pdf_loader import iterSplitPdfs, getSplitRoot
 
 
-ROOT = Path(".")
-INTERIM_ROOT = ROOT / "data" / "interim"
-IMAGES_ROOT = INTERIM_ROOT / "images"
-
-
-def pdfToImages(pdf_path: Path, dpi: int = 450) -> list[Image.Image]:
-    # convierte pdf a páginas en memoria
-    return convert_from_path(str(pdf_path), dpi=dpi, fmt="png", grayscale=True)
+# page: página completa (cache compartido con modo full)
+# regions: solo las cajas sat activas de la página 1 (pdftoppm -x -y -W -H)
+RASTER_METHODS = ("page", "regions")
+DEFAULT_RASTER = {
+    "method": "page",
+    "max_side_px": None,
+    "min_dpi": 150,
+}
 
 
-def getImagesDir(split: str, category: str) -> Path:
-    # ruta base donde se guardarán las imágenes
-    return IMAGES_ROOT / split / category
+def pdfToImages(pdf_path: Path, dpi: int = 450, thread_count: int = 1) -> list[Image.Image]:
+    # convierte pdf a páginas en memoria (thread_count = procesos pdftoppm por rangos de páginas)
+    return convert_from_path(str(pdf_path), dpi=dpi, fmt="png", grayscale=True, thread_count=thread_count)
 
 
-def buildImageFilename(pdf_path: Path, page_idx: int) -> str:
-    # nombre consistente por página
-    return f"{pdf_path.stem}_p{page_idx + 1}.png"
+def getPdfKey(pdf_path: Path) -> str:
+    # el cache se indexa por contenido: el mismo pdf en otro split o categoría reutiliza sus páginas
+    # (el índice de hashes evita releer el pdf en cada consulta)
+    return sha256Cached(pdf_path)
 
 
 def savePdfPagesAsImages(
@@ -32,54 +50,317 @@ def savePdfPagesAsImages(
     pdf_path: Path,
     dpi: int = 450,
     overwrite: bool = False,
+    sha256: str | None = None,
+    thread_count: int = 1,
 ) -> list[Path]:
-    # guarda cada página rasterizada en disco
-    out_dir = getImagesDir(split, category)
-    ensureDirs([out_dir])
+    # guarda cada página rasterizada en el cache npy (split y categoría ya no forman parte de la llave)
+    cache = getImageCache()
+    sha256 = sha256 or getPdfKey(pdf_path)
 
-    images = pdfToImages(pdf_path, dpi=dpi)
-    saved_paths: list[Path] = []
+    if not overwrite:
+        found = cache.pagePaths(sha256, dpi)
+        if found is not None:
+            # ya existe y no se debe sobrescribir
+            return found[1]
 
-    if not images:
-        return saved_paths
+    images = pdfToImages(pdf_path, dpi=dpi, thread_count=thread_count)
+    saved_paths: list[Path] = []
 
     for idx, img in enumerate(images):
-        fname = buildImageFilename(pdf_path, idx)
-        out_path = out_dir / fname
-
-        if out_path.exists() and not overwrite:
-            # ya existe y no se debe sobrescribir
-            saved_paths.append(out_path)
-            continue
+        if img.mode != "L":
+            # se guarda en gris (1 canal); el rgb lo arma el preprocess al final
+            img = img.convert("L")
 
-        if img.mode != "RGB":
-            # trocr requiere rgb
-            img = img.convert("RGB")
-
-        img.save(out_path, format="PNG", dpi=(dpi, dpi))
+        out_path = cache.put(sha256, idx + 1, dpi, np.asarray(img), len(images), pdf_path=pdf_path)
         saved_paths.append(out_path)
 
     return saved_paths
 
 
-def loadCachedImages(
+def getOrCreateImagesCounted(
     split: str,
     category: str,
     pdf_path: Path,
+    dpi: int = 450,
+    use_cache: bool = True,
+    max_pages: int | None = None,
+    verbose: bool = False,
+) -> tuple[int, list[Image.Image]]:
+    # (total de páginas, imágenes de las primeras max_pages) leídas por mmap del cache
+    cache = getImageCache()
+    sha256 = getPdfKey(pdf_path)
+
+    found = cache.getPages(sha256, dpi, max_pages=max_pages) if use_cache else None
+    if found is None:
+        # si no hay cache se generan las páginas
+        if verbose:
+            print("  no hay imágenes cacheadas, generando páginas...")
+        savePdfPagesAsImages(split, category, pdf_path, dpi=dpi, overwrite=False, sha256=sha256)
+        found = cache.getPages(sha256, dpi, max_pages=max_pages)
+
+    if found is None:
+        # pdf sin páginas
+        return 0, []
+
+    num_pages, arrays = found
+    return num_pages, [arrayToImage(arr) for arr in arrays]
+
+
+def getOrCreateImages(
+    split: str,
+    category: str,
+    pdf_path: Path,
+    dpi: int = 450,
+    use_cache: bool = True,
+    max_pages: int | None = None,
+    verbose: bool = False,
 ) -> list[Image.Image]:
-    # carga imágenes previamente guardadas
-    out_dir = getImagesDir(split, category)
-    if not out_dir.exists():
+    # imágenes cacheadas o recién rasterizadas
+    _, images = getOrCreateImagesCounted(
+        split, category, pdf_path, dpi=dpi, use_cache=use_cache, max_pages=max_pages, verbose=verbose
+    )
+    return images
+
+
+def getRegionDpi(region_cfg: dict, page_info: dict, dpi: int, raster_cfg: dict) -> int:
+    # dpi de la corrida salvo que el lado mayor de la región pase de max_side_px
+    # (el encoder reduce cada recorte a 384x384, rasterizar más fino no aporta)
+    max_side = raster_cfg.get("max_side_px")
+    if not max_side:
+        return dpi
+
+    side_pts = max(
+        (float(region_cfg["x1"]) - float(region_cfg["x0"])) * page_info["width_pts"],
+        (float(region_cfg["y1"]) - float(region_cfg["y0"])) * page_info["height_pts"],
+    )
+    fit_dpi = int(max_side * 72 / max(side_pts, 1e-6))
+    return min(dpi, max(fit_dpi, raster_cfg.get("min_dpi") or 1))
+
+
+def rasterizeRegion(pdf_path: Path, box: tuple[int, int, int, int], dpi: int) -> Image.Image:
+    # solo la caja (en pixeles a ese dpi) de la página 1; pgm en gris por stdout
+    left, top, right, bottom = box
+    cmd = [
+        "pdftoppm",
+        "-f", "1",
+        "-l", "1",
+        "-r", str(dpi),
+        "-x", str(left),
+        "-y", str(top),
+        "-W", str(max(1, right - left)),
+        "-H", str(max(1, bottom - top)),
+        "-gray",
+        "-singlefile",
+        str(pdf_path),
+    ]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0 or not proc.stdout:
+        err = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"pdftoppm falló ({proc.returncode}) en {pdf_path}: {err}")
+
+    img = Image.open(io.BytesIO(proc.stdout))
+    img.load()
+    return img
+
+
+def buildRegionVariant(region_name: str, region_cfg: dict, dpi: int, raster_cfg: dict) -> str:
+    # la clave cambia si cambian las coords del yaml o la política de dpi
+    key_src = json.dumps(
+        {
+            "box": [region_cfg[k] for k in ("x0", "y0", "x1", "y1")],
+            "dpi": dpi,
+            "max_side_px": raster_cfg.get("max_side_px"),
+            "min_dpi": raster_cfg.get("min_dpi"),
+        },
+        sort_keys=True,
+    )
+    key = hashlib.sha1(key_src.encode("utf-8")).hexdigest()[:8]
+    return f"{region_name}-{key}"
+
+
+def getOrCreateRegionCrops(
+    split: str,
+    category: str,
+    pdf_path: Path,
+    dpi: int = 450,
+    use_cache: bool = True,
+    raster_cfg: dict | None = None,
+    skip_regions: set[str] | None = None,
+) -> tuple[int, list[tuple[str, Image.Image]]]:
+    # recortes sat de la página 1 sin rasterizar la página completa
+    raster_cfg = {**DEFAULT_RASTER, **(raster_cfg or {})}
+    regions = {
+        name: region_cfg
+        for name, region_cfg in getActiveRegions().items()
+        if name not in (skip_regions or set())
+    }
+    cache = getImageCache()
+    sha256 = getPdfKey(pdf_path)
+    variants = {
+        name: buildRegionVariant(name, region_cfg, dpi, raster_cfg)
+        for name, region_cfg in regions.items()
+    }
+
+    if use_cache and variants:
+        # página 1 de cada región bajo el dpi de la corrida; el total de páginas va en el índice
+        found = {name: cache.getPages(sha256, dpi, max_pages=1, variant=v) for name, v in variants.items()}
+        if all(hit is not None for hit in found.values()):
+            jobs = [(name, arrayToImage(hit[1][0])) for name, hit in found.items()]
+            return next(iter(found.values()))[0], jobs
+
+    page_info = getFirstPageInfo(pdf_path)
+
+    jobs = []
+    for name, region_cfg in regions.items():
+        region_dpi = getRegionDpi(region_cfg, page_info, dpi, raster_cfg)
+        # mismo tamaño de página en pixeles que el raster completo de pdftoppm
+        page_w = math.ceil(page_info["width_pts"] * region_dpi / 72)
+        page_h = math.ceil(page_info["height_pts"] * region_dpi / 72)
+        img = rasterizeRegion(pdf_path, regionToBoxPx(region_cfg, page_w, page_h), region_dpi)
+        if img.mode != "L":
+            img = img.convert("L")
+
+        cache.put(
+            sha256, 1, dpi, np.asarray(img), page_info["pages"], variant=variants[name], pdf_path=pdf_path
+        )
+        jobs.append((name, img))
+
+    return page_info["pages"], jobs
+
+
+def buildCropJobs(images: list[Image.Image], mode: str) -> list[tuple[str, Image.Image]]:
+    # arma lista ordenada de (slot, imagen) según el modo de ocr
+    if not images:
         return []
 
-    pattern = f"{pdf_path.stem}_p*.png"
-    img_paths = sorted(out_dir.glob(pattern))
+    if mode == "full":
+        return [(f"page_{idx + 1}", img) for idx, img in enumerate(images)]
 
-    images: list[Image.Image] = []
-    for path in img_paths:
-        images.append(Image.open(path))
+    # en sat-template solo se usa la primera página
+    img = images[0]
+    img_width, img_height = img.size
+    boxes = getSatRegionsBoxes(img_width, img_height)
 
-    return images
+    return [(region_name, img.crop(box)) for region_name, box in boxes.items()]
+
+
+def loadPdfCrops(
+    split: str,
+    category: str,
+    pdf_path: Path,
+    mode: str,
+    dpi: int = 450,
+    use_cache: bool = True,
+) -> tuple[int, list[tuple[str, Image.Image]]]:
+    # raster/cache + recortes en un solo paso (usable desde un process pool)
+    num_pages, jobs, _, _ = loadPdfCropsTimed(split, category, pdf_path, mode, dpi=dpi, use_cache=use_cache)
+    return num_pages, jobs
+
+
+def loadPdfCropsTimed(
+    split: str,
+    category: str,
+    pdf_path: Path,
+    mode: str,
+    dpi: int = 450,
+    use_cache: bool = True,
+    raster_cfg: dict | None = None,
+    text_layer_cfg: dict | None = None,
+    verbose: bool = False,
+) -> tuple[int, list[tuple[str, Image.Image]], dict, dict[str, str]]:
+    # igual que loadPdfCrops pero devuelve los segundos por etapa y los textos
+    # que ya salieron de la capa de texto del pdf (esas regiones no se recortan)
+    timings = {}
+    raster_cfg = {**DEFAULT_RASTER, **(raster_cfg or {})}
+    layer_texts = {}
+
+    if mode != "full" and text_layer_cfg and text_layer_cfg.get("enabled"):
+        with timeStage(timings, "text_layer"):
+            num_pages, region_texts = extractSatTextLayer(pdf_path, text_layer_cfg)
+        layer_texts = {name: text for name, text in region_texts.items() if text is not None}
+
+        # pdf digital completo: ni raster ni ocr
+        if region_texts and len(layer_texts) == len(region_texts):
+            return num_pages, [], timings, layer_texts
+
+    if mode != "full" and raster_cfg["method"] == "regions":
+        # las regiones salen recortadas de poppler: no hay etapa de recorte aparte
+        with timeStage(timings, "raster"):
+            num_pages, jobs = getOrCreateRegionCrops(
+                split,
+                category,
+                pdf_path,
+                dpi=dpi,
+                use_cache=use_cache,
+                raster_cfg=raster_cfg,
+                skip_regions=set(layer_texts),
+            )
+        return num_pages, jobs, timings, layer_texts
+
+    # sat-template solo recorta la página 1: no hace falta abrir las demás
+    max_pages = None if mode == "full" else 1
+    with timeStage(timings, "raster"):
+        num_pages, images = getOrCreateImagesCounted(
+            split, category, pdf_path, dpi=dpi, use_cache=use_cache, max_pages=max_pages, verbose=verbose
+        )
+
+    # se copian los recortes para no devolver vistas del mmap al proceso padre
+    with timeStage(timings, "crop"):
+        jobs = [
+            (slot, img.copy())
+            for slot, img in buildCropJobs(images, mode)
+            if slot not in layer_texts
+        ]
+    return num_pages, jobs, timings, layer_texts
+
+
+def rasterizePdfTask(
+    split: str,
+    category: str,
+    pdf_path: Path,
+    dpi: int = 450,
+    overwrite: bool = False,
+    poppler_threads: int = 1,
+) -> dict:
+    # una unidad de trabajo del pool: páginas del pdf al cache (picklable, sin estado global)
+    started = time.perf_counter()
+    sha256 = getPdfKey(pdf_path)
+
+    found = None if overwrite else getImageCache().pagePaths(sha256, dpi)
+    if found is not None:
+        pages, rasterized = len(found[1]), False
+    else:
+        pages = len(
+            savePdfPagesAsImages(
+                split, category, pdf_path, dpi=dpi, overwrite=True, sha256=sha256, thread_count=poppler_threads
+            )
+        )
+        rasterized = True
+
+    return {
+        "category": category,
+        "pages": pages,
+        "rasterized": rasterized,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def iterRasterResults(tasks: list[tuple], jobs: int):
+    # resultados en orden de término; con jobs=1 todo corre en este proceso
+    if jobs <= 1:
+        for task in tasks:
+            yield task, rasterizePdfTask(*task), None
+        return
+
+    # spawn igual que el pipeline de ocr: los hijos no heredan hilos ni conexiones sqlite
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+        futures = {pool.submit(rasterizePdfTask, *task): task for task in tasks}
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except Exception as exc:
+                yield futures[fut], None, exc
 
 
 def buildImagesForSplit(
@@ -87,28 +368,72 @@ def buildImagesForSplit(
     dpi: int = 450,
     max_per_category: int | None = None,
     overwrite: bool = False,
-) -> None:
-    # procesa todos los pdfs del split
+    jobs: int = 1,
+    poppler_threads: int | None = None,
+) -> dict:
+    # procesa todos los pdfs del split; con jobs > 1 reparte los pdfs en un process pool
     split_root = getSplitRoot(split)
-    print(f"generando imágenes para split={split} desde {split_root}")
+    jobs = max(1, jobs)
+    # cada worker lanza a lo sumo poppler_threads pdftoppm a la vez (pdf2image reparte páginas)
+    poppler_threads = poppler_threads or splitThreads(jobs)
+    print(f"generando imágenes para split={split} desde {split_root} (jobs={jobs}, hilos poppler={poppler_threads})")
+
+    tasks = [
+        (split, category, pdf_path, dpi, overwrite, poppler_threads)
+        for category, pdf_path in iterSplitPdfs(split=split, max_per_category=max_per_category)
+    ]
+    per_category = {}
+    for _, category, *_ in tasks:
+        per_category.setdefault(category, {"pdfs": 0, "done": 0, "pages": 0, "rasterized": 0, "errors": 0})
+        per_category[category]["pdfs"] += 1
 
-    total_pdfs = 0
+    started = time.perf_counter()
+    new_pages = 0
     total_images = 0
+    errors = 0
+    bar = tqdm(total=len(tasks), unit="pdf", desc=f"imágenes {split}", dynamic_ncols=True)
 
-    for category, pdf_path in iterSplitPdfs(split=split, max_per_category=max_per_category):
-        total_pdfs += 1
-        print(f"- [{split}/{category}] {pdf_path.name}")
+    for task, result, exc in iterRasterResults(tasks, jobs):
+        category, pdf_path = task[1], task[2]
+        counts = per_category[category]
+        counts["done"] += 1
 
-        saved_paths = savePdfPagesAsImages(
-            split=split,
-            category=category,
-            pdf_path=pdf_path,
-            dpi=dpi,
-            overwrite=overwrite,
-        )
-        total_images += len(saved_paths)
+        if exc is not None:
+            counts["errors"] += 1
+            errors += 1
+            tqdm.write(f"\t[{category}] error en {pdf_path.name}: {exc}")
+        else:
+            counts["pages"] += result["pages"]
+            total_images += result["pages"]
+            if result["rasterized"]:
+                counts["rasterized"] += 1
+                new_pages += result["pages"]
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        bar.update(1)
+        bar.set_postfix(cat=category, pages_s=f"{new_pages / elapsed:.1f}", refresh=False)
+
+        if counts["done"] == counts["pdfs"]:
+            tqdm.write(
+                f"- [{split}/{category}] {counts['pdfs']} pdfs, {counts['pages']} páginas "
+                f"({counts['rasterized']} rasterizados, {counts['errors']} errores)"
+            )
+
+    bar.close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
 
     print(f"\nresumen imágenes → split={split}")
-    print(f"\tpdfs procesados : {total_pdfs}")
-    print(f"\timágenes guardadas: {total_images}")
-    print(f"\traíz imágenes   : {IMAGES_ROOT}")
+    print(f"\tpdfs procesados : {len(tasks)}")
+    print(f"\tpdfs con error  : {errors}")
+    print(f"\timágenes en cache: {total_images}")
+    print(f"\tpáginas nuevas  : {new_pages} ({new_pages / elapsed:.1f} páginas/s en {elapsed:.1f}s)")
+    print(f"\tcache imágenes  : {getImageCache().root}")
+
+    return {
+        "pdfs": len(tasks),
+        "errors": errors,
+        "pages": total_images,
+        "new_pages": new_pages,
+        "seconds": round(elapsed, 3),
+        "per_category": per_category,
+    }
@@ -0,0 +1,85 @@
+from pathlib import Path
+import math
+import re
+import subprocess
+import unicodedata
+
+from src.budget_buddy.layout.sat_template import getSatRegionsBoxes
+from src.budget_buddy.preprocessing.pdf_info import getFirstPageInfo
+
+
+# a 72 dpi un pixel de pdftotext equivale a un punto del pdf
+TEXT_LAYER_DPI = 72
+DEFAULT_TEXT_LAYER = {
+    "enabled": True,
+    "min_chars": 20,
+    "min_valid_ratio": 0.9,
+    "expect": {},
+}
+
+
+def normalizeLayerText(text: str) -> str:
+    # -layout rellena con espacios para alinear columnas; se colapsan y se quitan líneas vacías
+    lines = [" ".join(line.split()) for line in text.replace("\f", "\n").splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def extractRegionText(pdf_path: Path, box: tuple[int, int, int, int]) -> str:
+    # texto embebido de la página 1 dentro de la caja (en puntos)
+    left, top, right, bottom = box
+    cmd = [
+        "pdftotext",
+        "-f", "1",
+        "-l", "1",
+        "-r", str(TEXT_LAYER_DPI),
+        "-x", str(left),
+        "-y", str(top),
+        "-W", str(max(1, right - left)),
+        "-H", str(max(1, bottom - top)),
+        "-layout",
+        "-enc", "UTF-8",
+        str(pdf_path),
+        "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        return ""
+    return normalizeLayerText(proc.stdout.decode("utf-8", errors="replace"))
+
+
+def isLayerTextComplete(text: str, cfg: dict, expect: str | None = None) -> bool:
+    # suficientes caracteres, casi todos con mapeo unicode real y el patrón esperado de la región
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < cfg["min_chars"]:
+        return False
+
+    # fuentes sin ToUnicode salen como �, controles o uso privado
+    valid = sum(1 for c in chars if c != "\ufffd" and unicodedata.category(c)[0] in "LNPS")
+    if valid / len(chars) < cfg["min_valid_ratio"]:
+        return False
+
+    return expect is None or re.search(expect, text) is not None
+
+
+def extractSatTextLayer(pdf_path: Path, cfg: dict | None = None) -> tuple[int | None, dict[str, str | None]]:
+    # texto por región sat activa; None = incompleta o escaneada (va por ocr)
+    cfg = {**DEFAULT_TEXT_LAYER, **(cfg or {})}
+    try:
+        page_info = getFirstPageInfo(pdf_path)
+    except Exception:
+        # pdf que poppler no entiende: que decida el camino de raster
+        return None, {}
+
+    # mismas cajas que getSatRegionsBoxes sobre la página en puntos
+    boxes = getSatRegionsBoxes(
+        math.ceil(page_info["width_pts"]),
+        math.ceil(page_info["height_pts"]),
+    )
+
+    texts = {}
+    for name, box in boxes.items():
+        text = extractRegionText(pdf_path, box)
+        complete = isLayerTextComplete(text, cfg, (cfg["expect"] or {}).get(name))
+        texts[name] = text if complete else None
+
+    return page_info["pages"], texts
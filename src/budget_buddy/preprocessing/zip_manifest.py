@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import csv
+import hashlib
+import os
+import shutil
+import zipfile
+
+from tqdm import tqdm
+
+from src.budget_buddy.preprocessing.hash_index import (
+    DEFAULT_HASH_WORKERS,
+    HASH_CHUNK_SIZE,
+    HashIndex,
+    getHashIndex,
+    statKey,
+)
+
+
+# dónde vive cada pdf del manifest: dentro del zip o ya descomprimido en disco
+STORAGE_ARCHIVE = "archive"
+STORAGE_EXTRACTED = "extracted"
+# llave de un miembro en el índice de hashes: <zip resuelto>::<ruta dentro del zip>
+ZIP_MEMBER_SEP = "::"
+EDGE_SIZE = 64 << 10
+
+
+def isPdfMember(info: zipfile.ZipInfo) -> bool:
+    # mismo criterio que rglob("*.pdf") sobre la carpeta descomprimida
+    return not info.is_dir() and info.filename.endswith(".pdf")
+
+
+def memberKey(zip_path, member: str) -> str:
+    return f"{Path(zip_path).resolve()}{ZIP_MEMBER_SEP}{member}"
+
+
+def hashZipMember(zf: zipfile.ZipFile, member: str, edge_size: int = EDGE_SIZE) -> tuple[str, str]:
+    # (hash de extremos, sha256 completo) en una sola lectura del stream descomprimido
+    # el de extremos coincide con sha256Edges sobre el archivo ya extraído
+    full = hashlib.sha256()
+    head = b""
+    tail = b""
+    with zf.open(member) as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            full.update(chunk)
+            if len(head) < edge_size:
+                take = edge_size - len(head)
+                head += chunk[:take]
+                chunk = chunk[take:]
+            if len(chunk) >= edge_size:
+                tail = chunk[-edge_size:]
+            elif chunk:
+                tail = (tail + chunk)[-edge_size:]
+
+    return hashlib.sha256(head + tail).hexdigest(), full.hexdigest()
+
+
+def hashArchiveMembers(
+    zip_paths: list,
+    members: list[str],
+    kind: str = "full",
+    index: HashIndex | None = None,
+    workers: int = DEFAULT_HASH_WORKERS,
+    progress: bool = True,
+) -> list[str]:
+    # sha256 (full o partial) de miembros de zip sin extraerlos; mismo orden que la entrada
+    index = index or getHashIndex()
+    zip_keys = {zp: statKey(os.stat(zp)) for zp in set(zip_paths)}
+    # si el zip cambia (tamaño, mtime, inodo) se invalidan todos sus miembros
+    keys = {memberKey(zp, m): zip_keys[zp] for zp, m in zip(zip_paths, members)}
+    hashes = index.getMany(keys, kind=kind)
+
+    todo = {}
+    for zp, m in zip(zip_paths, members):
+        if memberKey(zp, m) not in hashes:
+            todo.setdefault(zp, []).append(m)
+
+    def hashZip(item):
+        # un ZipFile por hilo; los miembros de un zip se leen en orden
+        zp, zip_members = item
+        with zipfile.ZipFile(zp, "r") as zf:
+            return zp, [(m, *hashZipMember(zf, m)) for m in zip_members]
+
+    if todo:
+        bar = tqdm(total=sum(len(m) for m in todo.values()), desc=f"sha256 zip {kind}", disable=not progress)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for zp, results in pool.map(hashZip, todo.items()):
+                # el stream ya pasó completo: se guardan los dos hashes
+                partial_rows = [(memberKey(zp, m), zip_keys[zp], partial) for m, partial, _ in results]
+                full_rows = [(memberKey(zp, m), zip_keys[zp], full) for m, _, full in results]
+                index.putMany(partial_rows, kind="partial")
+                index.putMany(full_rows, kind="full")
+                for key, _, sha256 in (partial_rows if kind == "partial" else full_rows):
+                    hashes[key] = sha256
+                bar.update(len(results))
+        bar.close()
+
+    return [hashes[memberKey(zp, m)] for zp, m in zip(zip_paths, members)]
+
+
+def extractMember(zip_path, member: str, out_path: Path) -> Path:
+    # un solo miembro, a un temporal y luego rename: nunca queda un pdf a medias
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    with zipfile.ZipFile(zip_path, "r") as zf, zf.open(member) as src, tmp_path.open("wb") as dst:
+        shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def loadArchiveIndex(manifest_csv: Path) -> dict[str, tuple[str, str]]:
+    # pdf_path → (zip_path, zip_member) de un manifest zip-native
+    if not Path(manifest_csv).exists():
+        return {}
+
+    with Path(manifest_csv).open("r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if "zip_member" not in (reader.fieldnames or []):
+            return {}
+        return {
+            row["pdf_path"]: (row["zip_path"], row["zip_member"])
+            for row in reader
+            if row.get("zip_path") and row.get("zip_member")
+        }
+
+
+def ensureExtracted(pdf_path, archive_index: dict, out_path: Path | None = None) -> bool:
+    # extrae el pdf la primera vez que alguien lo necesita; False si no está ni en disco ni en un zip
+    out_path = Path(out_path or pdf_path)
+    if out_path.exists():
+        return True
+
+    entry = archive_index.get(str(pdf_path))
+    if entry is None:
+        return False
+
+    zip_path, member = entry
+    if not Path(zip_path).exists():
+        return False
+    extractMember(zip_path, member, out_path)
+    return True
+
+
+def listTrashedPaths(trash_root: Path) -> set[str]:
+    # pdfs que resolve_duplicates mandó a la papelera y siguen ahí (un undo los saca de la lista)
+    # el miembro sigue en el zip: sin esto reaparecería en el siguiente manifest
+    trashed = set()
+    for log_csv in sorted(Path(trash_root).glob("run_*/deletion_log.csv")):
+        with log_csv.open("r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                trash_path = row.get("removed_pdf_trash_path")
+                if row.get("action") == "trash" and trash_path and Path(trash_path).exists():
+                    trashed.add(row["removed_pdf_original_path"])
+    return trashed
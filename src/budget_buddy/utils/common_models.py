@@ -1,6 +1,17 @@
+from __future__ import annotations
+
 from pathlib import Path
-import torch
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+from src.budget_buddy.utils.lazy_import import lazyImport
+
+# torch/transformers se importan en el primer uso, no al importar este módulo
+torch = lazyImport("torch")
+transformers = lazyImport("transformers")
+
+
+ROOT = Path(".")
+QUANTIZED_ROOT = ROOT / "models" / "quantized"
+QUANTIZE_MODES = ("int8",)
 
 
 def getDevice(devicePreference: str = "auto") -> torch.device:
@@ -17,7 +28,7 @@ def getDevice(devicePreference: str = "auto") -> torch.device:
     return torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
-def loadTrocrModel(modelDir: str, device):
+def resolveModelDir(modelDir: str) -> str:
     p = Path(modelDir)
 
     # si es carpeta local sin preprocessor_config, entrar al último subdir (timestamp)
@@ -27,15 +38,140 @@ def loadTrocrModel(modelDir: str, device):
             p = sorted(subdirs)[-1]
         modelDir = str(p)
 
-    processor = TrOCRProcessor.from_pretrained(modelDir)
-    model = VisionEncoderDecoderModel.from_pretrained(modelDir).to(device)
-    return processor, model
+    return modelDir
+
+
+def getQuantizedCachePath(modelDir: str, quantize: str = "int8") -> Path:
+    # carpeta local: junto a los pesos; modelo del hub: bajo models/quantized
+    p = Path(modelDir)
+    if p.is_dir():
+        return p / f"quantized_{quantize}.pt"
+    return QUANTIZED_ROOT / modelDir.replace("/", "__") / f"quantized_{quantize}.pt"
+
+
+def isDerivedCacheFresh(cache_path: Path, modelDir: str) -> bool:
+    # un archivo derivado de los pesos (p. ej. el modelo int8) vale si es más nuevo que ellos
+    if not cache_path.exists():
+        return False
+
+    p = Path(modelDir)
+    if not p.is_dir():
+        return True
+
+    weights = list(p.glob("*.safetensors")) + list(p.glob("*.bin"))
+    newest = max((w.stat().st_mtime for w in weights), default=0.0)
+    return cache_path.stat().st_mtime >= newest
+
+
+def quantizeTrocrModel(model, quantize: str = "int8"):
+    # cuantización dinámica de las capas lineales de encoder y decoder
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"cuantización no soportada: {quantize} (usa {QUANTIZE_MODES})")
+
+    model.eval()
+    model.encoder = torch.ao.quantization.quantize_dynamic(
+        model.encoder, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    model.decoder = torch.ao.quantization.quantize_dynamic(
+        model.decoder, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return model
+
+
+def loadQuantizedTrocrModel(modelDir: str, quantize: str = "int8", use_cache: bool = True):
+    cache_path = getQuantizedCachePath(modelDir, quantize)
+
+    # reutiliza el modelo ya cuantizado si está al día
+    if use_cache and isDerivedCacheFresh(cache_path, modelDir):
+        return torch.load(cache_path, map_location="cpu", weights_only=False, mmap=True)
+
+    model = transformers.VisionEncoderDecoderModel.from_pretrained(modelDir, low_cpu_mem_usage=True)
+    model = quantizeTrocrModel(model, quantize)
+
+    if use_cache:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".pt.tmp")
+        torch.save(model, tmp_path)
+        tmp_path.replace(cache_path)
+        print(f"modelo {quantize} cacheado en: {cache_path}")
+
+    return model
+
+
+def findSafetensorsFiles(modelDir: str) -> list[Path]:
+    # pesos safetensors del propio modelo: carpeta local o copia ya descargada del hub
+    p = Path(modelDir)
+    if p.is_dir():
+        return sorted(p.glob("*.safetensors"))
+
+    # from_pretrained ya lo bajó: cached_file solo resuelve la ruta en el cache del hub
+    for name in ("model.safetensors", "model.safetensors.index.json"):
+        try:
+            resolved = transformers.utils.cached_file(modelDir, name, local_files_only=True)
+        except OSError:
+            continue
+        if resolved:
+            return sorted(Path(resolved).parent.glob("*.safetensors"))
+    return []
+
+
+def mmapModelWeights(model, modelDir: str):
+    # reemplaza los pesos por tensores mapeados del model.safetensors del modelo;
+    # varios procesos que cargan el mismo modelo comparten esas páginas en vez de copiarlas
+    from safetensors.torch import load_file
+
+    files = findSafetensorsFiles(modelDir)
+    if not files:
+        return model
+
+    current = model.state_dict()
+    state = {}
+    for path in files:
+        # load_file abre el archivo con mmap: los tensores de cpu no se copian
+        state.update(load_file(str(path), device="cpu"))
+
+    # checkpoint con otras llaves o dtypes (p. ej. fp16): se quedan los pesos ya cargados
+    if any(key not in current or current[key].dtype != tensor.dtype for key, tensor in state.items()):
+        return model
+
+    # assign=True conserva el tensor mapeado; los pesos atados no vienen en el archivo
+    # (safetensors guarda una sola copia) y se vuelven a atar abajo
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    model.mmap_weights_path = str(files[0])
+    return model
+
+
+def loadTrocrModel(
+    modelDir: str,
+    device,
+    quantize: str | None = None,
+    cache_quantized: bool = True,
+    mmap_weights: bool = True,
+):
+    modelDir = resolveModelDir(modelDir)
+
+    processor = transformers.TrOCRProcessor.from_pretrained(modelDir)
+
+    if quantize:
+        # los kernels int8 dinámicos solo corren en cpu
+        if torch.device(device).type != "cpu":
+            raise RuntimeError(f"cuantización {quantize} solo está soportada en cpu")
+        model = loadQuantizedTrocrModel(modelDir, quantize, use_cache=cache_quantized)
+        return processor, model
+
+    # low_cpu_mem_usage evita inicializar pesos aleatorios que luego se pisan
+    model = transformers.VisionEncoderDecoderModel.from_pretrained(modelDir, low_cpu_mem_usage=True)
+    if mmap_weights and torch.device(device).type == "cpu":
+        model = mmapModelWeights(model, modelDir)
+    model.eval()
+    return processor, model.to(device)
 
 
 def loadTrocrModelForExplain(modelDir: str, device: torch.device):
     # mismo loader pero habilita hidden states para xai
-    processor = TrOCRProcessor.from_pretrained(modelDir)
-    model = VisionEncoderDecoderModel.from_pretrained(modelDir)
+    processor = transformers.TrOCRProcessor.from_pretrained(modelDir)
+    model = transformers.VisionEncoderDecoderModel.from_pretrained(modelDir, low_cpu_mem_usage=True)
     model.config.output_hidden_states = True
     model.to(device)
     model.eval()
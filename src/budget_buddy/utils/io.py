@@ -1,6 +1,8 @@
 from pathlib import Path
 import hashlib
-import pandas as pd
+from src.budget_buddy.utils.lazy_import import lazyImport
+
+pd = lazyImport("pandas")
 
 def ensureDirs(paths):
     # crea directorios si no existen
@@ -18,7 +20,20 @@ def sha256File(path, chunk_size=1 << 20):
             h.update(b)
     return h.hexdigest()
 
-def toCsv(df: pd.DataFrame, path: Path, overwrite=False):
+def sha256Edges(path, edge_size=64 << 10):
+    # hash de los primeros y últimos edge_size bytes (descarte barato de duplicados)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = f.read(edge_size)
+        h.update(head)
+        if len(head) == edge_size:
+            # los bytes ya leídos del inicio no se vuelven a leer
+            f.seek(0, 2)
+            f.seek(max(edge_size, f.tell() - edge_size))
+            h.update(f.read(edge_size))
+    return h.hexdigest()
+
+def toCsv(df: "pd.DataFrame", path: Path, overwrite=False):
     # guarda csv respetando overwrite
     if path.exists() and not overwrite:
         raise FileExistsError(f"ya existe {path}, usa --overwrite")
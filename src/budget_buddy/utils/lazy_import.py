@@ -0,0 +1,25 @@
+import importlib
+
+
+class LazyModule:
+    # proxy que importa el módulo real en el primer acceso a un atributo
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "cargado" if self._module is not None else "sin cargar"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazyImport(name: str) -> LazyModule:
+    # torch/transformers/pandas se cargan recién cuando se usan (p. ej. no en --help)
+    return LazyModule(name)
@@ -1,6 +1,7 @@
-from transformers.utils import logging
-
 def quietHf():
+    # import diferido: transformers no se carga hasta que se usa un modelo
+    from transformers.utils import logging
+
     # baja el nivel de logs de HF
     logging.set_verbosity_error()
     logging.disable_default_handler()
@@ -0,0 +1,7 @@
+import os
+
+
+def splitThreads(workers: int, total: int | None = None) -> int:
+    # reparte los cores entre procesos para no sobre-suscribir (intra-op de torch, hilos de poppler)
+    total = total or os.cpu_count() or 1
+    return max(1, total // max(1, workers))
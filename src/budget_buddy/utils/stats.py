@@ -0,0 +1,7 @@
+def percentile(values, q: float) -> float | None:
+    # percentil por rango más cercano; None si no hay muestras
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[idx]
@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+import platform
+import resource
+import time
+
+
+@contextmanager
+def timeStage(timings: dict | None, stage: str):
+    # suma el tiempo de pared del bloque en timings[stage]; None = no medir
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def addTimings(total: dict, part: dict, scale: float = 1.0):
+    # acumula un dict de tiempos en otro (scale reparte un lote entre sus recortes)
+    for stage, seconds in part.items():
+        total[stage] = total.get(stage, 0.0) + seconds * scale
+    return total
+
+
+def peakRssMb() -> dict:
+    # ru_maxrss viene en kB en linux (bytes en macos)
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
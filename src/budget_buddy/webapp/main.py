@@ -6,12 +6,16 @@ from pathlib import Path
 from datetime import datetime
 import pandas as pd
 import json
+import threading
 import urllib.parse
 from fastapi import FastAPI, Request, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from src.budget_buddy.preprocessing.manifest_update import fileStamp
+from src.budget_buddy.preprocessing.zip_manifest import ensureExtracted, loadArchiveIndex
+
 # rutas base
 ROOT = Path("/app")
 DATA = ROOT / "data"
@@ -69,8 +73,21 @@ def ensureCategory(name: str):
         meta["categories"].append(name)
         writeCatsMeta(meta)
 
+_archive_lock = threading.Lock()
+_archive_cache = {"stamp": None, "index": {}}
+
+def getArchiveIndex() -> dict:
+    # índice de miembros zip del manifest; solo se vuelve a leer si cambió (tamaño, mtime)
+    stamp = fileStamp(MANIFEST)
+    with _archive_lock:
+        if _archive_cache["stamp"] != stamp:
+            _archive_cache["index"] = loadArchiveIndex(MANIFEST) if stamp else {}
+            _archive_cache["stamp"] = stamp
+        return _archive_cache["index"]
+
 def fileExists(rel_path: str) -> bool:
-    return (ROOT / rel_path).exists()
+    # un pdf que sigue dentro de su zip (manifest zip-native) también está disponible
+    return (ROOT / rel_path).exists() or rel_path in getArchiveIndex()
 
 # vistas
 @app.get("/", response_class=HTMLResponse)
@@ -112,7 +129,8 @@ def serve_pdf(path: str):
     # path relativo a /app (ej. data/interim/unzipped/2023_b1/xxx.pdf)
     safe = Path(urllib.parse.unquote(path))
     full = ROOT / safe
-    if not full.exists():
+    # primera vez que se abre un pdf que sigue dentro de su zip: se extrae solo ese
+    if not full.exists() and not ensureExtracted(str(safe), getArchiveIndex(), out_path=full):
         raise HTTPException(status_code=404, detail="pdf no disponible en este host")
     # devolver como 'inline' para que el navegador lo renderice en el iframe
     return FileResponse(
@@ -0,0 +1,69 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("tqdm")
+
+from src.budget_buddy.preprocessing.cleaning import markDuplicatesByName, scanPdfs
+from src.budget_buddy.preprocessing.manifest_update import updateManifest
+
+
+def writePdf(path, content: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def fullScan(interim_unzip_dir):
+    # lo que daría un escaneo completo, para comparar contra el manifest incremental
+    df = markDuplicatesByName(scanPdfs(interim_unzip_dir))
+    return df.sort_values("pdf_path").reset_index(drop=True)
+
+
+def readManifest(manifest_csv):
+    df = pd.read_csv(manifest_csv)
+    return df[fullScanColumns()].sort_values("pdf_path").reset_index(drop=True)
+
+
+def fullScanColumns():
+    return [
+        "zip_root", "year", "block", "pdf_relpath", "pdf_filename", "pdf_path",
+        "size_bytes", "name_count", "is_name_duplicate", "first_seen_zip",
+    ]
+
+
+def testAddedPdfBetweenIncrementalRuns(tmp_path):
+    unzipped = tmp_path / "unzipped"
+    manifest_csv = tmp_path / "manifest_pdfs.csv"
+    dups_csv = tmp_path / "manifest_duplicates.csv"
+    writePdf(unzipped / "2023_b1" / "a.pdf", b"a")
+    writePdf(unzipped / "2023_b1" / "sub" / "b.pdf", b"bb")
+
+    first = updateManifest(unzipped, manifest_csv, dups_csv)
+    assert not first["incremental"]
+    assert first["added"] == 2
+
+    # pdf nuevo en una carpeta existente y duplicado por nombre en otro zip
+    writePdf(unzipped / "2023_b1" / "sub" / "c.pdf", b"ccc")
+    writePdf(unzipped / "2024_b2" / "a.pdf", b"a2")
+
+    second = updateManifest(unzipped, manifest_csv, dups_csv)
+    assert second["incremental"]
+    assert second["added"] == 2
+    assert second["removed"] == 0
+
+    expected = fullScan(unzipped)[fullScanColumns()]
+    pd.testing.assert_frame_equal(readManifest(manifest_csv), expected, check_dtype=False)
+
+    dups = pd.read_csv(dups_csv)
+    assert sorted(dups["pdf_path"]) == sorted(str(unzipped / zr / "a.pdf") for zr in ("2023_b1", "2024_b2"))
+
+
+def testRescanIgnoresSavedState(tmp_path):
+    unzipped = tmp_path / "unzipped"
+    manifest_csv = tmp_path / "manifest_pdfs.csv"
+    dups_csv = tmp_path / "manifest_duplicates.csv"
+    writePdf(unzipped / "2023_b1" / "a.pdf", b"a")
+
+    updateManifest(unzipped, manifest_csv, dups_csv)
+    summary = updateManifest(unzipped, manifest_csv, dups_csv, rescan=True)
+    assert not summary["incremental"]
+    assert summary["dirs_listed"] == summary["dirs"]
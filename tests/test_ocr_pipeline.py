@@ -0,0 +1,64 @@
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+Image = pytest.importorskip("PIL.Image")
+
+from src.budget_buddy.ocr import trocr_infer
+from src.budget_buddy.ocr.ocr_pipeline import PipelineConfig
+from src.budget_buddy.ocr.ocr_sink import JsonFileSink
+
+
+def fakeCrops(split, category, pdf_path, mode, dpi, use_cache, raster_cfg, text_layer_cfg, verbose):
+    # corre en los procesos spawn del raster: un recorte chico por pdf, sin poppler
+    return 1, [("total", Image.new("L", (8, 8), 255))], {}, {}
+
+
+def fakeProcessor(images, return_tensors):
+    return SimpleNamespace(pixel_values=torch.zeros(len(images), 3, 4, 4))
+
+
+def failingGenerate(*args, **kwargs):
+    raise RuntimeError("modelo roto")
+
+
+def testPipelineStopsWhenModelFails(tmp_path, monkeypatch):
+    monkeypatch.setattr(trocr_infer, "loadPdfCropsTimed", fakeCrops)
+    monkeypatch.setattr(trocr_infer, "generateTexts", failingGenerate)
+    monkeypatch.setattr(trocr_infer, "PREPROCESS_METHOD", "processor")
+
+    # muchos más pdfs que lugares en las colas: sin cancelación las etapas quedan bloqueadas
+    items = [("cat", Path(f"factura_{i}.pdf")) for i in range(40)]
+    outcome = {}
+
+    def run():
+        try:
+            trocr_infer.runOcrPipelined(
+                processor=fakeProcessor,
+                model=None,
+                device=torch.device("cpu"),
+                pdf_iter=iter(items),
+                mode="sat-template",
+                dpi=72,
+                use_cache=False,
+                overwrite=True,
+                model_dir="fake",
+                batch_size=2,
+                pipeline_cfg=PipelineConfig(raster_workers=1, preprocess_workers=1, queue_size=2),
+                sink=JsonFileSink(tmp_path),
+            )
+        except Exception as exc:
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=120)
+
+    assert not thread.is_alive(), "runOcrPipelined quedó colgado tras el error del modelo"
+    assert "modelo roto" in str(outcome.get("error"))
+    # el feeder y los hilos de preprocess terminaron (el pool spawn se cerró)
+    alive = {t.name for t in threading.enumerate()}
+    assert not any(name.startswith(("raster-feeder", "preprocess-")) for name in alive)